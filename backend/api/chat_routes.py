@@ -1,22 +1,50 @@
-from flask import Blueprint, request, jsonify
-from services.llm_service import LLMService
-import traceback
+from quart import Blueprint, request, jsonify, make_response
+from config.config import Config
+from services.batch_service import run_batch
+from services.conversation_store import create_conversation_store
+from services.factory_export import ArtifactGraph, ExportError, stream_zip, valid_name
+from services.llm_service import get_llm_service
+from utils.error_handling import APIError, handle_error
+from utils.json_validator import NAME_SCHEMA
+from utils.logging_config import sample_payload
+from utils.metrics import STAGE_SECONDS
+import json
+import logging
+import uuid
 
 chat_bp = Blueprint('chat', __name__)
-llm_service = LLMService()
+logger = logging.getLogger(__name__)
 
-# Simple in-memory storage for current conversation
-current_conversation = []
+# Conversation history, one bounded ring buffer per session
+conversation_store = create_conversation_store(Config)
+
+def _get_session_id(data):
+    """Session ID from the request body or X-Session-ID header; a new one is issued if absent"""
+    return data.get('session_id') or request.headers.get('X-Session-ID') or uuid.uuid4().hex
+
+async def _remember_config(session_id, history, result):
+    """Keep the returned design as the base for the session's next edit and as a few-shot example"""
+    await get_llm_service().remember_design(history, result)
+    config = {'pipeline_flow': result['pipeline_flow'], 'json_configs': result['json_configs']}
+    if config['pipeline_flow']['nodes'] or config['json_configs']['linked_services'] or config['json_configs']['pipeline']:
+        await conversation_store.set_config(session_id, config)
+
+def _api_error(error):
+    """JSON response for an APIError, with Retry-After when the error carries one"""
+    body, status = handle_error(error)
+    response = jsonify(body)
+    if body.get('retry_after') is not None:
+        response.headers['Retry-After'] = str(body['retry_after'])
+    return response, status
 
 @chat_bp.route('/chat', methods=['POST'])
-def chat():
-    global current_conversation
-    
+async def chat():
     try:
         if not request.is_json:
             return jsonify({'error': 'Content-Type must be application/json', 'success': False}), 400
             
-        data = request.get_json()
+        with STAGE_SECONDS.time(stage='parse_request'):
+            data = await request.get_json()
         if not data:
             return jsonify({'error': 'No JSON data provided', 'success': False}), 400
             
@@ -25,34 +53,245 @@ def chat():
         if not user_message:
             return jsonify({'error': 'Missing message', 'success': False}), 400
         
+        decompose = data.get('decompose')
+        if decompose is not None and not isinstance(decompose, bool):
+            return jsonify({'error': 'decompose must be true or false', 'success': False}), 400
+
+        session_id = _get_session_id(data)
+
         # Add user message to conversation
-        current_conversation.append({
-            'role': 'user',
-            'content': user_message
-        })
+        await conversation_store.append(session_id, 'user', user_message)
         
-        # Generate response using LLM
-        result = llm_service.generate_pipeline_config(current_conversation)
-
-        with open('conversation_log.txt', 'w') as log_file:
-            log_file.write(f"{result}\n") 
+        # Generate response using LLM, as an edit of the session's last design when there is one
+        history = await conversation_store.get(session_id)
+        result = await get_llm_service().generate_pipeline_config(
+            history,
+            await conversation_store.get_config(session_id),
+            decompose=decompose
+        )
+        await _remember_config(session_id, history, result)
 
         # Add assistant response to conversation
         explanation = result.get('explanation', 'Pipeline configuration generated')
-        current_conversation.append({
-            'role': 'assistant',
-            'content': explanation
-        })
+        await conversation_store.append(session_id, 'assistant', explanation)
+        logger.info("Chat response generated", extra={'session_id': session_id, 'response': sample_payload(result)})
         
         return jsonify({
             'response': result,
+            'session_id': session_id,
             'success': True
         })
-        
+
+    except APIError as e:
+        logger.warning("Chat request rejected: %s", e.message)
+        return _api_error(e)
     except Exception as e:
-        print(f"Error in chat endpoint: {str(e)}")
-        print(traceback.format_exc())
+        logger.exception("Error in chat endpoint: %s", e)
         return jsonify({
             'error': f'Error: {str(e)}',
             'success': False
         }), 500
+
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@chat_bp.route('/chat/stream', methods=['POST'])
+async def chat_stream():
+    """Server-sent events variant of /chat that emits artifacts as they are generated"""
+    if not request.is_json:
+        return jsonify({'error': 'Content-Type must be application/json', 'success': False}), 400
+
+    data = await request.get_json()
+    if not data:
+        return jsonify({'error': 'No JSON data provided', 'success': False}), 400
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object', 'success': False}), 400
+
+    user_message = data.get('message')
+
+    if not isinstance(user_message, str) or not user_message.strip():
+        return jsonify({'error': 'Missing message', 'success': False}), 400
+
+    session_id = _get_session_id(data)
+    await conversation_store.append(session_id, 'user', user_message)
+    history = await conversation_store.get(session_id)
+
+    async def generate():
+        try:
+            yield _sse('session', {'session_id': session_id})
+            async for event, payload in get_llm_service().stream_pipeline_config(history):
+                if event == 'result':
+                    explanation = payload.get('explanation', 'Pipeline configuration generated')
+                    await conversation_store.append(session_id, 'assistant', explanation)
+                    await _remember_config(session_id, history, payload)
+                    yield _sse('result', {'response': payload, 'session_id': session_id, 'success': True})
+                else:
+                    yield _sse(event, payload)
+        except APIError as e:
+            logger.warning("Chat stream rejected: %s", e.message)
+            body, _ = handle_error(e)
+            yield _sse('error', {**body, 'status': e.status_code})
+        except Exception as e:
+            logger.exception("Error in chat stream endpoint: %s", e)
+            yield _sse('error', {'error': f'Error: {str(e)}', 'success': False})
+
+    response = await make_response(
+        generate(),
+        {'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.timeout = None
+    return response
+
+@chat_bp.route('/batch', methods=['POST'])
+async def batch():
+    """Generate many independent pipelines; results stream back as SSE 'item' events as each finishes.
+
+    Body: {"items": [{"id": "...", "message": "..."}], "concurrency": 8}. Items do not
+    touch any session history.
+    """
+    if not request.is_json:
+        return jsonify({'error': 'Content-Type must be application/json', 'success': False}), 400
+
+    data = await request.get_json()
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object', 'success': False}), 400
+    items = data.get('items')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'items must be a non-empty list', 'success': False}), 400
+    if len(items) > Config.BATCH_MAX_ITEMS:
+        return jsonify({'error': f'At most {Config.BATCH_MAX_ITEMS} items per batch', 'success': False}), 400
+
+    requests = []
+    for index, item in enumerate(items):
+        message = item.get('message') if isinstance(item, dict) else None
+        if not isinstance(message, str) or not message.strip():
+            return jsonify({'error': f'Item {index} is missing a message', 'success': False}), 400
+        requests.append([{'role': 'user', 'content': message.strip()}])
+    try:
+        concurrency = int(data.get('concurrency') or Config.BATCH_CONCURRENCY)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'concurrency must be an integer', 'success': False}), 400
+    concurrency = max(1, min(concurrency, Config.BATCH_CONCURRENCY))
+
+    async def generate():
+        succeeded = 0
+        yield _sse('batch', {'items': len(requests), 'concurrency': concurrency})
+        async for index, result, error in run_batch(get_llm_service(), requests, concurrency):
+            item_id = items[index].get('id', index)
+            if error is None:
+                succeeded += 1
+                yield _sse('item', {'index': index, 'id': item_id, 'response': result, 'success': True})
+            else:
+                yield _sse('item', {'index': index, 'id': item_id, 'error': f'Error: {error}', 'success': False})
+        yield _sse('done', {'items': len(requests), 'succeeded': succeeded, 'failed': len(requests) - succeeded})
+
+    response = await make_response(
+        generate(),
+        {'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+    response.timeout = None
+    return response
+
+async def _export_graph(data):
+    """Merge the designs named in an export request: {"session_ids": [...], "designs": [json_configs, ...]}"""
+    designs = []
+    for session_id in data.get('session_ids') or []:
+        config = await conversation_store.get_config(str(session_id))
+        if config is not None:
+            designs.append(config['json_configs'])
+    for design in data.get('designs') or []:
+        if isinstance(design, dict):
+            designs.append(design.get('json_configs', design))
+    return ArtifactGraph.from_designs(designs)
+
+async def _export_request():
+    """(body, None) for a well-formed export request, else (None, 400 response)"""
+    data = await request.get_json()
+    if not isinstance(data, dict):
+        return None, (jsonify({'error': 'Request body must be a JSON object', 'success': False}), 400)
+    for key in ('session_ids', 'designs'):
+        if not isinstance(data.get(key) or [], list):
+            return None, (jsonify({'error': f'{key} must be a list', 'success': False}), 400)
+    return data, None
+
+@chat_bp.route('/export/plan', methods=['POST'])
+async def export_plan():
+    """Deployment order and any dangling references, cycles or name conflicts, without building the bundle"""
+    if not request.is_json:
+        return jsonify({'error': 'Content-Type must be application/json', 'success': False}), 400
+    data, error = await _export_request()
+    if error is not None:
+        return error
+    try:
+        graph = await _export_graph(data)
+    except ExportError as e:
+        return jsonify({'error': str(e), 'plan': e.problems, 'success': False}), 400
+    return jsonify({'plan': graph.plan(), 'success': True})
+
+@chat_bp.route('/export', methods=['POST'])
+async def export_factory():
+    """Stream a zip with the ARM template and/or factory folder for the merged designs"""
+    if not request.is_json:
+        return jsonify({'error': 'Content-Type must be application/json', 'success': False}), 400
+    data, error = await _export_request()
+    if error is not None:
+        return error
+    fmt = data.get('format', 'both')
+    if fmt not in ('arm', 'folder', 'both'):
+        return jsonify({'error': "format must be 'arm', 'folder' or 'both'", 'success': False}), 400
+    factory_name = data.get('factory_name') or 'adf-factory'
+    if not valid_name(factory_name):
+        return jsonify({'error': 'factory_name must match ' + NAME_SCHEMA['pattern'], 'success': False}), 400
+    try:
+        graph = await _export_graph(data)
+        if not graph.artifacts:
+            return jsonify({'error': 'No artifacts to export', 'success': False}), 400
+        order = graph.deployment_order()
+    except ExportError as e:
+        return jsonify({'error': str(e), 'plan': e.problems, 'success': False}), 400
+
+    response = await make_response(
+        stream_zip(graph, order, factory_name, fmt),
+        {
+            'Content-Type': 'application/zip',
+            'Content-Disposition': f'attachment; filename="{factory_name}.zip"'
+        }
+    )
+    response.timeout = None
+    return response
+
+@chat_bp.route('/cache/stats', methods=['GET'])
+async def cache_stats():
+    cache = get_llm_service().cache
+    if cache is None:
+        return jsonify({'enabled': False, 'success': True})
+    return jsonify({'enabled': True, 'stats': cache.stats(), 'success': True})
+
+@chat_bp.route('/sessions/<session_id>', methods=['DELETE'])
+async def clear_session(session_id):
+    await conversation_store.clear(session_id)
+    return jsonify({'session_id': session_id, 'success': True})
+
+@chat_bp.route('/providers/stats', methods=['GET'])
+async def provider_stats():
+    return jsonify({'providers': get_llm_service().router.stats(), 'success': True})
+
+@chat_bp.route('/coalescing/stats', methods=['GET'])
+async def coalescing_stats():
+    return jsonify({'stats': get_llm_service().single_flight.stats(), 'success': True})
+
+@chat_bp.route('/retrieval/stats', methods=['GET'])
+async def retrieval_stats():
+    examples = get_llm_service().examples
+    if examples is None:
+        return jsonify({'enabled': False, 'success': True})
+    return jsonify({'enabled': True, 'stats': examples.stats(), 'success': True})
+
+@chat_bp.route('/admission/stats', methods=['GET'])
+async def admission_stats():
+    return jsonify({'stats': get_llm_service().admission.stats(), 'success': True})
+
+@chat_bp.route('/sessions/stats', methods=['GET'])
+async def session_stats():
+    return jsonify({'stats': await conversation_store.stats(), 'success': True})
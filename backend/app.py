@@ -1,28 +1,97 @@
-from flask import Flask
-from flask_cors import CORS
+import asyncio
+import logging
+import time
+from quart import Quart, Response, g, request
+from quart_cors import cors
 from config.config import Config 
 from api import chat_routes
+from services.llm_service import close_llm_service, get_llm_service
+from utils.logging_config import new_request_id, setup_logging, shutdown_logging
+from utils.metrics import REGISTRY, REQUEST_SECONDS
+
+logger = logging.getLogger(__name__)
 
 def create_app():
-    app = Flask(__name__)
+    app = Quart(__name__)
     app.secret_key = Config.SECRET_KEY
+    setup_logging(app)
     
     # Simple CORS configuration
-    CORS(app, resources={
-        r"/api/*": {
-            "origins": "http://localhost:3000",
-            "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-            "allow_headers": ["Content-Type", "Authorization"],
-            "supports_credentials": True
-        }
-    })
+    app = cors(
+        app,
+        allow_origin="http://localhost:3000",
+        allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
+        allow_headers=["Content-Type", "Authorization"],
+        allow_credentials=True
+    )
     
     # Register blueprints
     app.register_blueprint(chat_routes.chat_bp, url_prefix='/api')
     
+    # Per-request correlation ID, echoed back and stamped on every log record
+    @app.before_request
+    async def assign_request_id():
+        g.request_id = new_request_id(request.headers.get('X-Request-ID'))
+        g.request_started = time.perf_counter()
+
+    @app.after_request
+    async def add_request_id_header(response):
+        response.headers['X-Request-ID'] = g.get('request_id', '')
+        if 'request_started' in g:
+            REQUEST_SECONDS.observe(
+                time.perf_counter() - g.request_started,
+                endpoint=request.endpoint or 'unknown',
+                status=str(response.status_code)
+            )
+        return response
+
     @app.route('/')
-    def health_check():
+    async def health_check():
         return {'status': 'healthy', 'message': 'ADF Pipeline Generator API is running'}
+
+    # Liveness only says the event loop answers; readiness waits for the LLM service and warm-up
+    readiness = {'ready': False, 'error': None, 'warm_up': None}
+
+    async def warm_up():
+        started = time.perf_counter()
+        try:
+            service = get_llm_service()
+        except Exception as e:
+            logger.exception("LLM service failed to start: %s", e)
+            readiness['error'] = str(e)
+            return
+        try:
+            readiness['warm_up'] = await asyncio.wait_for(service.warm_up(), Config.WARMUP_TIMEOUT_SECONDS)
+        except Exception as e:
+            # Warm-up is best effort: a slow or unreachable upstream is left to the router's failover
+            logger.warning("Warm-up incomplete after %.1fs: %r", time.perf_counter() - started, e)
+            readiness['warm_up'] = {'error': repr(e)}
+        readiness['ready'] = True
+        logger.info("Ready", extra={'warm_up': readiness['warm_up']})
+
+    @app.before_serving
+    async def start_warm_up():
+        app.add_background_task(warm_up)
+
+    @app.route('/live')
+    async def live():
+        return {'status': 'alive'}
+
+    @app.route('/ready')
+    async def ready():
+        if readiness['ready']:
+            return {'status': 'ready', 'warm_up': readiness['warm_up']}
+        status = 'failed' if readiness['error'] else 'starting'
+        return {'status': status, 'error': readiness['error']}, 503
+
+    @app.route('/metrics')
+    async def metrics():
+        return Response(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+    @app.after_serving
+    async def close_llm_client():
+        await close_llm_service()
+        shutdown_logging()
     
     return app
 
@@ -0,0 +1,4 @@
+"""
+Offline benchmarks for the ADF Pipeline Designer backend.
+Includes a recorded mock LLM server, an /api/chat load test and microbenchmarks.
+"""
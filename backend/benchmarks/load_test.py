@@ -0,0 +1,195 @@
+"""Drive /api/chat at increasing concurrency against the recorded mock LLM.
+
+Starts benchmarks.mock_llm_server and the backend (under hypercorn) as
+subprocesses, then runs one stage per concurrency level. Each virtual user
+holds a session and sends multi-turn conversations. Per stage it reports
+RPS, latency percentiles, errors, the backend's resident memory and the
+number of conversation sessions held:
+
+    python -m benchmarks.load_test --concurrency 1,8,32,128 --requests 200 --latency-ms 500
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(int(round(pct / 100 * (len(ordered) - 1))), len(ordered) - 1)
+    return ordered[index]
+
+
+def _children(pid):
+    try:
+        with open(f'/proc/{pid}/task/{pid}/children') as children:
+            return [int(child) for child in children.read().split()]
+    except OSError:
+        return []
+
+
+def rss_mb(pid):
+    """Resident set size of a process and its workers in MiB (Linux /proc, psutil elsewhere)"""
+    if os.path.exists(f'/proc/{pid}/status'):
+        total = 0
+        pending = [pid]
+        while pending:
+            current = pending.pop()
+            pending.extend(_children(current))
+            try:
+                with open(f'/proc/{current}/status') as status:
+                    for line in status:
+                        if line.startswith('VmRSS:'):
+                            total += int(line.split()[1])
+            except OSError:
+                pass
+        return total / 1024
+    try:
+        import psutil
+        process = psutil.Process(pid)
+        return sum(p.memory_info().rss for p in [process] + process.children(recursive=True)) / (1024 * 1024)
+    except Exception:
+        return float('nan')
+
+
+async def wait_until_up(url, timeout=30):
+    deadline = time.time() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.time() < deadline:
+            try:
+                await client.get(url)
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise Exception(f"{url} did not come up within {timeout}s")
+
+
+async def run_stage(base_url, concurrency, total_requests, turns, stream):
+    latencies = []
+    first_event = []
+    errors = {}
+    issued = 0
+    endpoint = '/api/chat/stream' if stream else '/api/chat'
+
+    async def virtual_user(client, user_index):
+        nonlocal issued
+        conversation = 0
+        while issued < total_requests:
+            session_id = f"bench-{concurrency}-{user_index}-{conversation}"
+            conversation += 1
+            for turn in range(turns):
+                if issued >= total_requests:
+                    return
+                issued += 1
+                message = f"Copy table {user_index % 17} from SQL Server to Databricks, step {turn}"
+                started = time.perf_counter()
+                try:
+                    if stream:
+                        async with client.stream('POST', endpoint, json={'message': message, 'session_id': session_id}) as response:
+                            async for line in response.aiter_lines():
+                                if line.startswith('event: node') and len(first_event) < issued:
+                                    first_event.append(time.perf_counter() - started)
+                            status = response.status_code
+                    else:
+                        response = await client.post(endpoint, json={'message': message, 'session_id': session_id})
+                        status = response.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                if status != 200:
+                    errors[status] = errors.get(status, 0) + 1
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=300, limits=limits) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(virtual_user(client, index) for index in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'rps': len(latencies) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 50),
+        'p90': percentile(latencies, 90),
+        'p99': percentile(latencies, 99),
+        'first_node_p50': percentile(first_event, 50) if stream else None,
+        'errors': errors
+    }
+
+
+async def run(args):
+    env = dict(
+        os.environ,
+        LLM_PROVIDERS='perplexity',
+        PERPLEXITY_API_KEY='benchmark',
+        PERPLEXITY_URL=f'http://127.0.0.1:{args.mock_port}/chat/completions',
+        CACHE_ENABLED='true' if args.cache else 'false',
+        TEMPLATES_ENABLED='true' if args.templates else 'false',
+        LOG_LEVEL='WARNING'
+    )
+    mock = subprocess.Popen(
+        [sys.executable, '-m', 'benchmarks.mock_llm_server', '--port', str(args.mock_port),
+         '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+         '--error-rate', str(args.error_rate), '--seed', '1'],
+        cwd=BACKEND_DIR, env=env
+    )
+    backend = subprocess.Popen(
+        [sys.executable, '-m', 'hypercorn', 'app:create_app()', '--bind', f'127.0.0.1:{args.port}',
+         '--backlog', '2048'],
+        cwd=BACKEND_DIR, env=env
+    )
+    base_url = f'http://127.0.0.1:{args.port}'
+    try:
+        await wait_until_up(f'http://127.0.0.1:{args.mock_port}/stats')
+        await wait_until_up(base_url + '/')
+        baseline_rss = rss_mb(backend.pid)
+        print(f"backend baseline RSS: {baseline_rss:.1f} MiB")
+        header = f"{'conc':>5} {'reqs':>6} {'rps':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'ttfn ms':>8} {'rss MiB':>8} {'sessions':>8}  errors"
+        print(header)
+        print('-' * len(header))
+
+        async with httpx.AsyncClient(base_url=base_url) as client:
+            for concurrency in args.concurrency:
+                result = await run_stage(base_url, concurrency, args.requests, args.turns, args.stream)
+                sessions = (await client.get('/api/sessions/stats')).json().get('stats', {}).get('sessions')
+                ttfn = f"{result['first_node_p50'] * 1000:8.0f}" if result['first_node_p50'] is not None else f"{'-':>8}"
+                print(
+                    f"{result['concurrency']:>5} {result['requests']:>6} {result['rps']:>8.1f} "
+                    f"{result['p50'] * 1000:>8.0f} {result['p90'] * 1000:>8.0f} {result['p99'] * 1000:>8.0f} "
+                    f"{ttfn} {rss_mb(backend.pid):>8.1f} {sessions:>8}  {result['errors'] or ''}"
+                )
+        print(f"backend RSS growth: {rss_mb(backend.pid) - baseline_rss:+.1f} MiB")
+    finally:
+        for process in (backend, mock):
+            process.terminate()
+            process.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--concurrency', default='1,8,32,128',
+                        type=lambda value: [int(level) for level in value.split(',')])
+    parser.add_argument('--requests', type=int, default=200, help='requests per concurrency level')
+    parser.add_argument('--turns', type=int, default=3, help='turns per conversation')
+    parser.add_argument('--latency-ms', type=float, default=500.0)
+    parser.add_argument('--jitter-ms', type=float, default=100.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--cache', action='store_true', help='enable the response cache')
+    parser.add_argument('--templates', action='store_true',
+                        help='let the template engine answer first turns locally')
+    parser.add_argument('--stream', action='store_true', help='drive /api/chat/stream and report time to first node')
+    parser.add_argument('--port', type=int, default=5100)
+    parser.add_argument('--mock-port', type=int, default=8100)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+"""Microbenchmarks for the response-processing hot path.
+
+Times JSON extraction, _validate_and_clean_response,
+JSONValidator.validate_json_configs, the factory export (dependency
+ordering and the streamed zip) and the flow layout (cold and cached) on
+small and very large pipelines:
+
+    python -m benchmarks.microbench --sizes 1,50,500 --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LLM_PROVIDERS', 'mock')
+
+from benchmarks.payloads import make_llm_reply, make_pipeline_response  # noqa: E402
+from services.factory_export import ArtifactGraph, stream_zip  # noqa: E402
+from services.llm_service import LLMService  # noqa: E402
+from utils.graph_layout import FlowLayout  # noqa: E402
+from utils.json_extractor import extract_json  # noqa: E402
+from utils.json_validator import JSONValidator  # noqa: E402
+
+
+def bench(label, size, payload_bytes, fn, repeat=5):
+    """Run fn enough times per repeat for ~0.2s and print the median per-call time"""
+    number = 1
+    while True:
+        elapsed = timeit.timeit(lambda: fn(None), number=number)
+        if elapsed > 0.2 or number >= 10000:
+            break
+        number *= 2
+    timings = [
+        timeit.timeit(lambda: fn(None), number=number) / number
+        for _ in range(repeat)
+    ]
+    median = statistics.median(timings)
+    print(f"{label:<28} {size:>6} {payload_bytes / 1024:>10.1f} {median * 1000:>10.3f} {1 / median:>12.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1,50,500', type=lambda value: [int(size) for size in value.split(',')],
+                        help='number of copy activities per pipeline')
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    service = LLMService()
+    print(f"{'benchmark':<28} {'acts':>6} {'KiB':>10} {'ms/op':>10} {'ops/s':>12}")
+    print('-' * 70)
+    for size in args.sizes:
+        reply = make_llm_reply(size)
+        response = make_pipeline_response(size)
+        size_bytes = len(json.dumps(response))
+
+        bench('extract_json', size, len(reply), lambda _: extract_json(reply), repeat=args.repeat)
+        bench('json.loads (baseline)', size, size_bytes,
+              lambda _: json.loads(json.dumps(response)), repeat=args.repeat)
+        # Validation only fills missing keys, so re-running it on the same dict is representative
+        bench('_validate_and_clean_response', size, size_bytes,
+              lambda _: service._validate_and_clean_response(response), repeat=args.repeat)
+        bench('validate_json_configs', size, size_bytes,
+              lambda _: JSONValidator.validate_json_configs(response['json_configs']), repeat=args.repeat)
+
+        graph = ArtifactGraph.from_designs([response['json_configs']])
+        order = graph.deployment_order()
+        bench('export deployment_order', size, size_bytes,
+              lambda _: ArtifactGraph.from_designs([response['json_configs']]).deployment_order(),
+              repeat=args.repeat)
+        bench('export stream_zip', size, size_bytes,
+              lambda _: b''.join(stream_zip(graph, order, 'bench')), repeat=args.repeat)
+
+        flow = response['pipeline_flow']
+        bench('layout (cold)', size, size_bytes, lambda _: FlowLayout().apply(flow), repeat=args.repeat)
+        warm = FlowLayout()
+        warm.apply(flow)
+        bench('layout (cached)', size, size_bytes, lambda _: warm.apply(flow), repeat=args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""Recorded mock of an OpenAI-style /chat/completions endpoint.
+
+Replays the completion envelopes in a recordings directory with
+configurable latency, jitter and injected errors, so the backend can be
+driven at load with no network access:
+
+    python -m benchmarks.mock_llm_server --port 8100 --latency-ms 800 --jitter-ms 200 --error-rate 0.02
+
+Point the backend at it with PERPLEXITY_URL=http://127.0.0.1:8100/chat/completions.
+"""
+import argparse
+import asyncio
+import glob
+import hashlib
+import json
+import os
+import random
+
+from quart import Quart, Response, request
+
+RECORDINGS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'recordings')
+
+
+def load_recordings(directory):
+    recordings = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        with open(path) as recording_file:
+            recordings.append(json.load(recording_file))
+    if not recordings:
+        raise Exception(f"No recordings found in {directory}")
+    return recordings
+
+
+def create_mock_app(recordings, latency_ms=0.0, jitter_ms=0.0, error_rate=0.0, seed=None):
+    app = Quart(__name__)
+    rng = random.Random(seed)
+    stats = {'requests': 0, 'errors': 0}
+
+    def pick(messages):
+        # Same prompt -> same recording, so caches and coalescing behave realistically
+        last_user = next((msg.get('content', '') for msg in reversed(messages) if msg.get('role') == 'user'), '')
+        digest = hashlib.sha256(last_user.encode('utf-8')).digest()
+        return recordings[digest[0] % len(recordings)]
+
+    def delay():
+        return max(latency_ms + rng.uniform(-jitter_ms, jitter_ms), 0.0) / 1000
+
+    @app.route('/chat/completions', methods=['POST'])
+    async def completions():
+        stats['requests'] += 1
+        payload = await request.get_json()
+
+        if rng.random() < error_rate:
+            stats['errors'] += 1
+            await asyncio.sleep(delay() / 4)
+            if rng.random() < 0.5:
+                return Response('{"error": "rate limited"}', status=429, headers={'Retry-After': '1'},
+                                content_type='application/json')
+            return Response('{"error": "upstream unavailable"}', status=503, content_type='application/json')
+
+        recording = pick(payload.get('messages', []))
+        if not payload.get('stream'):
+            await asyncio.sleep(delay())
+            return Response(json.dumps(recording), content_type='application/json')
+
+        content = recording['choices'][0]['message']['content']
+        chunks = [content[i:i + 40] for i in range(0, len(content), 40)]
+        per_chunk = delay() / max(len(chunks), 1)
+
+        async def stream():
+            for chunk in chunks:
+                await asyncio.sleep(per_chunk)
+                yield 'data: ' + json.dumps({'choices': [{'index': 0, 'delta': {'content': chunk}}]}) + '\n\n'
+            yield 'data: [DONE]\n\n'
+
+        response = Response(stream(), content_type='text/event-stream')
+        response.timeout = None
+        return response
+
+    @app.route('/stats', methods=['GET'])
+    async def mock_stats():
+        return stats
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8100)
+    parser.add_argument('--recordings', default=RECORDINGS_DIR)
+    parser.add_argument('--latency-ms', type=float, default=500.0)
+    parser.add_argument('--jitter-ms', type=float, default=100.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    from hypercorn.asyncio import serve
+    from hypercorn.config import Config as HypercornConfig
+
+    app = create_mock_app(load_recordings(args.recordings), args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    config = HypercornConfig()
+    config.bind = [f"{args.host}:{args.port}"]
+    config.backlog = 2048
+    config.accesslog = None
+    asyncio.run(serve(app, config))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+import json
+
+
+def make_pipeline_response(activities=1):
+    """Synthetic LLM response with one Copy activity (and its datasets) per activity slot"""
+    linked_services = [
+        {
+            "name": "ls_sql_server",
+            "type": "Microsoft.DataFactory/factories/linkedservices",
+            "properties": {"type": "SqlServer", "typeProperties": {"connectionString": "connection string here"}}
+        },
+        {
+            "name": "ls_databricks",
+            "type": "Microsoft.DataFactory/factories/linkedservices",
+            "properties": {"type": "AzureDatabricksDeltaLake", "typeProperties": {"domain": "https://adb.example.net"}}
+        }
+    ]
+    datasets = []
+    pipeline_activities = []
+    nodes = [
+        {"id": "ls_sql_server", "type": "linked_service", "name": "ls_sql_server", "label": "SQL Server Linked Service"},
+        {"id": "ls_databricks", "type": "linked_service", "name": "ls_databricks", "label": "Databricks Linked Service"}
+    ]
+    edges = []
+
+    for index in range(activities):
+        source, sink, activity = f"ds_sql_table_{index}", f"ds_databricks_table_{index}", f"CopyTable{index}"
+        for name, linked_service, dataset_type in (
+            (source, "ls_sql_server", "SqlServerTable"),
+            (sink, "ls_databricks", "AzureDatabricksDeltaLakeDataset")
+        ):
+            datasets.append({
+                "name": name,
+                "type": "Microsoft.DataFactory/factories/datasets",
+                "properties": {
+                    "type": dataset_type,
+                    "linkedServiceName": {"referenceName": linked_service, "type": "LinkedServiceReference"},
+                    "typeProperties": {"tableName": f"table_{index}"}
+                }
+            })
+            nodes.append({"id": name, "type": "dataset", "name": name, "label": name})
+            edges.append({"id": f"edge_{name}", "source": linked_service, "target": name, "label": "provides connection"})
+
+        pipeline_activities.append({
+            "name": activity,
+            "type": "Copy",
+            "dependsOn": [{"activity": f"CopyTable{index - 1}", "dependencyConditions": ["Succeeded"]}] if index else [],
+            "inputs": [{"referenceName": source, "type": "DatasetReference"}],
+            "outputs": [{"referenceName": sink, "type": "DatasetReference"}],
+            "typeProperties": {"source": {"type": "SqlSource"}, "sink": {"type": "AzureDatabricksDeltaLakeSink"}}
+        })
+        nodes.append({"id": activity, "type": "activity", "name": activity, "label": f"Copy table {index}"})
+        edges.append({"id": f"edge_in_{index}", "source": source, "target": activity, "label": "input"})
+        edges.append({"id": f"edge_out_{index}", "source": activity, "target": sink, "label": "output"})
+
+    return {
+        "pipeline_flow": {"nodes": nodes, "edges": edges},
+        "json_configs": {
+            "linked_services": linked_services,
+            "datasets": datasets,
+            "pipeline": {
+                "name": "pl_sql_to_databricks",
+                "type": "Microsoft.DataFactory/factories/pipelines",
+                "properties": {"activities": pipeline_activities}
+            }
+        },
+        "explanation": f"Pipeline copying {activities} SQL Server tables to Databricks"
+    }
+
+
+def make_llm_reply(activities=1):
+    """Reply text as a model tends to produce it: prose, a fenced block and a trailing note"""
+    body = json.dumps(make_pipeline_response(activities), indent=2)
+    return f"Here is the pipeline you asked for:\n```json\n{body}\n```\nLet me know if you need changes {{e.g. scheduling}}."
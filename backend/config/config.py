@@ -5,12 +5,127 @@ load_dotenv()
 
 class Config:
     SECRET_KEY = os.getenv('FLASK_SECRET_KEY')
+
+    # Production server (serve.py): Hypercorn worker processes, one event loop each
+    SERVER_HOST = os.getenv('SERVER_HOST', '0.0.0.0')
+    SERVER_PORT = int(os.getenv('SERVER_PORT', '5000'))
+    # 0 = one per CPU core when conversations live in a shared backend, else a single worker
+    SERVER_WORKERS = int(os.getenv('SERVER_WORKERS', '0')) or (
+        (os.cpu_count() or 1) if os.getenv('CONVERSATION_BACKEND', 'memory').lower() != 'memory' else 1)
+    SERVER_WORKER_CLASS = os.getenv('SERVER_WORKER_CLASS', 'asyncio')  # 'asyncio' or 'uvloop'
+    SERVER_BACKLOG = int(os.getenv('SERVER_BACKLOG', '2048'))
+    SERVER_KEEP_ALIVE_SECONDS = float(os.getenv('SERVER_KEEP_ALIVE_SECONDS', '5'))
+    SERVER_GRACEFUL_TIMEOUT_SECONDS = float(os.getenv('SERVER_GRACEFUL_TIMEOUT_SECONDS', '30'))
+
+    # Warm-up before /ready passes: upstream connections to pre-open per provider, and a time cap
+    WARMUP_CONNECTIONS = int(os.getenv('WARMUP_CONNECTIONS', '2'))
+    WARMUP_TIMEOUT_SECONDS = float(os.getenv('WARMUP_TIMEOUT_SECONDS', '10'))
     
     USE_PERPLEXITY = os.getenv('USE_PERPLEXITY', 'false').lower() == 'true'
     PERPLEXITY_URL = os.getenv('PERPLEXITY_URL', 'https://api.perplexity.ai/chat/completions')
     PERPLEXITY_API_KEY = os.getenv('PERPLEXITY_API_KEY')
     PERPLEXITY_MODEL = os.getenv('PERPLEXITY_MODEL', 'sonar-pro')
 
-    # USE_OLLAMA = os.getenv('USE_OLLAMA', 'false').lower() == 'true'
-    # OLLAMA_URL = os.getenv('OLLAMA_URL', 'http://localhost:11434/api/generate')
-    # OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'mistral')
\ No newline at end of file
+    # Upstream HTTP connection pool, timeouts (seconds) and retry policy
+    HTTP_POOL_SIZE = int(os.getenv('HTTP_POOL_SIZE', '10'))
+    HTTP_CONNECT_TIMEOUT = float(os.getenv('HTTP_CONNECT_TIMEOUT', '5'))
+    HTTP_READ_TIMEOUT = float(os.getenv('HTTP_READ_TIMEOUT', '120'))
+    HTTP_MAX_RETRIES = int(os.getenv('HTTP_MAX_RETRIES', '3'))
+    HTTP_BACKOFF_FACTOR = float(os.getenv('HTTP_BACKOFF_FACTOR', '0.5'))
+    HTTP_BACKOFF_JITTER = float(os.getenv('HTTP_BACKOFF_JITTER', '0.5'))
+    HTTP_BACKOFF_MAX = float(os.getenv('HTTP_BACKOFF_MAX', '10'))
+
+    # Maximum in-flight upstream LLM calls per process; further requests wait
+    LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '100'))
+
+    # Admission control in front of upstream calls: the concurrency window adapts between
+    # ADMISSION_MIN_CONCURRENCY and LLM_MAX_CONCURRENCY; excess requests queue, then get 503/429
+    ADMISSION_MIN_CONCURRENCY = int(os.getenv('ADMISSION_MIN_CONCURRENCY', '1'))
+    ADMISSION_QUEUE_SIZE = int(os.getenv('ADMISSION_QUEUE_SIZE', '100'))
+    ADMISSION_QUEUE_TIMEOUT_SECONDS = float(os.getenv('ADMISSION_QUEUE_TIMEOUT_SECONDS', '10'))
+    ADMISSION_RATE = float(os.getenv('ADMISSION_RATE', '0'))  # upstream calls per second, 0 = unlimited
+    ADMISSION_BURST = int(os.getenv('ADMISSION_BURST', '5'))
+    ADMISSION_LATENCY_TOLERANCE = float(os.getenv('ADMISSION_LATENCY_TOLERANCE', '2.0'))
+    ADMISSION_LATENCY_WINDOW = int(os.getenv('ADMISSION_LATENCY_WINDOW', '100'))  # latencies per baseline median
+
+    # Prompt assembly: total input token budget and the share reserved for summarised history
+    PROMPT_TOKEN_BUDGET = int(os.getenv('PROMPT_TOKEN_BUDGET', '6000'))
+    PROMPT_SUMMARY_TOKENS = int(os.getenv('PROMPT_SUMMARY_TOKENS', '500'))
+
+    # Follow-up turns ask the model for a JSON Patch against the session's last design
+    INCREMENTAL_EDITS_ENABLED = os.getenv('INCREMENTAL_EDITS_ENABLED', 'true').lower() == 'true'
+
+    # Answer plain source -> sink copy requests from local templates instead of the LLM
+    TEMPLATES_ENABLED = os.getenv('TEMPLATES_ENABLED', 'true').lower() == 'true'
+
+    # Few-shot retrieval of accepted designs (RETRIEVAL_INDEX_PATH persists the index)
+    RETRIEVAL_ENABLED = os.getenv('RETRIEVAL_ENABLED', 'true').lower() == 'true'
+    RETRIEVAL_INDEX_PATH = os.getenv('RETRIEVAL_INDEX_PATH', '')
+    RETRIEVAL_DIM = int(os.getenv('RETRIEVAL_DIM', '1024'))
+    RETRIEVAL_TOP_K = int(os.getenv('RETRIEVAL_TOP_K', '2'))
+    RETRIEVAL_MIN_SCORE = float(os.getenv('RETRIEVAL_MIN_SCORE', '0.3'))
+    RETRIEVAL_MAX_TOKENS = int(os.getenv('RETRIEVAL_MAX_TOKENS', '1500'))
+
+    # Server-side layered layout of pipeline_flow (node positions), cached per graph structure
+    LAYOUT_ENABLED = os.getenv('LAYOUT_ENABLED', 'true').lower() == 'true'
+    LAYOUT_CACHE_SIZE = int(os.getenv('LAYOUT_CACHE_SIZE', '512'))
+
+    # Plan first, then generate each artifact in a concurrent sub-request (per request: "decompose": true)
+    DECOMPOSED_GENERATION = os.getenv('DECOMPOSED_GENERATION', 'false').lower() == 'true'
+    # Artifact sub-requests one decomposed request may have in flight at once
+    DECOMPOSED_CONCURRENCY = int(os.getenv('DECOMPOSED_CONCURRENCY', '4'))
+
+    # Ask providers for schema-constrained JSON, and re-ask for just the artifacts that fail validation
+    STRUCTURED_OUTPUT_ENABLED = os.getenv('STRUCTURED_OUTPUT_ENABLED', 'true').lower() == 'true'
+    REPAIR_MAX_ATTEMPTS = int(os.getenv('REPAIR_MAX_ATTEMPTS', '2'))
+
+    # Response cache for generated pipeline configs (CACHE_DB_PATH enables the disk tier)
+    CACHE_ENABLED = os.getenv('CACHE_ENABLED', 'true').lower() == 'true'
+    CACHE_MAX_ENTRIES = int(os.getenv('CACHE_MAX_ENTRIES', '256'))
+    CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', str(32 * 1024 * 1024)))
+    CACHE_TTL_SECONDS = int(os.getenv('CACHE_TTL_SECONDS', '3600'))
+    CACHE_DB_PATH = os.getenv('CACHE_DB_PATH', '')
+
+    # Conversation history store ('memory' or 'sqlite'; sqlite is shared across worker processes)
+    CONVERSATION_BACKEND = os.getenv('CONVERSATION_BACKEND', 'memory').lower()
+    CONVERSATION_DB_PATH = os.getenv('CONVERSATION_DB_PATH', 'conversations.db')
+    CONVERSATION_MAX_MESSAGES = int(os.getenv('CONVERSATION_MAX_MESSAGES', '20'))
+    CONVERSATION_MAX_BYTES = int(os.getenv('CONVERSATION_MAX_BYTES', str(64 * 1024)))
+    CONVERSATION_MAX_SESSIONS = int(os.getenv('CONVERSATION_MAX_SESSIONS', '1000'))
+    CONVERSATION_TTL_SECONDS = int(os.getenv('CONVERSATION_TTL_SECONDS', '3600'))
+    CONVERSATION_EVICT_EVERY = int(os.getenv('CONVERSATION_EVICT_EVERY', '100'))  # writes between eviction sweeps
+
+    OLLAMA_URL = os.getenv('OLLAMA_URL', 'http://localhost:11434/v1/chat/completions')
+    OLLAMA_MODEL = os.getenv('OLLAMA_MODEL', 'mistral')
+    OLLAMA_API_KEY = os.getenv('OLLAMA_API_KEY')
+
+    # Structured logging: JSON lines under LOG_DIR, with sampled/truncated payloads
+    LOG_DIR = os.getenv('LOG_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'logs'))
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+    LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv('LOG_PAYLOAD_SAMPLE_RATE', '0.1'))
+    LOG_PAYLOAD_MAX_BYTES = int(os.getenv('LOG_PAYLOAD_MAX_BYTES', '4096'))
+
+    # LLM providers in priority order (perplexity, ollama, mock); mock needs no network.
+    # Providers joined with '|' (e.g. 'perplexity|ollama,mock') share a tier and are ordered by latency within it
+    LLM_PROVIDER_GROUPS = [
+        [name.strip().lower() for name in group.split('|') if name.strip()]
+        for group in os.getenv('LLM_PROVIDERS', 'perplexity').split(',')
+    ]
+    LLM_PROVIDERS = [name for group in LLM_PROVIDER_GROUPS for name in group]
+    LLM_PROVIDER_TIERS = {name: tier for tier, group in enumerate(LLM_PROVIDER_GROUPS) for name in group}
+    # Provider to prefer for follow-up turns (e.g. a cheap local model); empty disables
+    LLM_FOLLOWUP_PROVIDER = os.getenv('LLM_FOLLOWUP_PROVIDER', '').lower()
+    MOCK_LATENCY_MS = float(os.getenv('MOCK_LATENCY_MS', '0'))
+    ROUTER_ERROR_THRESHOLD = float(os.getenv('ROUTER_ERROR_THRESHOLD', '0.5'))
+    ROUTER_COOLDOWN_SECONDS = float(os.getenv('ROUTER_COOLDOWN_SECONDS', '30'))
+    ROUTER_EWMA_ALPHA = float(os.getenv('ROUTER_EWMA_ALPHA', '0.2'))
+    # Per-provider request rate caps as name:requests_per_second pairs, e.g. "perplexity:2,ollama:10"
+    PROVIDER_RATE_LIMITS = {
+        name.strip().lower(): float(rate)
+        for name, rate in (pair.split(':', 1) for pair in os.getenv('PROVIDER_RATE_LIMITS', '').split(',') if ':' in pair)
+    }
+    PROVIDER_RATE_BURST = int(os.getenv('PROVIDER_RATE_BURST', '1'))
+
+    # Batch generation (/api/batch)
+    BATCH_MAX_ITEMS = int(os.getenv('BATCH_MAX_ITEMS', '100'))
+    BATCH_CONCURRENCY = int(os.getenv('BATCH_CONCURRENCY', '8'))
@@ -0,0 +1,46 @@
+"""
+Production entry point: ``python serve.py``.
+
+Runs the app under Hypercorn with SERVER_WORKERS worker processes (by
+default one per CPU core with a shared conversation backend, else one),
+each with its own event loop, LLM service and upstream connection pool. Each worker warms up after binding and reports
+ready on /ready once done; /live answers as soon as it serves.
+"""
+import logging
+
+from hypercorn.config import Config as HypercornConfig
+from hypercorn.run import run
+
+from config.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def hypercorn_config():
+    """Hypercorn settings from SERVER_* config"""
+    config = HypercornConfig()
+    config.application_path = 'app:create_app()'
+    config.bind = [f'{Config.SERVER_HOST}:{Config.SERVER_PORT}']
+    config.workers = Config.SERVER_WORKERS
+    config.worker_class = Config.SERVER_WORKER_CLASS
+    config.backlog = Config.SERVER_BACKLOG
+    config.keep_alive_timeout = Config.SERVER_KEEP_ALIVE_SECONDS
+    config.graceful_timeout = Config.SERVER_GRACEFUL_TIMEOUT_SECONDS
+    return config
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    if Config.SERVER_WORKERS > 1 and Config.RETRIEVAL_ENABLED and Config.RETRIEVAL_INDEX_PATH:
+        logger.error("RETRIEVAL_INDEX_PATH must be owned by a single process, but SERVER_WORKERS=%d; "
+                     "set SERVER_WORKERS=1 or unset RETRIEVAL_INDEX_PATH", Config.SERVER_WORKERS)
+        return 1
+    if Config.SERVER_WORKERS > 1 and Config.CONVERSATION_BACKEND == 'memory':
+        logger.error("CONVERSATION_BACKEND=memory keeps sessions per worker process, but SERVER_WORKERS=%d; "
+                     "set SERVER_WORKERS=1 or CONVERSATION_BACKEND=sqlite", Config.SERVER_WORKERS)
+        return 1
+    return run(hypercorn_config())
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
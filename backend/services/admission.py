@@ -0,0 +1,180 @@
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from email.utils import parsedate_to_datetime
+
+from services.providers.base import ProviderError
+from services.providers.rate_limit import TokenBucket
+from utils.error_handling import RateLimitError, ServiceUnavailableError
+from utils.metrics import ADMISSION_DECISIONS, STAGE_SECONDS
+
+# Upstream statuses that mean "send less", as opposed to a bad request
+OVERLOAD_STATUSES = {429, 503}
+
+# Latencies a class must record before its baseline is trusted to shrink the window
+MIN_LATENCY_SAMPLES = 5
+
+
+def retry_after_seconds(value):
+    """Parse a Retry-After header (delta seconds or HTTP date) into seconds, or None"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdmissionController:
+    """Gate in front of upstream LLM calls.
+
+    Concurrency is limited by an AIMD window: each call that finishes within
+    ``latency_tolerance`` times the baseline adds 1/limit, a slower call
+    shrinks the limit by 10% and an upstream 429/503 halves it. The baseline
+    is the median of the last ``latency_window`` latencies of the call's
+    latency class, so short calls (plans, artifact sub-requests, repairs)
+    are not compared with full generations and a single fast outlier does
+    not make every normal call look slow. Calls over the limit wait in a FIFO
+    queue of at most ``queue_size`` for up to ``queue_timeout`` seconds.
+    A token bucket paces admissions to ``rate`` per second and is held shut
+    for any Retry-After the upstream sends. Anything that cannot be admitted
+    in time fails fast with ServiceUnavailableError (503) or RateLimitError
+    (429) instead of piling onto the upstream.
+    """
+
+    def __init__(self, max_limit=100, min_limit=1, initial_limit=None, queue_size=100, queue_timeout=10.0,
+                 rate=0.0, burst=1, latency_tolerance=2.0, latency_window=100):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.limit = float(initial_limit or max_limit)
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.latency_tolerance = latency_tolerance
+        self.latency_window = latency_window
+        self.bucket = TokenBucket(rate, burst)
+        self.in_flight = 0
+        self._latencies = {}
+        self._waiters = deque()
+
+    def _reject_rate_limited(self, delay):
+        ADMISSION_DECISIONS.inc(outcome='rate_limited')
+        raise RateLimitError(
+            f"Upstream rate limit reached, retry in {math.ceil(delay)}s", retry_after=math.ceil(delay))
+
+    async def acquire(self):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.queue_timeout
+        delay = self.bucket.delay()
+        if delay > self.queue_timeout:
+            self._reject_rate_limited(delay)
+
+        if self.in_flight < int(self.limit) and not self._waiters:
+            self.in_flight += 1
+        else:
+            if len(self._waiters) >= self.queue_size:
+                ADMISSION_DECISIONS.inc(outcome='queue_full')
+                raise ServiceUnavailableError("Too many pending requests, retry later", retry_after=1)
+            waiter = loop.create_future()
+            self._waiters.append(waiter)
+            try:
+                await asyncio.wait_for(asyncio.shield(waiter), deadline - loop.time())
+            except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was handed over just as we gave up: pass it on
+                    self.in_flight -= 1
+                    self._wake()
+                else:
+                    waiter.cancel()
+                    self._waiters.remove(waiter)
+                if isinstance(e, asyncio.CancelledError):
+                    raise
+                ADMISSION_DECISIONS.inc(outcome='queue_timeout')
+                raise ServiceUnavailableError(
+                    f"Timed out after {self.queue_timeout:g}s waiting for an upstream slot", retry_after=1)
+            ADMISSION_DECISIONS.inc(outcome='queued')
+
+        delay = self.bucket.delay()
+        if delay > deadline - loop.time():
+            self.release()
+            self._reject_rate_limited(delay)
+        try:
+            await self.bucket.acquire()
+        except asyncio.CancelledError:
+            self.release()
+            raise
+        ADMISSION_DECISIONS.inc(outcome='admitted')
+
+    def release(self, latency=None, overloaded=False, retry_after=None, latency_class='default'):
+        """Free a slot, feeding the call's outcome back into the limit and the bucket"""
+        self.in_flight -= 1
+        if retry_after:
+            self.bucket.penalize(retry_after)
+        if overloaded:
+            self.limit = max(self.min_limit, self.limit / 2)
+        elif latency is not None:
+            baseline = self.baseline(latency_class)
+            samples = self._latencies.setdefault(latency_class, deque(maxlen=self.latency_window))
+            samples.append(latency)
+            if baseline is not None and latency > baseline * self.latency_tolerance:
+                self.limit = max(self.min_limit, self.limit * 0.9)
+            else:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self._wake()
+
+    def baseline(self, latency_class='default'):
+        """Median recent latency of a class, or None until it has MIN_LATENCY_SAMPLES"""
+        samples = self._latencies.get(latency_class)
+        if not samples or len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        return sorted(samples)[len(samples) // 2]
+
+    def _wake(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(True)
+
+    @asynccontextmanager
+    async def admit(self, latency_class='default'):
+        """Hold an upstream slot for the body; provider overload errors shrink the window.
+
+        The body's latency is judged against the baseline of ``latency_class``.
+        """
+        with STAGE_SECONDS.time(stage='upstream_queue'):
+            await self.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        except ProviderError as e:
+            overloaded = e.status_code in OVERLOAD_STATUSES
+            self.release(overloaded=overloaded, retry_after=retry_after_seconds(e.retry_after))
+            if overloaded:
+                retry_after = retry_after_seconds(e.retry_after)
+                error = RateLimitError if e.status_code == 429 else ServiceUnavailableError
+                raise error(str(e), retry_after=math.ceil(retry_after) if retry_after is not None else None) from e
+            raise
+        except BaseException:
+            self.release()
+            raise
+        else:
+            self.release(latency=time.perf_counter() - started, latency_class=latency_class)
+
+    def stats(self):
+        baselines = {latency_class: self.baseline(latency_class) for latency_class in sorted(self._latencies)}
+        return {
+            'limit': round(self.limit, 2),
+            'in_flight': self.in_flight,
+            'queued': len(self._waiters),
+            'baseline_latency_ms': {
+                latency_class: round(baseline * 1000, 1)
+                for latency_class, baseline in baselines.items() if baseline is not None
+            },
+            'bucket': self.bucket.stats()
+        }
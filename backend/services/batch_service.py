@@ -0,0 +1,43 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+async def run_batch(llm_service, requests, concurrency=8):
+    """Generate independent pipeline requests concurrently, yielding results as they finish.
+
+    ``requests`` is a list of conversation histories. A fixed pool of
+    ``concurrency`` workers pulls from a queue and each one calls
+    ``llm_service.generate_pipeline_config``, so items share its cache,
+    providers and connection pools. Yields (index, result, error). A failing
+    item does not stop the batch. Workers are cancelled if the consumer
+    stops early, e.g. when the client disconnects.
+    """
+    pending = asyncio.Queue()
+    for index, history in enumerate(requests):
+        pending.put_nowait((index, history))
+    finished = asyncio.Queue()
+
+    async def worker():
+        while True:
+            try:
+                index, history = pending.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                result = await llm_service.generate_pipeline_config(history)
+                await llm_service.remember_design(history, result)
+                await finished.put((index, result, None))
+            except Exception as e:
+                logger.warning("Batch item %d failed: %s", index, e)
+                await finished.put((index, None, str(e)))
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, len(requests))))]
+    try:
+        for _ in range(len(requests)):
+            yield await finished.get()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
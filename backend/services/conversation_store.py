@@ -0,0 +1,258 @@
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager, nullcontext
+
+
+class MemoryBackend:
+    """Per-process session store: an LRU of ring buffers of (role, content) tuples"""
+
+    # Operations are cheap dict work, so the store runs them on the event loop
+    blocking = False
+
+    def __init__(self):
+        self._sessions = OrderedDict()
+
+    def transaction(self):
+        return nullcontext()
+
+    def load(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def save(self, session_id, session):
+        self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+
+    def delete(self, session_id):
+        self._sessions.pop(session_id, None)
+
+    def evict(self, max_sessions, idle_before):
+        evicted = 0
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) <= max_sessions and session['touched'] >= idle_before:
+                break
+            del self._sessions[session_id]
+            evicted += 1
+        return evicted
+
+    def count(self):
+        return len(self._sessions)
+
+
+class SQLiteBackend:
+    """Session store shared by every worker process on a host.
+
+    Serves as a local stand-in for Redis: all workers pointed at the same file
+    see the same history, and it survives restarts. WAL mode lets readers
+    proceed while another process writes. Writes only happen inside
+    ``transaction()``, which takes the write lock up front (BEGIN IMMEDIATE)
+    so a read-modify-write cannot interleave with another process's.
+    """
+
+    # Calls can wait up to the 5s busy timeout, so the store runs them in a thread
+    blocking = True
+
+    def __init__(self, db_path):
+        # Autocommit mode: transactions are opened explicitly by transaction()
+        self._db = sqlite3.connect(db_path, check_same_thread=False, timeout=5, isolation_level=None)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS conversation_messages '
+            '(session_id TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT NOT NULL, content TEXT NOT NULL, '
+            'PRIMARY KEY (session_id, seq))'
+        )
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS conversation_sessions '
+            '(session_id TEXT PRIMARY KEY, touched REAL NOT NULL, config TEXT)'
+        )
+        columns = {row[1] for row in self._db.execute('PRAGMA table_info(conversation_sessions)')}
+        if 'config' not in columns:
+            self._db.execute('ALTER TABLE conversation_sessions ADD COLUMN config TEXT')
+        self._db.execute('CREATE INDEX IF NOT EXISTS idx_sessions_touched ON conversation_sessions (touched)')
+
+    @contextmanager
+    def transaction(self):
+        self._db.execute('BEGIN IMMEDIATE')
+        try:
+            yield
+        except BaseException:
+            self._db.execute('ROLLBACK')
+            raise
+        self._db.execute('COMMIT')
+
+    def load(self, session_id):
+        row = self._db.execute(
+            'SELECT touched, config FROM conversation_sessions WHERE session_id = ?', (session_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        rows = self._db.execute(
+            'SELECT role, content FROM conversation_messages WHERE session_id = ? ORDER BY seq', (session_id,)
+        ).fetchall()
+        messages = deque((role, content) for role, content in rows)
+        return {
+            'messages': messages,
+            'bytes': sum(len(content) for _, content in messages),
+            'touched': row[0],
+            'config': json.loads(row[1]) if row[1] else None
+        }
+
+    def save(self, session_id, session):
+        self._db.execute('DELETE FROM conversation_messages WHERE session_id = ?', (session_id,))
+        self._db.executemany(
+            'INSERT INTO conversation_messages (session_id, seq, role, content) VALUES (?, ?, ?, ?)',
+            [(session_id, seq, role, content) for seq, (role, content) in enumerate(session['messages'])]
+        )
+        config = session.get('config')
+        self._db.execute(
+            'INSERT OR REPLACE INTO conversation_sessions (session_id, touched, config) VALUES (?, ?, ?)',
+            (session_id, session['touched'], json.dumps(config) if config is not None else None)
+        )
+
+    def delete(self, session_id):
+        self._db.execute('DELETE FROM conversation_messages WHERE session_id = ?', (session_id,))
+        self._db.execute('DELETE FROM conversation_sessions WHERE session_id = ?', (session_id,))
+
+    def evict(self, max_sessions, idle_before):
+        stale = [row[0] for row in self._db.execute(
+            'SELECT session_id FROM conversation_sessions WHERE touched < ? OR session_id NOT IN '
+            '(SELECT session_id FROM conversation_sessions ORDER BY touched DESC LIMIT ?)',
+            (idle_before, max_sessions)
+        ).fetchall()]
+        for session_id in stale:
+            self.delete(session_id)
+        return len(stale)
+
+    def count(self):
+        return self._db.execute('SELECT COUNT(*) FROM conversation_sessions').fetchone()[0]
+
+
+class ConversationStore:
+    """Session-scoped conversation history with bounded memory.
+
+    Each session is a ring buffer capped by message count and total content
+    bytes; the oldest messages fall off first. The last accepted pipeline
+    config is kept alongside so follow-up turns can be sent as edits. Sessions
+    idle for longer than
+    ``ttl`` seconds, or beyond the ``max_sessions`` most recently used, are
+    evicted every ``evict_every`` writes (expired sessions are never served
+    in between).
+
+    Methods are coroutines; a blocking backend (SQLite) runs in a worker
+    thread so a busy database never stalls the event loop.
+    """
+
+    def __init__(self, backend=None, max_messages=20, max_bytes=64 * 1024, max_sessions=1000, ttl=3600,
+                 evict_every=100):
+        self.backend = backend or MemoryBackend()
+        self.max_messages = max_messages
+        self.max_bytes = max_bytes
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.evict_every = max(1, evict_every)
+        self._lock = threading.Lock()
+        self._evictions = 0
+        self._writes = 0
+
+    async def _run(self, fn, *args):
+        if self.backend.blocking:
+            return await asyncio.to_thread(fn, *args)
+        return fn(*args)
+
+    async def get(self, session_id):
+        """Return the session history as a list of {'role', 'content'} dicts"""
+        return await self._run(self._get, session_id)
+
+    def _get(self, session_id):
+        with self._lock:
+            session = self.backend.load(session_id)
+            if session is None or session['touched'] < time.time() - self.ttl:
+                return []
+            return [{'role': role, 'content': content} for role, content in session['messages']]
+
+    async def append(self, session_id, role, content):
+        await self._run(self._append, session_id, role, content)
+
+    def _append(self, session_id, role, content):
+        now = time.time()
+        with self._lock, self.backend.transaction():
+            session = self.backend.load(session_id)
+            if session is None or session['touched'] < now - self.ttl:
+                session = {'messages': deque(), 'bytes': 0, 'touched': now, 'config': None}
+
+            session['messages'].append((role, content))
+            session['bytes'] += len(content)
+            while len(session['messages']) > 1 and (
+                len(session['messages']) > self.max_messages or session['bytes'] > self.max_bytes
+            ):
+                _, dropped = session['messages'].popleft()
+                session['bytes'] -= len(dropped)
+            session['touched'] = now
+
+            self.backend.save(session_id, session)
+            self._writes += 1
+            if self._writes % self.evict_every == 0:
+                self._evictions += self.backend.evict(self.max_sessions, now - self.ttl)
+
+    async def get_config(self, session_id):
+        """Return the last accepted pipeline config for the session, if any"""
+        return await self._run(self._get_config, session_id)
+
+    def _get_config(self, session_id):
+        with self._lock:
+            session = self.backend.load(session_id)
+            if session is None or session['touched'] < time.time() - self.ttl:
+                return None
+            return session.get('config')
+
+    async def set_config(self, session_id, config):
+        await self._run(self._set_config, session_id, config)
+
+    def _set_config(self, session_id, config):
+        with self._lock, self.backend.transaction():
+            session = self.backend.load(session_id)
+            if session is None:
+                session = {'messages': deque(), 'bytes': 0, 'touched': time.time(), 'config': None}
+            session['config'] = config
+            self.backend.save(session_id, session)
+
+    async def clear(self, session_id):
+        await self._run(self._clear, session_id)
+
+    def _clear(self, session_id):
+        with self._lock, self.backend.transaction():
+            self.backend.delete(session_id)
+
+    async def stats(self):
+        return await self._run(self._stats)
+
+    def _stats(self):
+        with self._lock:
+            return {'sessions': self.backend.count(), 'evictions': self._evictions}
+
+
+def create_conversation_store(config):
+    """Build the ConversationStore selected by CONVERSATION_BACKEND"""
+    if config.CONVERSATION_BACKEND == 'sqlite':
+        backend = SQLiteBackend(config.CONVERSATION_DB_PATH)
+    elif config.CONVERSATION_BACKEND == 'memory':
+        backend = MemoryBackend()
+    else:
+        raise Exception(f"Unknown CONVERSATION_BACKEND: {config.CONVERSATION_BACKEND}")
+
+    return ConversationStore(
+        backend=backend,
+        max_messages=config.CONVERSATION_MAX_MESSAGES,
+        max_bytes=config.CONVERSATION_MAX_BYTES,
+        max_sessions=config.CONVERSATION_MAX_SESSIONS,
+        ttl=config.CONVERSATION_TTL_SECONDS,
+        evict_every=config.CONVERSATION_EVICT_EVERY
+    )
@@ -0,0 +1,179 @@
+"""
+Plan-then-fan-out generation.
+
+A large design is produced as one small plan completion (artifact names,
+types and wiring) followed by one concurrent completion per linked
+service, dataset and activity. The pieces are merged here, with names and
+references forced to agree with the plan, so output-token latency is
+bounded by the largest artifact rather than the whole design.
+"""
+import json
+
+PLAN_INSTRUCTIONS = """For this step, do NOT write the full design. Return only a compact plan:
+{"pipeline_name": "pl_source_to_target",
+ "linked_services": [{"name": "ls_...", "type": "<ADF linked service type>"}],
+ "datasets": [{"name": "ds_...", "type": "<ADF dataset type>", "linked_service": "ls_..."}],
+ "activities": [{"name": "CopyData", "type": "Copy", "inputs": ["ds_..."], "outputs": ["ds_..."], "depends_on": []}],
+ "explanation": "..."}
+Every dataset must name a planned linked service and every activity input/output a planned dataset."""
+
+ARTIFACT_SYSTEM_PROMPT = """You are an Azure Data Factory expert filling in one artifact of a planned pipeline.
+Return only the single JSON object requested, with no markdown and no other text.
+Use exactly the names given in the plan."""
+
+
+class PlanError(Exception):
+    """Raised when a plan reply is unusable, so the caller can fall back to single-shot generation"""
+
+
+def normalize_plan(plan):
+    """Check the plan's shape and return it with every list present"""
+    if not isinstance(plan, dict):
+        raise PlanError("Plan is not a JSON object")
+    normalized = {
+        'pipeline_name': plan.get('pipeline_name') or 'pl_pipeline',
+        'explanation': plan.get('explanation', 'Pipeline configuration generated'),
+    }
+    for key, fields in (('linked_services', ('name', 'type')),
+                        ('datasets', ('name', 'type', 'linked_service')),
+                        ('activities', ('name', 'type'))):
+        entries = plan.get(key)
+        if not isinstance(entries, list):
+            raise PlanError(f"Plan is missing '{key}'")
+        for entry in entries:
+            if not isinstance(entry, dict) or any(not isinstance(entry.get(field), str) for field in fields):
+                raise PlanError(f"Plan entry in '{key}' needs {', '.join(fields)}")
+        normalized[key] = entries
+    if not normalized['activities']:
+        raise PlanError("Plan has no activities")
+    for activity in normalized['activities']:
+        for key in ('inputs', 'outputs', 'depends_on'):
+            activity[key] = [name for name in activity.get(key) or [] if isinstance(name, str)]
+    return normalized
+
+
+def artifact_requests(plan, request_text):
+    """[(kind, plan entry, messages)] for every artifact to generate"""
+    plan_json = json.dumps(plan, separators=(',', ':'))
+    requests = []
+    for entry in plan['linked_services']:
+        instruction = (
+            f'Write the linked service "{entry["name"]}" of type {entry["type"]} as '
+            '{"name": ..., "type": "Microsoft.DataFactory/factories/linkedservices", '
+            '"properties": {"type": ..., "typeProperties": {...}}}.'
+        )
+        requests.append(('linked_service', entry, instruction))
+    for entry in plan['datasets']:
+        instruction = (
+            f'Write the dataset "{entry["name"]}" of type {entry["type"]} on linked service '
+            f'"{entry["linked_service"]}" as {{"name": ..., "type": "Microsoft.DataFactory/factories/datasets", '
+            '"properties": {"type": ..., "linkedServiceName": {"referenceName": ..., '
+            '"type": "LinkedServiceReference"}, "typeProperties": {...}}}.'
+        )
+        requests.append(('dataset', entry, instruction))
+    for entry in plan['activities']:
+        instruction = (
+            f'Write the pipeline activity "{entry["name"]}" of type {entry["type"]} reading '
+            f'{entry["inputs"]} and writing {entry["outputs"]} as {{"name": ..., "type": ..., '
+            '"inputs": [{"referenceName": ..., "type": "DatasetReference"}], "outputs": [...], '
+            '"typeProperties": {...}}.'
+        )
+        requests.append(('activity', entry, instruction))
+    return [
+        (kind, entry, [
+            {'role': 'system', 'content': ARTIFACT_SYSTEM_PROMPT},
+            {'role': 'user', 'content': f"Request:\n{request_text}\n\nPlan:\n{plan_json}\n\n{instruction}"}
+        ])
+        for kind, entry, instruction in requests
+    ]
+
+
+def _dataset_references(names):
+    return [{'referenceName': name, 'type': 'DatasetReference'} for name in names]
+
+
+def merge(plan, artifacts):
+    """Assemble the response from the plan and [(kind, plan entry, generated artifact)].
+
+    Names, linked service references, activity inputs/outputs and
+    dependsOn always come from the plan, so the pieces agree with each
+    other regardless of what each sub-request returned. Returns
+    (response, repairs) where repairs lists every field that was overridden.
+    """
+    repairs = []
+
+    def enforce(kind, target, key, value):
+        if target.get(key) != value:
+            repairs.append({'artifact': kind, 'name': plan_name, 'field': key})
+            target[key] = value
+
+    linked_services, datasets, activities = [], [], []
+    for kind, entry, artifact in artifacts:
+        plan_name = entry['name']
+        artifact = artifact if isinstance(artifact, dict) else {}
+        if kind == 'activity':
+            enforce(kind, artifact, 'name', plan_name)
+            artifact.setdefault('type', entry['type'])
+            enforce(kind, artifact, 'inputs', _dataset_references(entry['inputs']))
+            enforce(kind, artifact, 'outputs', _dataset_references(entry['outputs']))
+            if entry['depends_on']:
+                artifact['dependsOn'] = [
+                    {'activity': name, 'dependencyConditions': ['Succeeded']} for name in entry['depends_on']
+                ]
+            activities.append(artifact)
+            continue
+
+        enforce(kind, artifact, 'name', plan_name)
+        properties = artifact.setdefault('properties', {})
+        properties.setdefault('type', entry['type'])
+        properties.setdefault('typeProperties', {})
+        if kind == 'linked_service':
+            artifact.setdefault('type', 'Microsoft.DataFactory/factories/linkedservices')
+            linked_services.append(artifact)
+        else:
+            artifact.setdefault('type', 'Microsoft.DataFactory/factories/datasets')
+            enforce(kind, properties, 'linkedServiceName',
+                    {'referenceName': entry['linked_service'], 'type': 'LinkedServiceReference'})
+            datasets.append(artifact)
+
+    response = {
+        'pipeline_flow': flow_from_plan(plan),
+        'json_configs': {
+            'linked_services': linked_services,
+            'datasets': datasets,
+            'pipeline': {
+                'name': plan['pipeline_name'],
+                'type': 'Microsoft.DataFactory/factories/pipelines',
+                'properties': {'activities': activities}
+            }
+        },
+        'explanation': plan['explanation']
+    }
+    return response, repairs
+
+
+def flow_from_plan(plan):
+    """pipeline_flow nodes and edges built directly from the plan's wiring"""
+    nodes, edges = [], []
+
+    def edge(source, target, label):
+        edges.append({'id': f'edge_{len(edges) + 1}', 'source': source, 'target': target, 'label': label})
+
+    for entry in plan['linked_services']:
+        nodes.append({'id': entry['name'], 'type': 'linked_service', 'name': entry['name'],
+                      'label': f"{entry['type']} Linked Service"})
+    for entry in plan['datasets']:
+        nodes.append({'id': entry['name'], 'type': 'dataset', 'name': entry['name'],
+                      'label': f"{entry['type']} Dataset"})
+        edge(entry['linked_service'], entry['name'], 'provides connection')
+    for entry in plan['activities']:
+        node_id = f"activity_{entry['name']}"
+        nodes.append({'id': node_id, 'type': 'activity', 'name': entry['name'],
+                      'label': f"{entry['type']} Activity"})
+        for name in entry['inputs']:
+            edge(name, node_id, 'input')
+        for name in entry['outputs']:
+            edge(node_id, name, 'output')
+        for name in entry['depends_on']:
+            edge(f'activity_{name}', node_id, 'depends on')
+    return {'nodes': nodes, 'edges': edges}
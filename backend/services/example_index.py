@@ -0,0 +1,236 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+import zlib
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+logger = logging.getLogger(__name__)
+
+_TOKEN = re.compile(r'[a-z0-9]+')
+_STOPWORDS = frozenset(
+    'a an and the to from into of for in on with data me please i want need create build make pipeline'.split())
+
+
+class HashingEmbedder:
+    """Stateless bag-of-words embedder for offline, CPU-only similarity.
+
+    Unigrams and bigrams are hashed (crc32, stable across processes) into
+    ``dim`` signed buckets with sublinear term frequency, then L2-normalised,
+    so a dot product is the cosine similarity.
+    """
+
+    def __init__(self, dim=1024):
+        self.dim = dim
+
+    def _features(self, text):
+        words = [word for word in _TOKEN.findall(text.lower()) if word not in _STOPWORDS]
+        return words + [f'{first} {second}' for first, second in zip(words, words[1:])]
+
+    def embed(self, texts):
+        """Embed a batch of texts into a (len(texts), dim) float32 matrix"""
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            counts = {}
+            for feature in self._features(text):
+                digest = zlib.crc32(feature.encode('utf-8'))
+                bucket = digest % self.dim
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                counts[bucket] = counts.get(bucket, 0.0) + sign
+            for bucket, count in counts.items():
+                matrix[row, bucket] = math.copysign(1.0 + math.log(abs(count)), count) if count else 0.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        np.divide(matrix, norms, out=matrix, where=norms > 0)
+        return matrix
+
+
+class ExampleIndex:
+    """Embedding index of accepted pipeline designs, searched by cosine similarity.
+
+    Vectors live in a float32 matrix that grows by doubling. With ``path``
+    the matrix is a memory-mapped ``<path>.npy`` and the designs are appended
+    to ``<path>.jsonl``, read back by offset only for search hits; without
+    it everything stays in memory. One process owns a given path: it holds
+    an exclusive lock on ``<path>.lock``, and any other process that finds the
+    lock taken keeps its index in memory instead.
+    """
+
+    BLOCK_ROWS = 8192
+
+    def __init__(self, embedder, path=None, initial_capacity=256, duplicate_threshold=0.98):
+        self.embedder = embedder
+        self.path = path
+        self.duplicate_threshold = duplicate_threshold
+        self._lock = threading.Lock()
+        self._count = 0
+        self._offsets = []
+        self._records = []
+        self._stats = {'searches': 0, 'hits': 0, 'added': 0, 'duplicates': 0}
+        self._lock_file = None
+        if path and not self._claim(path):
+            logger.warning("Example index %s is owned by another process; keeping this one in memory", path)
+            self.path = path = None
+        if path:
+            self._open(initial_capacity)
+        else:
+            self._matrix = np.zeros((initial_capacity, embedder.dim), dtype=np.float32)
+
+    def _claim(self, path):
+        """Take the path's owner lock; False if another process holds it"""
+        if fcntl is None:
+            return True
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        lock_file = open(path + '.lock', 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            return False
+        self._lock_file = lock_file
+        return True
+
+    def _open(self, initial_capacity):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        records_path = self.path + '.jsonl'
+        texts = []
+        if os.path.exists(records_path):
+            with open(records_path, 'rb') as records:
+                offset = 0
+                for line in records:
+                    if line.strip():
+                        self._offsets.append(offset)
+                        texts.append(json.loads(line)['text'])
+                    offset += len(line)
+
+        matrix_path = self.path + '.npy'
+        capacity = max(initial_capacity, len(texts))
+        self._matrix = None
+        if os.path.exists(matrix_path):
+            matrix = np.load(matrix_path, mmap_mode='r+')
+            if matrix.ndim == 2 and matrix.shape[1] == self.embedder.dim and matrix.shape[0] >= len(texts):
+                self._matrix = matrix
+            else:
+                logger.warning("Example index %s does not match the embedder; re-embedding %d designs",
+                               matrix_path, len(texts))
+                del matrix
+        if self._matrix is None:
+            self._matrix = np.lib.format.open_memmap(
+                matrix_path, mode='w+', dtype=np.float32, shape=(capacity, self.embedder.dim))
+            if texts:
+                self._matrix[:len(texts)] = self.embedder.embed(texts)
+                self._matrix.flush()
+        self._count = len(texts)
+
+    def _grow(self):
+        capacity = self._matrix.shape[0] * 2
+        if not self.path:
+            grown = np.zeros((capacity, self.embedder.dim), dtype=np.float32)
+            grown[:self._count] = self._matrix[:self._count]
+            self._matrix = grown
+            return
+        matrix_path = self.path + '.npy'
+        tmp_path = self.path + '.tmp.npy'
+        grown = np.lib.format.open_memmap(tmp_path, mode='w+', dtype=np.float32,
+                                          shape=(capacity, self.embedder.dim))
+        grown[:self._count] = self._matrix[:self._count]
+        grown.flush()
+        del grown
+        self._matrix = None
+        os.replace(tmp_path, matrix_path)
+        self._matrix = np.load(matrix_path, mmap_mode='r+')
+
+    def _scores(self, queries):
+        """(len(queries), count) cosine scores, scanning the matrix in row blocks"""
+        scores = np.empty((queries.shape[0], self._count), dtype=np.float32)
+        for start in range(0, self._count, self.BLOCK_ROWS):
+            end = min(start + self.BLOCK_ROWS, self._count)
+            scores[:, start:end] = queries @ self._matrix[start:end].T
+        return scores
+
+    def _record(self, row):
+        if not self.path:
+            return self._records[row]
+        with open(self.path + '.jsonl', 'rb') as records:
+            records.seek(self._offsets[row])
+            return json.loads(records.readline())
+
+    def add(self, text, design):
+        """Index an accepted design under the request text; near-duplicates are skipped"""
+        vector = self.embedder.embed([text])
+        with self._lock:
+            if self._count and float(self._scores(vector).max()) >= self.duplicate_threshold:
+                self._stats['duplicates'] += 1
+                return False
+            if self._count == self._matrix.shape[0]:
+                self._grow()
+            record = {'text': text, 'design': design}
+            if self.path:
+                line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+                with open(self.path + '.jsonl', 'ab') as records:
+                    self._offsets.append(records.tell())
+                    records.write(line)
+                self._matrix[self._count] = vector[0]
+                self._matrix.flush()
+            else:
+                self._records.append(record)
+                self._matrix[self._count] = vector[0]
+            self._count += 1
+            self._stats['added'] += 1
+            return True
+
+    def search_batch(self, texts, k=2, min_score=0.0):
+        """Top-k [(score, record)] per query text, best first"""
+        queries = self.embedder.embed(texts)
+        with self._lock:
+            self._stats['searches'] += len(texts)
+            if not self._count:
+                return [[] for _ in texts]
+            scores = self._scores(queries)
+            k = min(k, self._count)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            results = []
+            for row, candidates in enumerate(top):
+                ranked = sorted(candidates, key=lambda column: -scores[row, column])
+                hits = [(float(scores[row, column]), self._record(column))
+                        for column in ranked if scores[row, column] >= min_score]
+                self._stats['hits'] += len(hits)
+                results.append(hits)
+            return results
+
+    def search(self, text, k=2, min_score=0.0):
+        return self.search_batch([text], k, min_score)[0]
+
+    def stats(self):
+        with self._lock:
+            return {
+                **self._stats,
+                'size': self._count,
+                'capacity': int(self._matrix.shape[0]),
+                'dim': self.embedder.dim,
+                'persistent': bool(self.path)
+            }
+
+
+def create_example_index(config):
+    """Build the ExampleIndex for RETRIEVAL_* settings, or None when disabled or NumPy is missing"""
+    if not config.RETRIEVAL_ENABLED:
+        return None
+    if np is None:
+        logger.warning("Few-shot retrieval disabled: numpy is not installed")
+        return None
+    return ExampleIndex(HashingEmbedder(config.RETRIEVAL_DIM), path=config.RETRIEVAL_INDEX_PATH or None)
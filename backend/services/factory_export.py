@@ -0,0 +1,274 @@
+"""
+Export generated designs as a deployable Data Factory bundle.
+
+Artifacts from one or more designs are merged into a dependency graph
+(dataset -> linked service, pipeline -> dataset/linked service/pipeline),
+ordered topologically and written as an ARM template and/or a factory
+folder (the layout ADF git integration uses), streamed as a zip.
+"""
+import heapq
+import json
+import zipfile
+from collections import defaultdict
+
+from jsonschema import Draft7Validator
+
+from utils.json_validator import NAME_SCHEMA
+
+ARM_API_VERSION = '2018-06-01'
+
+# kind -> (json_configs key, ARM resource type segment, factory folder, sort rank)
+KINDS = {
+    'linked_service': ('linked_services', 'linkedServices', 'linkedService', 0),
+    'dataset': ('datasets', 'datasets', 'dataset', 1),
+    'pipeline': ('pipeline', 'pipelines', 'pipeline', 2),
+}
+REFERENCE_KINDS = {
+    'LinkedServiceReference': 'linked_service',
+    'DatasetReference': 'dataset',
+    'PipelineReference': 'pipeline',
+}
+NAME_VALIDATOR = Draft7Validator(NAME_SCHEMA)
+
+
+class ExportError(Exception):
+    """Raised when the merged artifacts cannot be deployed (invalid names, dangling references or cycles)"""
+
+    def __init__(self, message, problems):
+        super().__init__(message)
+        self.problems = problems
+
+
+def valid_name(name):
+    """True if ``name`` is safe as a zip entry name and inside an ARM expression"""
+    # The schema pattern's $ also matches before a trailing newline
+    return NAME_VALIDATOR.is_valid(name) and '\n' not in name
+
+
+def _references(artifact):
+    """Yield (kind, name) for every *Reference object inside an artifact, iteratively"""
+    stack = [artifact.get('properties', {})]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            kind = REFERENCE_KINDS.get(value.get('type'))
+            if kind and isinstance(value.get('referenceName'), str):
+                yield kind, value['referenceName']
+            stack.extend(value.values())
+        elif isinstance(value, list):
+            stack.extend(value)
+
+
+class ArtifactGraph:
+    """Merged artifacts and their dependency edges, keyed by (kind, name)"""
+
+    def __init__(self):
+        self.artifacts = {}
+        self.dependencies = {}
+        self.conflicts = []
+
+    @classmethod
+    def from_designs(cls, designs):
+        """Merge json_configs dicts in order; a later artifact with the same kind and name replaces the earlier one.
+
+        Raises ExportError if any artifact name does not match NAME_SCHEMA,
+        since names become zip paths and parts of ARM expressions.
+        """
+        graph = cls()
+        invalid = []
+        for design in designs:
+            for kind, (key, _, _, _) in KINDS.items():
+                artifacts = design.get(key) or []
+                if isinstance(artifacts, dict):
+                    artifacts = [artifacts]
+                for artifact in artifacts:
+                    if not isinstance(artifact, dict) or not artifact.get('name'):
+                        continue
+                    if valid_name(artifact['name']):
+                        graph.add(kind, artifact)
+                    else:
+                        invalid.append({'artifact': kind, 'name': artifact['name']})
+        if invalid:
+            raise ExportError("Artifact names must match " + NAME_SCHEMA['pattern'], {'invalid_names': invalid})
+        return graph
+
+    def add(self, kind, artifact):
+        node = (kind, artifact['name'])
+        previous = self.artifacts.get(node)
+        if previous is not None and previous != artifact:
+            self.conflicts.append({'artifact': kind, 'name': artifact['name']})
+        self.artifacts[node] = artifact
+        self.dependencies[node] = {ref for ref in _references(artifact) if ref != node}
+
+    def dangling(self):
+        """References to artifacts that are not part of the graph"""
+        return [
+            {'artifact': kind, 'name': name, 'reference': ref_name, 'reference_type': ref_kind}
+            for (kind, name), refs in self.dependencies.items()
+            for ref_kind, ref_name in sorted(refs)
+            if (ref_kind, ref_name) not in self.artifacts
+        ]
+
+    def order(self):
+        """Dependencies first (Kahn's algorithm); returns (ordered nodes, nodes left on cycles)"""
+        dependents = defaultdict(list)
+        remaining = {}
+        for node, refs in self.dependencies.items():
+            known = [ref for ref in refs if ref in self.artifacts]
+            remaining[node] = len(known)
+            for ref in known:
+                dependents[ref].append(node)
+
+        def rank(node):
+            return (KINDS[node[0]][3], node[1], node[0])
+
+        ready = [(rank(node), node) for node, count in remaining.items() if count == 0]
+        heapq.heapify(ready)
+        ordered = []
+        while ready:
+            _, node = heapq.heappop(ready)
+            ordered.append(node)
+            for dependent in dependents[node]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    heapq.heappush(ready, (rank(dependent), dependent))
+        placed = set(ordered)
+        return ordered, [node for node in self.dependencies if node not in placed]
+
+    def find_cycle(self, nodes):
+        """One dependency cycle among ``nodes`` as a list of (kind, name), via iterative DFS"""
+        candidates = set(nodes)
+        state = {}
+        for start in nodes:
+            if start in state:
+                continue
+            path = [start]
+            state[start] = 'open'
+            iterators = [iter(sorted(self.dependencies[start] & candidates))]
+            while iterators:
+                ref = next(iterators[-1], None)
+                if ref is None:
+                    state[path.pop()] = 'done'
+                    iterators.pop()
+                elif state.get(ref) == 'open':
+                    return path[path.index(ref):] + [ref]
+                elif ref not in state:
+                    state[ref] = 'open'
+                    path.append(ref)
+                    iterators.append(iter(sorted(self.dependencies[ref] & candidates)))
+        return []
+
+    def plan(self):
+        """{'order', 'dangling', 'cycles', 'conflicts'} for the merged artifacts"""
+        ordered, cyclic = self.order()
+        cycles = []
+        if cyclic:
+            cycle = self.find_cycle(cyclic)
+            cycles.append([{'artifact': kind, 'name': name} for kind, name in cycle])
+        return {
+            'order': [{'artifact': kind, 'name': name} for kind, name in ordered],
+            'dangling': self.dangling(),
+            'cycles': cycles,
+            'conflicts': self.conflicts,
+            'artifacts': len(self.artifacts)
+        }
+
+    def deployment_order(self):
+        """Topological order, raising ExportError if the bundle could not deploy"""
+        plan = self.plan()
+        if plan['dangling'] or plan['cycles']:
+            raise ExportError("Artifacts have dangling references or dependency cycles", plan)
+        return [(entry['artifact'], entry['name']) for entry in plan['order']]
+
+
+def _arm_string(value):
+    """Quote ``value`` as a string literal inside an ARM template expression"""
+    return "'" + value.replace("'", "''") + "'"
+
+
+def _resource_id(kind, name):
+    segment = KINDS[kind][1]
+    return f"[concat(variables('factoryId'), {_arm_string(f'/{segment}/{name}')})]"
+
+
+def _arm_resource(graph, kind, name):
+    return {
+        'name': f"[concat(parameters('factoryName'), {_arm_string('/' + name)})]",
+        'type': f"Microsoft.DataFactory/factories/{KINDS[kind][1]}",
+        'apiVersion': ARM_API_VERSION,
+        'properties': graph.artifacts[(kind, name)].get('properties', {}),
+        'dependsOn': [_resource_id(ref_kind, ref_name)
+                      for ref_kind, ref_name in sorted(graph.dependencies[(kind, name)])]
+    }
+
+
+def _arm_header():
+    return {
+        '$schema': 'http://schema.management.azure.com/schemas/2015-01-01/deploymentTemplate.json#',
+        'contentVersion': '1.0.0.0',
+        'parameters': {'factoryName': {'type': 'string', 'metadata': 'Data Factory name'}},
+        'variables': {'factoryId': "[concat('Microsoft.DataFactory/factories/', parameters('factoryName'))]"}
+    }
+
+
+def arm_template(graph, order):
+    """ARM deployment template with resources in dependency order and explicit dependsOn"""
+    return {**_arm_header(), 'resources': [_arm_resource(graph, kind, name) for kind, name in order]}
+
+
+class _ZipStream:
+    """Write-only file object that hands zip output back in chunks"""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+        self.buffered = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        self.buffered += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        self.buffered = 0
+        return data
+
+
+def stream_zip(graph, order, factory_name, fmt='both', chunk_bytes=64 * 1024):
+    """Yield the export zip in chunks; memory stays bounded by ``chunk_bytes`` plus one artifact"""
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        if fmt in ('folder', 'both'):
+            for kind, name in order:
+                artifact = graph.artifacts[(kind, name)]
+                document = {'name': name, 'properties': artifact.get('properties', {})}
+                archive.writestr(f"factory/{KINDS[kind][2]}/{name}.json", json.dumps(document, indent=4))
+                if stream.buffered >= chunk_bytes:
+                    yield stream.drain()
+
+        if fmt in ('arm', 'both'):
+            # Written one resource per line so the template is never held in memory whole
+            with archive.open('arm/ARMTemplateForFactory.json', 'w') as template:
+                template.write(json.dumps(_arm_header())[:-1].encode('utf-8') + b', "resources": [\n')
+                for index, (kind, name) in enumerate(order):
+                    line = json.dumps(_arm_resource(graph, kind, name))
+                    template.write(((',\n' if index else '') + line).encode('utf-8'))
+                    if stream.buffered >= chunk_bytes:
+                        yield stream.drain()
+                template.write(b'\n]}\n')
+            parameters = {
+                '$schema': 'https://schema.management.azure.com/schemas/2015-01-01/deploymentParameters.json#',
+                'contentVersion': '1.0.0.0',
+                'parameters': {'factoryName': {'value': factory_name}}
+            }
+            archive.writestr('arm/ARMTemplateParametersForFactory.json', json.dumps(parameters, indent=4))
+    yield stream.drain()
@@ -1,22 +1,96 @@
 from unittest import result
-import requests
+import asyncio
 import json
+import logging
+import threading
+import time
 from config.config import Config 
+from services.admission import AdmissionController
+from services.decomposition import PLAN_INSTRUCTIONS, artifact_requests, merge, normalize_plan
+from services.example_index import create_example_index
+from services.factory_export import KINDS, ArtifactGraph
+from services.prompt_builder import PromptBuilder, count_tokens
+from services.providers import create_router
+from services.response_cache import ResponseCache
+from services.single_flight import SingleFlight
+from services.template_engine import TemplateEngine
+from utils.graph_layout import FlowLayout
+from utils.incremental_json import IncrementalJSONParser
+from utils.json_extractor import extract_json
+from utils.json_patch import JSONPatchError, apply_patch, resolve_pointer
+from utils.json_validator import RESPONSE_SCHEMA, JSONValidator
+from utils.logging_config import sample_payload
+from utils.error_handling import APIError, RateLimitError, ServiceUnavailableError
+from utils.metrics import CACHE_REQUESTS, PROMPT_TOKENS, REPAIRS, STAGE_SECONDS, TEMPLATE_REQUESTS
 import re 
 
+logger = logging.getLogger(__name__)
+
+# Streamed artifacts, keyed by their path in the response object
+STREAM_EVENTS = {
+    ('pipeline_flow', 'nodes', '*'): 'node',
+    ('pipeline_flow', 'edges', '*'): 'edge',
+    ('json_configs', 'linked_services', '*'): 'linked_service',
+    ('json_configs', 'datasets', '*'): 'dataset',
+    ('json_configs', 'pipeline'): 'pipeline',
+}
+
+# Appended to the system prompt on follow-up turns so the model returns a delta
+PATCH_INSTRUCTIONS = """The user is refining the existing design shown below. Do not regenerate it. Respond with a JSON Patch (RFC 6902) against it:
+{"patch": [{"op": "add", "path": "/json_configs/datasets/-", "value": {...}}], "explanation": "..."}
+Paths start at /pipeline_flow or /json_configs of the current design. Only include operations for what changes. If the user asks for an unrelated new pipeline, return the full response format instead.
+
+Current design:
+"""
+
+# Repair turns see one failing artifact and its validator errors, never the original prompt
+REPAIR_SYSTEM_PROMPT = """You are an Azure Data Factory expert fixing one artifact that failed schema validation.
+Return only the corrected JSON object, with no markdown and no other text.
+Keep its name and its references to other artifacts unless an error is about them."""
+
+# Constrained output for replies that are not a full design (plans, artifacts, repairs)
+OBJECT_SCHEMA = {'type': 'object'}
+
+# ARM resource type of each artifact kind, which a repaired fragment must keep
+ARTIFACT_TYPES = {
+    'linked_service': 'Microsoft.DataFactory/factories/linkedservices',
+    'dataset': 'Microsoft.DataFactory/factories/datasets',
+    'pipeline': 'Microsoft.DataFactory/factories/pipelines',
+}
+
 class LLMService:
     def __init__(self):
-        self.use_perplexity = Config.USE_PERPLEXITY
-        self.perplexity_url = Config.PERPLEXITY_URL
-        self.api_key = Config.PERPLEXITY_API_KEY
-        self.model = Config.PERPLEXITY_MODEL
+        # Providers (Perplexity, Ollama, mock) behind a latency/error-aware router
+        self.router = create_router(Config)
+        self.model = self.router.model_id
+        self.followup_provider = Config.LLM_FOLLOWUP_PROVIDER or None
+
+        self.admission = AdmissionController(
+            max_limit=Config.LLM_MAX_CONCURRENCY,
+            min_limit=Config.ADMISSION_MIN_CONCURRENCY,
+            queue_size=Config.ADMISSION_QUEUE_SIZE,
+            queue_timeout=Config.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+            rate=Config.ADMISSION_RATE,
+            burst=Config.ADMISSION_BURST,
+            latency_tolerance=Config.ADMISSION_LATENCY_TOLERANCE,
+            latency_window=Config.ADMISSION_LATENCY_WINDOW
+        )
+
+        # Identical prompts in flight at the same time share one upstream call
+        self.single_flight = SingleFlight()
 
-        # self.use_ollama = Config.USE_OLLAMA
-        # self.ollama_url = Config.OLLAMA_URL
-        # self.model = Config.OLLAMA_MODEL
+        self.templates = TemplateEngine() if Config.TEMPLATES_ENABLED else None
+        self.examples = create_example_index(Config)
+        self.layout = FlowLayout(Config.LAYOUT_CACHE_SIZE) if Config.LAYOUT_ENABLED else None
 
-        if not self.api_key:
-            raise Exception("PERPLEXITY_API_KEY environment variable not set")
+        self.cache = None
+        if Config.CACHE_ENABLED:
+            self.cache = ResponseCache(
+                max_entries=Config.CACHE_MAX_ENTRIES,
+                max_bytes=Config.CACHE_MAX_BYTES,
+                ttl=Config.CACHE_TTL_SECONDS,
+                db_path=Config.CACHE_DB_PATH or None
+            )
         
         self.system_prompt = """You are an Azure Data Factory pipeline expert. Your task is to:
 1. Interpret user requests for data pipelines
@@ -134,150 +208,573 @@ Response format:
 
 Always respond with valid JSON in the exact format above. Never include markdown code blocks. Just return the JSON object."""
 
-    def generate_pipeline_config(self, conversation_history):
+        self.prompt_builder = PromptBuilder(
+            self.system_prompt,
+            token_budget=Config.PROMPT_TOKEN_BUDGET,
+            summary_tokens=Config.PROMPT_SUMMARY_TOKENS
+        )
+
+    async def warm_up(self):
+        """Pay the first request's one-off costs up front; returns a summary for the readiness probe.
+
+        Validators, the tokenizer and the layout engine are exercised on a
+        stock design, and upstream connections are opened in the pool.
+        """
+        started = time.perf_counter()
+        sample = TemplateEngine().generate('copy from sql server to blob storage')
+        self._validate_and_clean_response(sample)
+        count_tokens(self.system_prompt)
+        connections = await self.router.warm_up(Config.WARMUP_CONNECTIONS)
+        return {'connections': connections, 'latency_ms': round((time.perf_counter() - started) * 1000, 1)}
+
+    async def close(self):
+        await self.router.close()
+
+    def _preferred_provider(self, messages):
+        """Route follow-up turns to the configured follow-up provider, if any"""
+        if self.followup_provider and sum(1 for msg in messages if msg['role'] == 'user') > 1:
+            return self.followup_provider
+        return None
+
+    async def generate_pipeline_config(self, conversation_history, previous_config=None, decompose=None):
+        """Generate a pipeline for the conversation.
+
+        With ``previous_config`` (the session's last design) the model is asked
+        for a JSON Patch against it, which is applied and validated here; the
+        result carries both the merged design and the ``patch``. Otherwise
+        ``decompose`` (default DECOMPOSED_GENERATION) plans first and generates
+        each artifact in a concurrent sub-request.
+        """
         try:
-            # Prepare conversation history
-            recent_messages = conversation_history[-10:] if len(conversation_history) > 10 else conversation_history
-            messages = self._format_conversation(recent_messages)
-            with open('prompt.txt', 'w') as log_file:
-                log_file.write(f"{messages}\n")
-            return self._call_perplexity_api(messages)
+            base_config = previous_config if Config.INCREMENTAL_EDITS_ENABLED and previous_config else None
+            context = None
+            if base_config is not None:
+                context = PATCH_INSTRUCTIONS + json.dumps(self._prompt_design(base_config), separators=(',', ':'))
+                if not self.prompt_builder.fits(conversation_history, context):
+                    # Never squeeze the user's request out to make room for the design
+                    logger.info("Current design does not fit the prompt budget; regenerating the full design")
+                    base_config, context = None, None
+            if base_config is None:
+                templated = self._match_template(conversation_history)
+                if templated is not None:
+                    return templated
+
+            if decompose is None:
+                decompose = Config.DECOMPOSED_GENERATION
+            decompose = decompose and base_config is None
+            model_key = self.model + (':decomposed' if decompose else '')
+
+            # Prepare conversation history within the prompt token budget
+            messages, prompt_stats = self._format_conversation(conversation_history, context)
+            logger.debug("Prompt assembled", extra={'prompt': sample_payload(messages), **prompt_stats})
+
+            cache_key = None
+            if self.cache is not None:
+                cache_key = ResponseCache.make_key(self._key_messages(conversation_history, context), model_key)
+                cached = self.cache.get(cache_key)
+                if cached is not None:
+                    logger.info("Serving pipeline config from response cache")
+                    CACHE_REQUESTS.inc(outcome='hit')
+                    cached['metadata'] = {**prompt_stats, 'cache_hit': True}
+                    return cached
+                CACHE_REQUESTS.inc(outcome='miss')
+
+            async def generate():
+                try:
+                    if decompose:
+                        result, provider = await self._generate_decomposed(conversation_history, messages)
+                    else:
+                        result, provider = await self._call_llm(messages, base_config)
+                except JSONPatchError as e:
+                    logger.warning("Patch reply could not be applied (%s); regenerating the full design", e)
+                    full_messages, _ = self._format_conversation(conversation_history)
+                    result, provider = await self._call_llm(full_messages)
+                # Invalid designs are returned but not cached, so the next request retries upstream
+                if cache_key is not None and result['validation']['valid']:
+                    self.cache.set(cache_key, result)
+                return result, provider
+
+            (result, provider), coalesced = await self.single_flight.do(
+                self._flight_key(self._key_messages(conversation_history, context), model_key), generate)
+            if coalesced:
+                CACHE_REQUESTS.inc(outcome='coalesced')
+            result['metadata'] = {
+                **prompt_stats,
+                'cache_hit': False,
+                'provider': provider,
+                'coalesced': coalesced,
+                'mode': 'patch' if 'patch' in result else 'decomposed' if 'decomposition' in result else 'full'
+            }
+            return result
                 
+        except APIError:
+            raise
         except Exception as e:
             raise Exception(f"Error generating pipeline config: {str(e)}")
-    
-    def _format_conversation(self, messages):
-        # Format conversation for Perplexity API
-        formatted_messages = [
-            {"role": "system", "content": self.system_prompt}
+
+    def _prompt_design(self, design):
+        """The design as shown to the model: node positions are recomputed server-side, so leave them out"""
+        flow = design.get('pipeline_flow', {})
+        nodes = [{key: value for key, value in node.items() if key != 'position'} for node in flow.get('nodes', [])]
+        return {**design, 'pipeline_flow': {**flow, 'nodes': nodes}}
+
+    def _match_template(self, conversation_history):
+        """Build the response locally when the conversation is a single stock copy request"""
+        if self.templates is None:
+            return None
+        user_turns = [msg['content'] for msg in conversation_history if msg['role'] == 'user']
+        if len(user_turns) != 1:
+            return None
+
+        with STAGE_SECONDS.time(stage='template'):
+            result = self.templates.generate(user_turns[0])
+        TEMPLATE_REQUESTS.inc(outcome='miss' if result is None else 'hit')
+        if result is None:
+            return None
+
+        logger.info("Serving pipeline config from template")
+        result = self._validate_and_clean_response(result)
+        result['metadata'] = {'cache_hit': False, 'provider': 'template', 'coalesced': False, 'mode': 'full'}
+        return result
+
+    def _request_text(self, conversation_history):
+        return '\n'.join(msg['content'] for msg in conversation_history if msg['role'] == 'user')
+
+    async def remember_design(self, conversation_history, result):
+        """Index a design the user was given, if it validated, as a future few-shot example.
+
+        Embedding, the duplicate scan and the index file writes run in a
+        worker thread so they never hold up the event loop.
+        """
+        if self.examples is None or not result.get('validation', {}).get('valid'):
+            return
+        design = {'pipeline_flow': result['pipeline_flow'], 'json_configs': result['json_configs']}
+        await asyncio.to_thread(self.examples.add, self._request_text(conversation_history), design)
+
+    def _few_shot_context(self, conversation_history):
+        """Most similar accepted designs, formatted for the system message, within RETRIEVAL_MAX_TOKENS"""
+        if self.examples is None:
+            return None
+        with STAGE_SECONDS.time(stage='retrieval'):
+            hits = self.examples.search(
+                self._request_text(conversation_history),
+                k=Config.RETRIEVAL_TOP_K,
+                min_score=Config.RETRIEVAL_MIN_SCORE
+            )
+        sections = []
+        budget = Config.RETRIEVAL_MAX_TOKENS
+        for _, record in hits:
+            section = f"Request: {record['text']}\nResponse: {json.dumps(record['design'], separators=(',', ':'))}"
+            tokens = count_tokens(section)
+            if tokens > budget:
+                continue
+            budget -= tokens
+            sections.append(section)
+        if not sections:
+            return None
+        return 'Designs accepted for similar requests:\n\n' + '\n\n'.join(sections)
+
+    def _key_messages(self, conversation_history, context=None):
+        """What a response depends on, for cache and coalescing keys.
+
+        Retrieved few-shot examples are left out: they change as the index
+        grows, and must not turn a repeated request into a cache miss.
+        """
+        system = self.system_prompt + ('\n\n' + context if context else '')
+        return [{'role': 'system', 'content': system}] + [
+            {'role': msg['role'], 'content': msg['content']}
+            for msg in conversation_history if msg['role'] in ('user', 'assistant')
         ]
-        
-        # Convert messages to Perplexity format
-        for msg in messages:
-            if msg['role'] == 'user':
-                formatted_messages.append({"role": "user", "content": msg['content']})
-            elif msg['role'] == 'assistant':
-                formatted_messages.append({"role": "assistant", "content": msg['content']})
-        
-        return formatted_messages
-    
-    def _call_perplexity_api(self, messages):
+
+    def _flight_key(self, messages, model_key=None):
+        """Coalescing key: the prompt with whitespace normalized, plus the model set"""
+        normalized = [{'role': msg['role'], 'content': ' '.join(msg['content'].split())} for msg in messages]
+        return ResponseCache.make_key(normalized, model_key or self.model)
+
+    async def _generate_decomposed(self, conversation_history, full_messages):
+        """Plan, then generate every artifact concurrently and merge; returns (validated result, provider).
+
+        At most DECOMPOSED_CONCURRENCY sub-requests are in flight at once, so
+        a large plan cannot flood the shared admission queue. An unusable
+        plan, a failed sub-request or an admission rejection falls back to one
+        full completion of ``full_messages``.
+        """
         try:
-            headers = {
-                "Authorization": f"Bearer {self.api_key}",
-                "Content-Type": "application/json"
-            }
-            
-            payload = {
-                "model": self.model,
-                "messages": messages
-            }
-            
-            print(f"Sending request to Perplexity: {self.perplexity_url}")
-            print(f"Model: {self.model}")
-            print(f"Messages count: {len(messages)}")
-            
-            response = requests.post(
-                self.perplexity_url, 
-                headers=headers, 
-                json=payload, 
-                timeout=12000
-            )
-            
-            print(f"Response status: {response.status_code}")
-            
-            if response.status_code == 200:
-                try:
-                    result = response.json()
-                    print(f"Raw response received")
-                    
-                    # Extract content from Perplexity response
-                    response_content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
-                    
-                    if not response_content:
-                        raise Exception("Empty response from Perplexity")
-                    
-                    print(f"Response content: {response_content[:200]}...")
-                    
-                    # Try to parse the JSON response
-                    try:
-                        # Look for JSON object in the response
-                        start = response_content.find('{')
-                        end = response_content.rfind('}') + 1
-                        if start != -1 and end > start:
-                            json_str = response_content[start:end]
-                            parsed_json = json.loads(json_str)
-                            print("Successfully parsed JSON response")
-                            return self._validate_and_clean_response(parsed_json)
-                        else:
-                            raise Exception("No valid JSON structure found in response")
-                    except json.JSONDecodeError as e:
-                        print(f"JSON parsing error: {e}")
-                        # Try to clean and parse
-                        cleaned_response = self._clean_json_response(response_content)
-                        if cleaned_response:
-                            return self._validate_and_clean_response(cleaned_response)
-                        else:
-                            raise Exception(f"Failed to parse JSON response: {response_content[:200]}")
-                            
-                except json.JSONDecodeError as e:
-                    raise Exception(f"Invalid JSON response from Perplexity: {e}")
-                except (KeyError, IndexError) as e:
-                    raise Exception(f"Unexpected response format from Perplexity: {e}")
+            plan_messages, _ = self._format_conversation(conversation_history, PLAN_INSTRUCTIONS)
+            plan_reply, provider = await self._complete_json(plan_messages, OBJECT_SCHEMA, latency_class='plan')
+            plan = normalize_plan(plan_reply)
+
+            requests = artifact_requests(plan, self._request_text(conversation_history))
+            slots = asyncio.Semaphore(max(1, Config.DECOMPOSED_CONCURRENCY))
+
+            async def generate_artifact(messages):
+                async with slots:
+                    return await self._complete_json(messages, OBJECT_SCHEMA, latency_class='artifact')
+
+            tasks = [asyncio.create_task(generate_artifact(messages)) for _, _, messages in requests]
+            try:
+                replies = await asyncio.gather(*tasks)
+            except BaseException:
+                for task in tasks:
+                    task.cancel()
+                # Let cancelled sub-requests give back their admission slots before any fallback call
+                await asyncio.gather(*tasks, return_exceptions=True)
+                raise
+        except (RateLimitError, ServiceUnavailableError) as e:
+            logger.warning("Decomposed generation was not admitted (%s); generating the full design in one call", e)
+            return await self._call_llm(full_messages)
+        except APIError:
+            raise
+        except Exception as e:
+            logger.warning("Decomposed generation failed (%s); generating the full design in one call", e)
+            return await self._call_llm(full_messages)
+
+        response, repairs = merge(plan, [
+            (kind, entry, reply) for (kind, entry, _), (reply, _) in zip(requests, replies)
+        ])
+        result = self._validate_and_clean_response(response)
+        self._check_references(result)
+        result['decomposition'] = {'artifacts': len(requests), 'repairs': repairs}
+        await self._repair(result, self._request_text(conversation_history), check_references=True)
+        return result, provider
+
+    def _check_references(self, result):
+        """Add references to artifacts missing from the design to the validation errors"""
+        configs = result['json_configs']
+        for dangling in ArtifactGraph.from_designs([configs]).dangling():
+            key = KINDS[dangling['artifact']][0]
+            if key == 'pipeline':
+                pointer = '/json_configs/pipeline'
             else:
-                error_text = response.text
-                raise Exception(f"Perplexity API error {response.status_code}: {error_text}")
+                index = next(i for i, artifact in enumerate(configs[key]) if artifact.get('name') == dangling['name'])
+                pointer = f'/json_configs/{key}/{index}'
+            result['validation']['errors'].append({
+                'artifact': dangling['artifact'],
+                'name': dangling['name'],
+                'pointer': pointer,
+                'message': f"references unknown {dangling['reference_type']} '{dangling['reference']}'"
+            })
+            result['validation']['valid'] = False
+    
+    async def stream_pipeline_config(self, conversation_history):
+        """Yield (event, data) pairs as pipeline artifacts complete, then the validated result"""
+        templated = self._match_template(conversation_history)
+        if templated is not None:
+            for event in self._replay_events(templated):
+                yield event
+            yield 'result', templated
+            return
+
+        messages, prompt_stats = self._format_conversation(conversation_history)
+
+        cache_key = None
+        if self.cache is not None:
+            cache_key = ResponseCache.make_key(self._key_messages(conversation_history), self.model)
+            cached = self.cache.get(cache_key)
+            CACHE_REQUESTS.inc(outcome='hit' if cached is not None else 'miss')
+            if cached is not None:
+                for event in self._replay_events(cached):
+                    yield event
+                cached['metadata'] = {**prompt_stats, 'cache_hit': True}
+                yield 'result', cached
+                return
+
+        parser = IncrementalJSONParser(STREAM_EVENTS.keys())
+        async for delta in self._stream_llm(messages, self._json_schema(RESPONSE_SCHEMA)):
+            for path, value in parser.feed(delta):
+                yield self._stream_event_name(path), value
+            if parser.done:
+                break
+
+        with STAGE_SECONDS.time(stage='json_extraction'):
+            parsed_json = extract_json(parser.buffer)
+        if parsed_json is None:
+            raise Exception(f"Failed to parse JSON response: {parser.buffer[:200]}")
+
+        result = self._validate_and_clean_response(parsed_json)
+        await self._repair(result, self._request_text(conversation_history))
+        if cache_key is not None and result['validation']['valid']:
+            self.cache.set(cache_key, result)
+        result['metadata'] = {**prompt_stats, 'cache_hit': False}
+        yield 'result', result
+
+    def _stream_event_name(self, path):
+        pattern = tuple('*' if isinstance(part, int) else part for part in path)
+        return STREAM_EVENTS[pattern]
+
+    def _replay_events(self, result):
+        flow = result.get('pipeline_flow', {})
+        configs = result.get('json_configs', {})
+        for node in flow.get('nodes', []):
+            yield 'node', node
+        for edge in flow.get('edges', []):
+            yield 'edge', edge
+        for linked_service in configs.get('linked_services', []):
+            yield 'linked_service', linked_service
+        for dataset in configs.get('datasets', []):
+            yield 'dataset', dataset
+        if configs.get('pipeline'):
+            yield 'pipeline', configs['pipeline']
+
+    async def _stream_llm(self, messages, json_schema=None):
+        """Yield content deltas from a streamed completion via the provider router"""
+        async with self.admission.admit('generation'):
+            async for delta in self.router.stream(
+                    messages, prefer=self._preferred_provider(messages), json_schema=json_schema):
+                yield delta
+
+    def _format_conversation(self, messages, context=None):
+        """Format conversation for the LLM API, returning (messages, prompt token stats).
+
+        Full generations get retrieved few-shot examples as context.
+        """
+        if context is None:
+            context = self._few_shot_context(messages)
+        with STAGE_SECONDS.time(stage='prompt_assembly'):
+            messages, prompt_stats = self.prompt_builder.build(messages, context)
+        PROMPT_TOKENS.observe(prompt_stats['prompt_tokens'])
+        return messages, prompt_stats
+    
+    async def _call_llm(self, messages, base_config=None):
+        """Get a completion via the provider router; returns (validated result, provider name).
+
+        When ``base_config`` is given a patch reply is applied to it; a
+        JSONPatchError propagates so the caller can fall back to regeneration.
+        """
+        try:
+            # A patch reply has its own shape, so only full generations are schema-constrained
+            json_schema = RESPONSE_SCHEMA if base_config is None else OBJECT_SCHEMA
+            parsed_json, provider = await self._complete_json(
+                messages, self._json_schema(json_schema), latency_class='generation' if base_config is None else 'patch')
+            if base_config is not None:
+                parsed_json = self._apply_patch_reply(parsed_json, base_config)
+            result = self._validate_and_clean_response(parsed_json)
+            request_text = next((msg['content'] for msg in reversed(messages) if msg['role'] == 'user'), '')
+            await self._repair(result, request_text)
+            return result, provider
                 
-        except requests.exceptions.ConnectionError:
-            raise Exception("Cannot connect to Perplexity API. Check your internet connection.")
-        except requests.exceptions.Timeout:
-            raise Exception("Perplexity request timed out. Try simplifying your request.")
+        except (JSONPatchError, APIError):
+            raise
         except Exception as e:
-            raise Exception(f"Perplexity API error: {str(e)}")
+            raise Exception(f"LLM API error: {str(e)}")
     
-    def _clean_json_response(self, response_text):
-        """Attempt to clean and parse JSON response"""
-        try:
-            # Remove markdown code blocks if present
-            if response_text.startswith('```json'):
-                response_text = response_text[7:]  # Remove ```json
-            if response_text.startswith('```'):
-                response_text = response_text[3:]  # Remove ```
-            if response_text.endswith('```'):
-                response_text = response_text[:-3]  # Remove ```
-            
-            # Strip whitespace
-            response_text = response_text.strip()
-            
-            # Try to find and extract JSON
-            start = response_text.find('{')
-            end = response_text.rfind('}') + 1
-            if start != -1 and end > start:
-                json_str = response_text[start:end]
-                return json.loads(json_str)
-        except:
-            pass
+    def _json_schema(self, schema):
+        return schema if Config.STRUCTURED_OUTPUT_ENABLED else None
+
+    async def _complete_json(self, messages, json_schema=None, latency_class='generation'):
+        """One admitted completion, parsed to a JSON object; returns (object, provider name).
+
+        ``latency_class`` keeps short plan, artifact and repair calls out of
+        the full-generation latency baseline.
+        """
+        logger.info("Sending request to LLM providers", extra={'model': self.model, 'messages': len(messages)})
+
+        async with self.admission.admit(latency_class):
+            completion = await self.router.complete(
+                messages, prefer=self._preferred_provider(messages), json_schema=self._json_schema(json_schema))
+        response_content = completion['content']
+
+        logger.info("LLM response received", extra={
+            'provider': completion['provider'],
+            'latency_ms': round(completion['latency'] * 1000, 1),
+            'content_bytes': len(response_content),
+            'content': sample_payload(response_content)
+        })
+
+        # Extract the JSON object, ignoring fences, prose and trailing commas
+        with STAGE_SECONDS.time(stage='json_extraction'):
+            parsed_json = extract_json(response_content)
+        if parsed_json is None:
+            raise Exception(f"Failed to parse JSON response: {response_content[:200]}")
+        return parsed_json, completion['provider']
+
+    async def _repair(self, result, request_text, check_references=False):
+        """Re-ask for just the artifacts that failed validation, for up to REPAIR_MAX_ATTEMPTS rounds.
+
+        Each round sends one concurrent request per failing artifact holding
+        only that fragment, its validator errors and the other artifacts'
+        names; fixed fragments are patched into ``result`` and the design is
+        re-validated. Rounds, latency and the outcome go in result['repair'].
+        """
+        if Config.REPAIR_MAX_ATTEMPTS <= 0 or result['validation']['valid']:
+            return result
+
+        started = time.perf_counter()
+        attempts = 0
+        replaced = 0
+        with STAGE_SECONDS.time(stage='repair'):
+            while attempts < Config.REPAIR_MAX_ATTEMPTS:
+                fragments = self._failing_fragments(result)
+                if not fragments:
+                    break
+                attempts += 1
+                names = self._artifact_names(result['json_configs'])
+                replies = await asyncio.gather(*[
+                    self._complete_json(
+                        self._repair_messages(pointer, fragment, errors, names, request_text), OBJECT_SCHEMA,
+                        latency_class='repair')
+                    for pointer, fragment, errors in fragments
+                ], return_exceptions=True)
+
+                operations = []
+                for (pointer, fragment, errors), reply in zip(fragments, replies):
+                    if isinstance(reply, APIError):
+                        raise reply
+                    if isinstance(reply, Exception):
+                        logger.warning("Repair of %s failed: %s", pointer, reply)
+                        continue
+                    repaired = self._accepted_repair(fragment, errors[0]['artifact'], reply[0])
+                    if repaired is None:
+                        logger.warning("Repair of %s rejected: not the same artifact or no fewer errors", pointer)
+                    else:
+                        operations.append({'op': 'replace', 'path': pointer, 'value': repaired})
+                if not operations:
+                    continue
+                patched = apply_patch({'json_configs': result['json_configs']}, operations)
+                result['json_configs'] = patched['json_configs']
+                if 'patch' in result:
+                    # Keep the returned patch equal to base -> result: the repairs apply on top of it
+                    result['patch'] = result['patch'] + operations
+                replaced += len(operations)
+                result['validation'] = JSONValidator.validate_json_configs(result['json_configs'])
+                if check_references:
+                    self._check_references(result)
+                if result['validation']['valid']:
+                    break
+
+        REPAIRS.inc(outcome='fixed' if result['validation']['valid'] else 'failed')
+        result['repair'] = {
+            'attempts': attempts,
+            'artifacts': replaced,
+            'latency_ms': round((time.perf_counter() - started) * 1000, 1),
+            'valid': result['validation']['valid']
+        }
+        return result
+
+    def _accepted_repair(self, fragment, kind, reply):
+        """``reply`` with the original name kept, if it is the same kind of artifact with fewer schema errors"""
+        if not isinstance(reply, dict):
+            return None
+        expected_type = ARTIFACT_TYPES[kind]
+        if str(reply.get('type', expected_type)).lower() != expected_type.lower():
+            return None
+        if isinstance(fragment, dict) and isinstance(fragment.get('name'), str):
+            reply['name'] = fragment['name']
+
+        validator = JSONValidator.get_validator(kind)
+        before = sum(1 for _ in validator.iter_errors(fragment))
+        after = sum(1 for _ in validator.iter_errors(reply))
+        # Reference-only failures have no schema errors to reduce; a schema-valid reply is accepted
+        if after < before or after == 0:
+            return reply
         return None
-    
+
+    def _failing_fragments(self, result):
+        """[(artifact pointer, artifact, [errors])] for every artifact with validation errors"""
+        grouped = {}
+        for error in result['validation']['errors']:
+            parts = error['pointer'].split('/')
+            if parts[2:3] == ['pipeline']:
+                pointer = '/json_configs/pipeline'
+            elif len(parts) >= 4:
+                pointer = '/'.join(parts[:4])
+            else:
+                continue
+            grouped.setdefault(pointer, []).append(error)
+
+        fragments = []
+        for pointer, errors in grouped.items():
+            try:
+                fragment = resolve_pointer(result, pointer)
+            except JSONPatchError:
+                continue
+            fragments.append((pointer, fragment, errors))
+        return fragments
+
+    def _artifact_names(self, configs):
+        names = {key: [artifact.get('name') for artifact in configs.get(key) or [] if isinstance(artifact, dict)]
+                 for key in ('linked_services', 'datasets')}
+        pipeline = configs.get('pipeline')
+        names['pipeline'] = pipeline.get('name') if isinstance(pipeline, dict) else None
+        return names
+
+    def _repair_messages(self, pointer, fragment, errors, names, request_text):
+        # Error pointers are shown relative to the fragment
+        problems = '\n'.join(f"- {error['pointer'][len(pointer):] or '/'}: {error['message']}" for error in errors)
+        return [
+            {'role': 'system', 'content': REPAIR_SYSTEM_PROMPT},
+            {'role': 'user', 'content': (
+                f"Request:\n{request_text}\n\n"
+                f"Other artifacts in the design: {json.dumps(names, separators=(',', ':'))}\n\n"
+                f"This {errors[0]['artifact'].replace('_', ' ')} failed validation:\n"
+                f"{json.dumps(fragment, separators=(',', ':'))}\n\n"
+                f"Errors:\n{problems}"
+            )}
+        ]
+
+    def _apply_patch_reply(self, reply, base_config):
+        """Merge a {"patch", "explanation"} reply into the previous design"""
+        if 'patch' not in reply:
+            if 'pipeline_flow' in reply or 'json_configs' in reply:
+                return reply
+            raise JSONPatchError("Reply contained neither a patch nor a pipeline design")
+
+        merged = apply_patch(base_config, reply['patch'])
+        merged['explanation'] = reply.get('explanation', 'Pipeline configuration updated')
+        merged['patch'] = reply['patch']
+        return merged
+
     def _validate_and_clean_response(self, response_data):
         """Validate and clean the response data"""
-        # Ensure required structure exists
-        if 'pipeline_flow' not in response_data:
-            response_data['pipeline_flow'] = {'nodes': [], 'edges': []}
+        with STAGE_SECONDS.time(stage='validation'):
+            # Ensure required structure exists
+            if 'pipeline_flow' not in response_data:
+                response_data['pipeline_flow'] = {'nodes': [], 'edges': []}
         
-        if 'json_configs' not in response_data:
-            response_data['json_configs'] = {'linked_services': [], 'datasets': [], 'pipeline': {}}
+            if 'json_configs' not in response_data:
+                response_data['json_configs'] = {'linked_services': [], 'datasets': [], 'pipeline': {}}
         
-        # Ensure pipeline_flow has nodes and edges
-        if 'nodes' not in response_data['pipeline_flow']:
-            response_data['pipeline_flow']['nodes'] = []
-        if 'edges' not in response_data['pipeline_flow']:
-            response_data['pipeline_flow']['edges'] = []
+            # Ensure pipeline_flow has nodes and edges
+            if 'nodes' not in response_data['pipeline_flow']:
+                response_data['pipeline_flow']['nodes'] = []
+            if 'edges' not in response_data['pipeline_flow']:
+                response_data['pipeline_flow']['edges'] = []
             
-        # Ensure json_configs has required keys
-        required_keys = ['linked_services', 'datasets', 'pipeline']
-        for key in required_keys:
-            if key not in response_data['json_configs']:
-                response_data['json_configs'][key] = [] if key != 'pipeline' else {}
-        
-        return response_data
\ No newline at end of file
+            # Ensure json_configs has required keys
+            required_keys = ['linked_services', 'datasets', 'pipeline']
+            for key in required_keys:
+                if key not in response_data['json_configs']:
+                    response_data['json_configs'][key] = [] if key != 'pipeline' else {}
+
+            # Schema-check every generated artifact so bad configs surface before deployment
+            response_data['validation'] = JSONValidator.validate_json_configs(response_data['json_configs'])
+
+        if self.layout is not None:
+            with STAGE_SECONDS.time(stage='layout'):
+                self.layout.apply(response_data['pipeline_flow'])
+        return response_data
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_llm_service():
+    """The process-wide LLMService, created on first use.
+
+    Construction is deferred so importing the API blueprint never fails (e.g.
+    on a missing API key) and is locked so concurrent first callers share
+    one instance.
+    """
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = LLMService()
+    return _service
+
+
+async def close_llm_service():
+    """Close the shared LLMService if it was ever created"""
+    if _service is not None:
+        await _service.close()
@@ -0,0 +1,139 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding('cl100k_base')
+except Exception:
+    _ENCODING = None
+
+# Fixed per-message framing cost charged by chat completion APIs
+MESSAGE_OVERHEAD_TOKENS = 4
+TRUNCATION_MARKER = '\n...[truncated]...\n'
+# A truncated message always keeps at least this much of its head and tail
+MIN_TRUNCATED_CHARS = 400
+
+
+def count_tokens(text):
+    """Token count for text, using tiktoken when installed and ~4 chars/token otherwise"""
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text))
+    return (len(text) + 3) // 4
+
+
+class PromptBuilder:
+    """Assembles the chat message list for a turn within a token budget.
+
+    The system prompt is always sent. History is walked newest first and kept
+    verbatim while it fits; everything older is folded into a short extractive
+    summary appended to the system message. Summaries are cached by the digest
+    of the turns they cover, so a long session only re-summarises when the
+    folded prefix changes.
+    """
+
+    def __init__(self, system_prompt, token_budget=6000, summary_tokens=500, cache_size=512):
+        self.system_prompt = system_prompt
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.system_tokens = count_tokens(system_prompt) + MESSAGE_OVERHEAD_TOKENS
+        self._summaries = OrderedDict()
+        self._cache_size = cache_size
+        self._lock = threading.Lock()
+
+    def build(self, history, context=None):
+        """Return (messages, stats) for the given [{'role', 'content'}] history.
+
+        ``context`` is extra text for the system message (e.g. the current
+        design when editing); its tokens come out of the history budget. The
+        newest turn is always sent verbatim, even past the budget; only a
+        message larger than the whole budget on its own is cut down.
+        """
+        history = [msg for msg in history if msg['role'] in ('user', 'assistant')]
+        available = self.token_budget - self.system_tokens - self.summary_tokens
+        if context:
+            available -= count_tokens(context)
+
+        recent = []
+        used = 0
+        for msg in reversed(history):
+            tokens = count_tokens(msg['content']) + MESSAGE_OVERHEAD_TOKENS
+            if used + tokens > available:
+                if not recent:
+                    limit = self.token_budget - self.system_tokens
+                    content = msg['content'] if tokens <= limit else self._truncate(msg['content'], limit)
+                    recent.append({'role': msg['role'], 'content': content})
+                    used = available
+                break
+            recent.append({'role': msg['role'], 'content': msg['content']})
+            used += tokens
+        recent.reverse()
+
+        # Chat APIs expect the first non-system turn to come from the user
+        while len(recent) > 1 and recent[0]['role'] != 'user':
+            recent.pop(0)
+
+        folded = history[:len(history) - len(recent)]
+        system_content = self.system_prompt
+        if context:
+            system_content += '\n\n' + context
+        if folded:
+            system_content += '\n\nSummary of earlier conversation:\n' + self._summary(folded)
+
+        messages = [{"role": "system", "content": system_content}] + recent
+        prompt_tokens = sum(count_tokens(msg['content']) + MESSAGE_OVERHEAD_TOKENS for msg in messages)
+        return messages, {
+            'prompt_tokens': prompt_tokens,
+            'history_messages': len(recent),
+            'summarized_messages': len(folded)
+        }
+
+    def fits(self, history, context):
+        """Whether the system prompt, ``context`` and the newest turn fit within the budget together"""
+        newest = next((msg for msg in reversed(history) if msg['role'] in ('user', 'assistant')), None)
+        needed = self.system_tokens + count_tokens(context)
+        if newest is not None:
+            needed += count_tokens(newest['content']) + MESSAGE_OVERHEAD_TOKENS
+        return needed <= self.token_budget
+
+    def _summary(self, folded):
+        digest = hashlib.sha256(
+            json.dumps(folded, sort_keys=True, separators=(',', ':')).encode('utf-8')
+        ).hexdigest()
+        with self._lock:
+            if digest in self._summaries:
+                self._summaries.move_to_end(digest)
+                return self._summaries[digest]
+
+        lines = []
+        for msg in folded:
+            content = ' '.join(msg['content'].split())
+            if msg['role'] == 'assistant':
+                content = content.split('. ')[0]
+            prefix = 'User asked' if msg['role'] == 'user' else 'Assistant produced'
+            lines.append(f"- {prefix}: {content[:300]}")
+
+        # Keep the most recent folded turns when the summary itself is over budget
+        summary_lines = []
+        used = 0
+        for line in reversed(lines):
+            tokens = count_tokens(line) + 1
+            if used + tokens > self.summary_tokens:
+                break
+            summary_lines.append(line)
+            used += tokens
+        summary = '\n'.join(reversed(summary_lines))
+
+        with self._lock:
+            self._summaries[digest] = summary
+            if len(self._summaries) > self._cache_size:
+                self._summaries.popitem(last=False)
+        return summary
+
+    def _truncate(self, content, max_tokens):
+        max_chars = max(max_tokens - MESSAGE_OVERHEAD_TOKENS, 0) * 4
+        if len(content) <= max(max_chars, MIN_TRUNCATED_CHARS + len(TRUNCATION_MARKER)):
+            return content
+        half = max(max_chars - len(TRUNCATION_MARKER), MIN_TRUNCATED_CHARS) // 2
+        return content[:half] + TRUNCATION_MARKER + content[len(content) - half:]
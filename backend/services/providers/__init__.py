@@ -0,0 +1,44 @@
+"""
+LLM provider backends and the router that fails over between them.
+"""
+import logging
+
+from services.providers.base import (
+    LLMProvider,
+    OllamaProvider,
+    OpenAICompatibleProvider,
+    PerplexityProvider,
+    ProviderError,
+)
+from services.providers.mock import MockProvider
+from services.providers.rate_limit import TokenBucket
+from services.providers.router import ProviderRouter
+
+logger = logging.getLogger(__name__)
+
+
+def create_router(config):
+    """Build a ProviderRouter for the providers listed in LLM_PROVIDERS, in priority order"""
+    providers = []
+    for name in config.LLM_PROVIDERS:
+        if name == 'perplexity':
+            if not config.PERPLEXITY_API_KEY:
+                logger.warning("Skipping perplexity provider: PERPLEXITY_API_KEY environment variable not set")
+                continue
+            providers.append(PerplexityProvider())
+        elif name == 'ollama':
+            providers.append(OllamaProvider())
+        elif name == 'mock':
+            providers.append(MockProvider(latency=config.MOCK_LATENCY_MS / 1000))
+        else:
+            raise Exception(f"Unknown LLM provider: {name}")
+
+    return ProviderRouter(
+        providers,
+        error_threshold=config.ROUTER_ERROR_THRESHOLD,
+        cooldown=config.ROUTER_COOLDOWN_SECONDS,
+        alpha=config.ROUTER_EWMA_ALPHA,
+        rate_limits=config.PROVIDER_RATE_LIMITS,
+        rate_burst=config.PROVIDER_RATE_BURST,
+        tiers=config.LLM_PROVIDER_TIERS
+    )
@@ -0,0 +1,236 @@
+import asyncio
+import random
+import time
+
+import httpx
+
+from config.config import Config
+from utils.json_extractor import loads
+from utils.metrics import TOKENS, UPSTREAM_RESPONSES, UPSTREAM_SECONDS
+
+# Upstream statuses worth retrying with backoff
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class ProviderError(Exception):
+    """Raised when an LLM provider fails to return a completion"""
+    def __init__(self, message, status_code=None, retry_after=None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class LLMProvider:
+    """Interface for chat-completion backends used by LLMService.
+
+    Implementations return the assistant message text from complete() and
+    yield content deltas from stream(). ``name`` identifies the provider in
+    routing stats and response metadata.
+    """
+
+    name = 'base'
+    # Constrained-output support: 'json_schema', 'json_object' or None
+    json_mode = None
+
+    def __init__(self, model):
+        self.model = model
+
+    def structured_output(self, schema):
+        """Request options asking for JSON output matching ``schema``, as far as this provider supports it"""
+        if self.json_mode == 'json_schema':
+            return {'response_format': {'type': 'json_schema', 'json_schema': {'schema': schema}}}
+        if self.json_mode == 'json_object':
+            return {'response_format': {'type': 'json_object'}}
+        return {}
+
+    async def complete(self, messages, **options):
+        raise NotImplementedError
+
+    async def stream(self, messages, **options):
+        raise NotImplementedError
+        yield
+
+    async def warm_up(self, connections=1):
+        """Open upstream connections ahead of the first request; returns how many were opened"""
+        return 0
+
+    async def close(self):
+        pass
+
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Provider for any OpenAI-style /chat/completions endpoint (Perplexity, Ollama, vLLM, ...)"""
+
+    name = 'openai'
+
+    def __init__(self, url, model, api_key=None, name=None):
+        super().__init__(model)
+        self.url = url
+        self.api_key = api_key
+        if name:
+            self.name = name
+        # Shared keep-alive client so turns reuse pooled TCP/TLS connections.
+        # It is created lazily because it binds to the running event loop.
+        self.client = None
+
+    def _get_client(self):
+        """Return the pooled async HTTP client, creating it on first use"""
+        if self.client is None or self.client.is_closed:
+            headers = {"Content-Type": "application/json"}
+            if self.api_key:
+                headers["Authorization"] = f"Bearer {self.api_key}"
+            self.client = httpx.AsyncClient(
+                headers=headers,
+                timeout=httpx.Timeout(
+                    Config.HTTP_READ_TIMEOUT,
+                    connect=Config.HTTP_CONNECT_TIMEOUT,
+                    pool=None
+                ),
+                limits=httpx.Limits(
+                    max_connections=Config.LLM_MAX_CONCURRENCY,
+                    max_keepalive_connections=Config.HTTP_POOL_SIZE
+                )
+            )
+        return self.client
+
+    async def close(self):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    async def warm_up(self, connections=1):
+        """Pre-open pooled keep-alive connections (TCP + TLS) with concurrent HEAD requests.
+
+        Any HTTP status counts: the point is the handshake, not the reply.
+        Connection errors are left for the first real request to surface.
+        """
+        client = self._get_client()
+        connections = max(1, min(connections, Config.HTTP_POOL_SIZE))
+        replies = await asyncio.gather(*[client.head(self.url) for _ in range(connections)], return_exceptions=True)
+        return sum(1 for reply in replies if isinstance(reply, httpx.Response))
+
+    def _backoff_delay(self, attempt, retry_after=None):
+        """Exponential backoff with jitter, honouring a numeric Retry-After header"""
+        if retry_after:
+            try:
+                return min(float(retry_after), Config.HTTP_BACKOFF_MAX)
+            except ValueError:
+                pass
+        delay = Config.HTTP_BACKOFF_FACTOR * (2 ** attempt) + random.uniform(0, Config.HTTP_BACKOFF_JITTER)
+        return min(delay, Config.HTTP_BACKOFF_MAX)
+
+    async def _send(self, payload, stream=False):
+        """POST to the completions endpoint, retrying connect errors and 429/5xx.
+
+        With ``stream=True`` the body is left unread and the caller must close
+        the returned response.
+        """
+        client = self._get_client()
+        for attempt in range(Config.HTTP_MAX_RETRIES + 1):
+            last_attempt = attempt == Config.HTTP_MAX_RETRIES
+            try:
+                request = client.build_request("POST", self.url, json=payload)
+                request.extensions['trace'] = self._trace_timings(time.perf_counter())
+                response = await client.send(request, stream=stream)
+                UPSTREAM_RESPONSES.inc(provider=self.name, status=str(response.status_code))
+            except httpx.ConnectError:
+                if last_attempt:
+                    raise ProviderError(f"Cannot connect to {self.name} API. Check your internet connection.")
+                await asyncio.sleep(self._backoff_delay(attempt))
+                continue
+            except httpx.TimeoutException:
+                raise ProviderError(f"{self.name} request timed out. Try simplifying your request.")
+
+            if response.status_code in RETRY_STATUSES and not last_attempt:
+                retry_after = response.headers.get('Retry-After')
+                await response.aclose()
+                await asyncio.sleep(self._backoff_delay(attempt, retry_after))
+                continue
+            return response
+
+    def _trace_timings(self, started):
+        """httpcore trace hook recording connect time (new connections only) and TTFB"""
+        state = {}
+
+        async def trace(event_name, info):
+            now = time.perf_counter()
+            if event_name == 'connection.connect_tcp.started':
+                state['connect'] = now
+            elif event_name in ('connection.connect_tcp.complete', 'connection.start_tls.complete'):
+                if event_name == 'connection.start_tls.complete' or self.url.startswith('http://'):
+                    UPSTREAM_SECONDS.observe(now - state.get('connect', started), provider=self.name, phase='connect')
+            elif event_name.endswith('receive_response_headers.complete'):
+                UPSTREAM_SECONDS.observe(now - started, provider=self.name, phase='ttfb')
+
+        return trace
+
+    async def _raise_for_status(self, response):
+        if response.status_code != 200:
+            error_text = (await response.aread()).decode('utf-8', 'replace')
+            raise ProviderError(
+                f"{self.name} API error {response.status_code}: {error_text}",
+                status_code=response.status_code,
+                retry_after=response.headers.get('Retry-After')
+            )
+
+    async def complete(self, messages, **options):
+        payload = {"model": self.model, "messages": messages, **options}
+        started = time.perf_counter()
+        response = await self._send(payload)
+        UPSTREAM_SECONDS.observe(time.perf_counter() - started, provider=self.name, phase='total')
+        await self._raise_for_status(response)
+
+        try:
+            result = loads(response.content)
+            content = result.get("choices", [{}])[0].get("message", {}).get("content", "")
+        except (ValueError, KeyError, IndexError, AttributeError) as e:
+            raise ProviderError(f"Unexpected response format from {self.name}: {e}")
+
+        usage = result.get("usage") or {}
+        for kind in ('prompt_tokens', 'completion_tokens'):
+            if isinstance(usage.get(kind), int):
+                TOKENS.inc(usage[kind], provider=self.name, kind=kind.split('_')[0])
+
+        if not content:
+            raise ProviderError(f"Empty response from {self.name}")
+        return content
+
+    async def stream(self, messages, **options):
+        payload = {"model": self.model, "messages": messages, "stream": True, **options}
+        started = time.perf_counter()
+        response = await self._send(payload, stream=True)
+        try:
+            await self._raise_for_status(response)
+            async for line in response.aiter_lines():
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[5:].strip()
+                if data == '[DONE]':
+                    break
+                chunk = loads(data)
+                delta = chunk.get("choices", [{}])[0].get("delta", {}).get("content")
+                if delta:
+                    yield delta
+        except httpx.TimeoutException:
+            raise ProviderError(f"{self.name} request timed out. Try simplifying your request.")
+        finally:
+            await response.aclose()
+            UPSTREAM_SECONDS.observe(time.perf_counter() - started, provider=self.name, phase='total')
+
+
+class PerplexityProvider(OpenAICompatibleProvider):
+    name = 'perplexity'
+    json_mode = 'json_schema'
+
+    def __init__(self):
+        super().__init__(Config.PERPLEXITY_URL, Config.PERPLEXITY_MODEL, api_key=Config.PERPLEXITY_API_KEY)
+
+
+class OllamaProvider(OpenAICompatibleProvider):
+    """Local Ollama server through its OpenAI-compatible endpoint"""
+
+    name = 'ollama'
+    json_mode = 'json_object'
+
+    def __init__(self):
+        super().__init__(Config.OLLAMA_URL, Config.OLLAMA_MODEL, api_key=Config.OLLAMA_API_KEY)
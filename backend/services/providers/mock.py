@@ -0,0 +1,45 @@
+import asyncio
+import json
+
+from services.providers.base import LLMProvider
+from services.template_engine import SYSTEMS, TemplateEngine
+
+DEFAULT_SOURCE = SYSTEMS[0][1]
+DEFAULT_SINK = SYSTEMS[1][1]
+
+
+class MockProvider(LLMProvider):
+    """Deterministic offline provider.
+
+    Produces a well-formed copy pipeline for the first two systems named in
+    the latest user message, so the backend can be run and load-tested with
+    no network access. ``latency`` (seconds) simulates upstream time.
+    """
+
+    name = 'mock'
+
+    def __init__(self, latency=0.0):
+        super().__init__('mock')
+        self.latency = latency
+        self.templates = TemplateEngine()
+
+    async def complete(self, messages, **options):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return json.dumps(self._build(messages))
+
+    async def stream(self, messages, **options):
+        content = await self.complete(messages)
+        for i in range(0, len(content), 64):
+            yield content[i:i + 64]
+            await asyncio.sleep(0)
+
+    def _build(self, messages):
+        request = next((msg['content'] for msg in reversed(messages) if msg['role'] == 'user'), '')
+        systems = self.templates.find_systems(request)
+        source = systems[0] if systems else DEFAULT_SOURCE
+        sink = systems[1] if len(systems) > 1 else DEFAULT_SINK
+        return self.templates.build(
+            source, sink,
+            explanation=f"Pipeline to copy data from {source.key} to {sink.key} (generated by the mock provider)"
+        )
@@ -0,0 +1,61 @@
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` requests per second with bursts up to ``burst``.
+
+    ``acquire`` waits for a token rather than failing, so callers are paced
+    instead of rejected. Waiters reserve tokens in arrival order. A rate of
+    0 means unlimited; ``penalize`` still holds every token for a while,
+    e.g. for an upstream Retry-After.
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._waits = 0
+
+    def _refill(self, now):
+        if self.rate > 0:
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def penalize(self, seconds):
+        """Hand out no tokens for the next ``seconds``"""
+        self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    def delay(self):
+        """Seconds until the next caller would get a token"""
+        now = time.monotonic()
+        self._refill(now)
+        wait = max(0.0, self._blocked_until - now)
+        if self.rate > 0 and self._tokens < 1:
+            wait = max(wait, (1 - self._tokens) / self.rate)
+        return wait
+
+    async def acquire(self):
+        now = time.monotonic()
+        self._refill(now)
+        wait = max(0.0, self._blocked_until - now)
+        if self.rate > 0:
+            # Take the token now (possibly going negative) so concurrent waiters queue up behind each other
+            self._tokens -= 1
+            if self._tokens < 0:
+                wait = max(wait, -self._tokens / self.rate)
+        if wait > 0:
+            self._waits += 1
+            await asyncio.sleep(wait)
+
+    def stats(self):
+        self._refill(time.monotonic())
+        return {
+            'rate': self.rate,
+            'burst': self.burst,
+            'tokens': round(self._tokens, 2),
+            'waits': self._waits,
+            'blocked_for': round(max(0.0, self._blocked_until - time.monotonic()), 2)
+        }
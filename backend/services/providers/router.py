@@ -0,0 +1,175 @@
+import asyncio
+import logging
+import threading
+import time
+
+from services.providers.rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+class ProviderStats:
+    """Exponentially weighted latency and error rate for one provider"""
+
+    def __init__(self, alpha):
+        self.alpha = alpha
+        self.latency = None
+        self.error_rate = 0.0
+        self.requests = 0
+        self.failures = 0
+        self.degraded_until = 0.0
+
+    def record(self, latency, ok):
+        self.requests += 1
+        if not ok:
+            self.failures += 1
+        if latency is not None:
+            self.latency = latency if self.latency is None else (
+                self.alpha * latency + (1 - self.alpha) * self.latency
+            )
+        self.error_rate = self.alpha * (0.0 if ok else 1.0) + (1 - self.alpha) * self.error_rate
+
+    def as_dict(self, now):
+        return {
+            'latency_ms': round(self.latency * 1000, 1) if self.latency is not None else None,
+            'error_rate': round(self.error_rate, 4),
+            'requests': self.requests,
+            'failures': self.failures,
+            'degraded': self.degraded_until > now
+        }
+
+
+class ProviderRouter:
+    """Routes completions across providers by observed latency and error rate.
+
+    Healthy providers are tried in configured priority order. ``tiers`` maps
+    provider names to a priority tier (default: each provider its own tier,
+    in list order); within a tier, providers with no samples yet are tried
+    first so they get measured, then the rest fastest first, so latency never
+    moves a fallback ahead of a healthy primary. A provider whose EWMA error rate crosses
+    ``error_threshold`` is marked degraded for ``cooldown`` seconds and only
+    used once every healthy provider has failed. On failure the next provider
+    is tried, so a request only errors when all of them do.
+
+    ``rate_limits`` maps provider names to requests per second; calls to a
+    limited provider wait for a token before going upstream.
+    """
+
+    def __init__(self, providers, error_threshold=0.5, cooldown=30.0, alpha=0.2, rate_limits=None, rate_burst=1,
+                 tiers=None):
+        if not providers:
+            raise Exception("No LLM providers configured")
+        self.providers = list(providers)
+        self.tiers = {provider.name: index for index, provider in enumerate(self.providers)}
+        self.tiers.update(tiers or {})
+        self.error_threshold = error_threshold
+        self.cooldown = cooldown
+        self._stats = {provider.name: ProviderStats(alpha) for provider in self.providers}
+        self._lock = threading.Lock()
+        self._buckets = {
+            name: TokenBucket(rate, rate_burst)
+            for name, rate in (rate_limits or {}).items() if rate > 0
+        }
+
+    @property
+    def model_id(self):
+        """Identifier of the configured provider/model set, used in cache keys"""
+        return ','.join(f"{provider.name}:{provider.model}" for provider in self.providers)
+
+    def get(self, name):
+        return next((provider for provider in self.providers if provider.name == name), None)
+
+    def candidates(self, prefer=None):
+        now = time.time()
+        with self._lock:
+            order = {provider.name: index for index, provider in enumerate(self.providers)}
+
+            def rank(provider):
+                stats = self._stats[provider.name]
+                degraded = stats.degraded_until > now
+                preferred = provider.name != prefer
+                sampled = stats.latency is not None
+                return (degraded, preferred, self.tiers[provider.name], sampled, stats.latency or 0.0,
+                        order[provider.name])
+
+            return sorted(self.providers, key=rank)
+
+    def record(self, provider, latency, ok):
+        with self._lock:
+            stats = self._stats[provider.name]
+            stats.record(latency, ok)
+            if not ok and stats.error_rate >= self.error_threshold:
+                stats.degraded_until = time.time() + self.cooldown
+            elif ok:
+                stats.degraded_until = 0.0
+
+    async def _throttle(self, provider):
+        bucket = self._buckets.get(provider.name)
+        if bucket is not None:
+            await bucket.acquire()
+
+    async def warm_up(self, connections=1):
+        """{provider name: connections opened} after warming every provider concurrently"""
+        opened = await asyncio.gather(*[provider.warm_up(connections) for provider in self.providers])
+        return {provider.name: count for provider, count in zip(self.providers, opened)}
+
+    def _options(self, provider, json_schema, options):
+        if json_schema is None:
+            return options
+        return {**options, **provider.structured_output(json_schema)}
+
+    async def complete(self, messages, prefer=None, json_schema=None, **options):
+        """Return {'content', 'provider', 'model', 'latency'} from the first provider that succeeds.
+
+        ``json_schema`` asks each provider for constrained JSON output in whatever form it supports.
+        """
+        last_error = None
+        for provider in self.candidates(prefer):
+            await self._throttle(provider)
+            started = time.perf_counter()
+            try:
+                content = await provider.complete(messages, **self._options(provider, json_schema, options))
+            except Exception as e:
+                self.record(provider, None, False)
+                logger.warning("Provider %s failed: %s", provider.name, e)
+                last_error = e
+                continue
+            latency = time.perf_counter() - started
+            self.record(provider, latency, True)
+            return {'content': content, 'provider': provider.name, 'model': provider.model, 'latency': latency}
+        raise last_error
+
+    async def stream(self, messages, prefer=None, json_schema=None, **options):
+        """Yield content deltas, failing over only if a provider errors before its first delta"""
+        last_error = None
+        for provider in self.candidates(prefer):
+            await self._throttle(provider)
+            started = time.perf_counter()
+            emitted = False
+            try:
+                async for delta in provider.stream(messages, **self._options(provider, json_schema, options)):
+                    emitted = True
+                    yield delta
+            except Exception as e:
+                self.record(provider, None, False)
+                if emitted:
+                    raise
+                logger.warning("Provider %s failed: %s", provider.name, e)
+                last_error = e
+                continue
+            self.record(provider, time.perf_counter() - started, True)
+            return
+        raise last_error
+
+    async def close(self):
+        for provider in self.providers:
+            await provider.close()
+
+    def stats(self):
+        now = time.time()
+        with self._lock:
+            stats = {name: stats.as_dict(now) for name, stats in self._stats.items()}
+        for name, bucket in self._buckets.items():
+            if name in stats:
+                stats[name]['rate_limit'] = bucket.stats()
+        return stats
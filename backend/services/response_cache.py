@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+# Disk writes committed together by the background writer
+WRITE_BATCH = 64
+
+
+class ResponseCache:
+    """Two-tier cache for validated pipeline responses.
+
+    The memory tier is an LRU bounded by entry count and total payload bytes,
+    with a per-entry TTL. The optional SQLite tier survives restarts and is
+    consulted on a memory miss; disk hits are promoted back into memory.
+    Values are stored serialized so callers always receive a private copy.
+    Disk writes are queued to a background thread that commits them in
+    batches, so ``set`` never waits on an SQLite commit; reads use their
+    own connection and WAL mode so they do not wait for the writer either.
+    """
+
+    def __init__(self, max_entries=256, max_bytes=32 * 1024 * 1024, ttl=3600, db_path=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'evictions': 0}
+        self._db = None
+        self._writes = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS response_cache '
+                '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)'
+            )
+            self._db.commit()
+            self._writes = queue.Queue()
+            threading.Thread(target=self._write_loop, args=(db_path,), name='response-cache-writer',
+                             daemon=True).start()
+
+    @staticmethod
+    def make_key(messages, model):
+        """Content address for a formatted message list and model name"""
+        payload = json.dumps({'model': model, 'messages': messages}, sort_keys=True, separators=(',', ':'))
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, expires_at = entry
+                if expires_at > now:
+                    self._entries.move_to_end(key)
+                    self._stats['hits'] += 1
+                    return json.loads(value)
+                self._remove(key)
+
+            if self._db is not None:
+                row = self._db.execute(
+                    'SELECT value, expires_at FROM response_cache WHERE key = ?', (key,)
+                ).fetchone()
+                if row and row[1] > now:
+                    self._insert(key, row[0], row[1])
+                    self._stats['disk_hits'] += 1
+                    return json.loads(row[0])
+                if row:
+                    self._writes.put(('DELETE FROM response_cache WHERE key = ?', (key,)))
+
+            self._stats['misses'] += 1
+            return None
+
+    def set(self, key, value):
+        serialized = json.dumps(value, separators=(',', ':'))
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._insert(key, serialized, expires_at)
+            if self._db is not None:
+                self._writes.put((
+                    'INSERT OR REPLACE INTO response_cache (key, value, expires_at) VALUES (?, ?, ?)',
+                    (key, serialized, expires_at)
+                ))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._writes.put(('DELETE FROM response_cache', ()))
+
+    def flush(self):
+        """Block until every queued disk write is committed"""
+        if self._writes is not None:
+            self._writes.join()
+
+    def _write_loop(self, db_path):
+        db = sqlite3.connect(db_path)
+        while True:
+            batch = [self._writes.get()]
+            while len(batch) < WRITE_BATCH:
+                try:
+                    batch.append(self._writes.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                with db:
+                    for statement, params in batch:
+                        db.execute(statement, params)
+            except sqlite3.Error as e:
+                # The disk tier is best effort; the memory tier still has the entries
+                logger.warning("Response cache disk write failed: %s", e)
+            finally:
+                for _ in batch:
+                    self._writes.task_done()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._stats['hits'] + self._stats['disk_hits'] + self._stats['misses']
+            hits = self._stats['hits'] + self._stats['disk_hits']
+            return {
+                **self._stats,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hit_ratio': round(hits / lookups, 4) if lookups else 0.0
+            }
+
+    def _insert(self, key, serialized, expires_at):
+        if len(serialized) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (serialized, expires_at)
+        self._bytes += len(serialized)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._stats['evictions'] += 1
+
+    def _remove(self, key):
+        value, _ = self._entries.pop(key)
+        self._bytes -= len(value)
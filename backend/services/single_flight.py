@@ -0,0 +1,45 @@
+import asyncio
+import copy
+import time
+
+
+class SingleFlight:
+    """Coalesces concurrent identical calls onto one in-flight coroutine.
+
+    The first caller for a key starts the work as a task; callers arriving
+    while it runs await the same task and receive a deep copy of its result
+    (or its exception). The task is shielded, so a disconnecting caller does
+    not cancel the upstream call for the others.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self._stats = {'leaders': 0, 'coalesced': 0, 'wait_seconds_total': 0.0, 'wait_seconds_max': 0.0}
+
+    async def do(self, key, fn):
+        """Run fn() once per key at a time; returns (result, coalesced)"""
+        task = self._inflight.get(key)
+        if task is not None:
+            self._stats['coalesced'] += 1
+            started = time.perf_counter()
+            try:
+                result = await asyncio.shield(task)
+            finally:
+                waited = time.perf_counter() - started
+                self._stats['wait_seconds_total'] += waited
+                self._stats['wait_seconds_max'] = max(self._stats['wait_seconds_max'], waited)
+            return copy.deepcopy(result), True
+
+        self._stats['leaders'] += 1
+        task = asyncio.ensure_future(fn())
+        self._inflight[key] = task
+        task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        return await asyncio.shield(task), False
+
+    def stats(self):
+        coalesced = self._stats['coalesced']
+        return {
+            **self._stats,
+            'in_flight': len(self._inflight),
+            'wait_seconds_avg': round(self._stats['wait_seconds_total'] / coalesced, 4) if coalesced else 0.0
+        }
@@ -0,0 +1,198 @@
+"""
+Rule-based generation for stock copy pipelines.
+
+Requests such as "copy from SQL Server to Databricks" are answered locally
+with the same shape the LLM is asked for, so the common case needs no
+upstream call. Anything the matcher is not sure about goes to the LLM.
+"""
+import copy
+import re
+from collections import namedtuple
+
+from utils.naming_conventions import artifact_name, pipeline_name
+
+System = namedtuple('System', [
+    'key',                 # short name used in artifact names
+    'label',               # display name
+    'linked_service_type',
+    'dataset_type',
+    'source_type',
+    'sink_type',
+    'dataset_properties'   # dataset typeProperties placeholder
+])
+
+_TABLE = {'tableName': 'table_name'}
+
+# Keyword -> system, most specific keywords first
+SYSTEMS = [
+    (('sql server', 'mssql'),
+     System('sql', 'SQL Server', 'SqlServer', 'SqlServerTable', 'SqlSource', 'SqlSink', _TABLE)),
+    (('databricks', 'delta lake'),
+     System('databricks', 'Databricks', 'AzureDatabricksDeltaLake', 'AzureDatabricksDeltaLakeDataset',
+            'AzureDatabricksDeltaLakeSource', 'AzureDatabricksDeltaLakeSink',
+            {'database': 'default', 'table': 'table_name'})),
+    (('synapse',),
+     System('synapse', 'Azure Synapse Analytics', 'AzureSqlDW', 'AzureSqlDWTable', 'SqlDWSource', 'SqlDWSink', _TABLE)),
+    (('adls', 'data lake'),
+     System('adls', 'Azure Data Lake Storage Gen2', 'AzureBlobFS', 'Parquet', 'ParquetSource', 'ParquetSink',
+            {'location': {'type': 'AzureBlobFSLocation', 'fileSystem': 'container', 'folderPath': 'folder'}})),
+    (('blob',),
+     System('blob', 'Azure Blob Storage', 'AzureBlobStorage', 'DelimitedText', 'DelimitedTextSource',
+            'DelimitedTextSink',
+            {'location': {'type': 'AzureBlobStorageLocation', 'container': 'container', 'folderPath': 'folder'},
+             'columnDelimiter': ',', 'firstRowAsHeader': True})),
+    (('cosmos',),
+     System('cosmos', 'Azure Cosmos DB', 'CosmosDb', 'CosmosDbSqlApiCollection', 'CosmosDbSqlApiSource',
+            'CosmosDbSqlApiSink', {'collectionName': 'collection_name'})),
+    (('mysql',),
+     System('mysql', 'MySQL', 'MySql', 'MySqlTable', 'MySqlSource', 'MySqlSink', _TABLE)),
+    (('postgres', 'postgresql'),
+     System('postgres', 'PostgreSQL', 'AzurePostgreSql', 'AzurePostgreSqlTable', 'AzurePostgreSqlSource',
+            'AzurePostgreSqlSink', _TABLE)),
+    (('oracle',),
+     System('oracle', 'Oracle', 'Oracle', 'OracleTable', 'OracleSource', 'OracleSink', _TABLE)),
+    (('snowflake',),
+     System('snowflake', 'Snowflake', 'Snowflake', 'SnowflakeTable', 'SnowflakeSource', 'SnowflakeSink', _TABLE)),
+    (('rest api', 'rest', 'api'),
+     System('rest', 'REST API', 'RestService', 'RestResource', 'RestSource', 'RestSink',
+            {'relativeUrl': 'resource'})),
+    (('azure sql', 'sql database', 'sql'),
+     System('sql', 'Azure SQL Database', 'AzureSqlDatabase', 'AzureSqlTable', 'AzureSqlSource', 'AzureSqlSink',
+            _TABLE)),
+]
+
+_SYSTEM_BY_KEYWORD = {keyword: system for keywords, system in SYSTEMS for keyword in keywords}
+# Longest keywords first so "sql server" wins over "sql"
+_KEYWORD_PATTERN = re.compile('|'.join(
+    r'\b' + re.escape(keyword) + r'\b' for keyword in sorted(_SYSTEM_BY_KEYWORD, key=len, reverse=True)))
+
+COPY_INTENT = re.compile(r'\b(copy|copies|move|load|migrate|ingest|transfer|sync|replicate|pipeline)\b')
+SINK_MARKER = re.compile(r'\b(to|into)\b')
+SOURCE_MARKER = re.compile(r'\bfrom\b')
+
+# Words a plain copy request may contain besides the copy verb and the two systems.
+# Anything else (a schedule, a filter, a follow-up step) is a requirement the template
+# cannot honour, so the request goes to the LLM.
+FILLER_WORDS = frozenset('''
+    a an the my our your this that which some all of just simply please
+    i we you me us can could would will want need like let lets
+    create build make set up setup generate write give add new simple basic
+    pipeline pipelines job data table database db storage account container store
+    azure cloud server instance on premises onprem premise
+    from to into over across for with using via
+'''.split())
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+class TemplateEngine:
+    """Match simple source -> sink copy requests and build them without the LLM"""
+
+    def find_systems(self, text):
+        """Systems named in ``text``, ordered source first.
+
+        Order of mention is used unless "from"/"to"/"into" say otherwise,
+        e.g. "load into Snowflake from Postgres".
+        """
+        text = text.lower()
+        mentions = []
+        previous_end = 0
+        for match in _KEYWORD_PATTERN.finditer(text):
+            between = text[previous_end:match.start()]
+            mentions.append({
+                'system': _SYSTEM_BY_KEYWORD[match.group(0)],
+                'source': bool(SOURCE_MARKER.search(between)),
+                'sink': bool(SINK_MARKER.search(between))
+            })
+            previous_end = match.end()
+
+        if len(mentions) == 2 and (mentions[0]['sink'] or mentions[1]['source']) \
+                and not (mentions[0]['source'] or mentions[1]['sink']):
+            mentions.reverse()
+        return [mention['system'] for mention in mentions]
+
+    def match(self, text):
+        """Return (source, sink) for a plain two-system copy request, else None"""
+        lowered = text.lower()
+        if not COPY_INTENT.search(lowered):
+            return None
+        remainder = COPY_INTENT.sub(' ', _KEYWORD_PATTERN.sub(' ', lowered))
+        if any(word not in FILLER_WORDS for word in _WORD.findall(remainder)):
+            return None
+        systems = self.find_systems(lowered)
+        if len(systems) != 2:
+            return None
+        return systems[0], systems[1]
+
+    def generate(self, text):
+        """Build the response for ``text``, or None when it needs the LLM"""
+        matched = self.match(text)
+        if matched is None:
+            return None
+        return self.build(*matched)
+
+    def build(self, source, sink, explanation=None):
+        """Build pipeline_flow and json_configs for a copy from ``source`` to ``sink``"""
+        ls_src = artifact_name('linked_service', source.key)
+        ls_snk = artifact_name('linked_service', sink.key)
+        ds_src = artifact_name('dataset', source.key)
+        ds_snk = artifact_name('dataset', sink.key)
+        if ls_src == ls_snk:
+            ls_snk = artifact_name('linked_service', sink.key, 'sink')
+            ds_snk = artifact_name('dataset', sink.key, 'sink')
+
+        nodes = [
+            {"id": ls_src, "type": "linked_service", "name": ls_src, "label": f"{source.label} Linked Service"},
+            {"id": ds_src, "type": "dataset", "name": ds_src, "label": f"{source.label} Dataset"},
+            {"id": "copy_activity", "type": "activity", "name": "CopyData", "label": "Copy Data Activity"},
+            {"id": ds_snk, "type": "dataset", "name": ds_snk, "label": f"{sink.label} Dataset"},
+            {"id": ls_snk, "type": "linked_service", "name": ls_snk, "label": f"{sink.label} Linked Service"},
+        ]
+        edges = [
+            {"id": "edge_1", "source": ls_src, "target": ds_src, "label": "provides connection"},
+            {"id": "edge_2", "source": ds_src, "target": "copy_activity", "label": "input"},
+            {"id": "edge_3", "source": "copy_activity", "target": ds_snk, "label": "output"},
+            {"id": "edge_4", "source": ls_snk, "target": ds_snk, "label": "provides connection"},
+        ]
+        pipeline = {
+            "name": pipeline_name(source.key, sink.key),
+            "type": "Microsoft.DataFactory/factories/pipelines",
+            "properties": {
+                "activities": [{
+                    "name": "CopyData",
+                    "type": "Copy",
+                    "inputs": [{"referenceName": ds_src, "type": "DatasetReference"}],
+                    "outputs": [{"referenceName": ds_snk, "type": "DatasetReference"}],
+                    "typeProperties": {"source": {"type": source.source_type}, "sink": {"type": sink.sink_type}}
+                }]
+            }
+        }
+        return {
+            "pipeline_flow": {"nodes": nodes, "edges": edges},
+            "json_configs": {
+                "linked_services": [self._linked_service(ls_src, source), self._linked_service(ls_snk, sink)],
+                "datasets": [self._dataset(ds_src, ls_src, source), self._dataset(ds_snk, ls_snk, sink)],
+                "pipeline": pipeline
+            },
+            "explanation": explanation or f"Pipeline to copy data from {source.label} to {sink.label}"
+        }
+
+    def _linked_service(self, name, system):
+        return {
+            "name": name,
+            "type": "Microsoft.DataFactory/factories/linkedservices",
+            "properties": {
+                "type": system.linked_service_type,
+                "typeProperties": {"connectionString": "connection string here"}
+            }
+        }
+
+    def _dataset(self, name, linked_service, system):
+        return {
+            "name": name,
+            "type": "Microsoft.DataFactory/factories/datasets",
+            "properties": {
+                "type": system.dataset_type,
+                "linkedServiceName": {"referenceName": linked_service, "type": "LinkedServiceReference"},
+                "typeProperties": copy.deepcopy(system.dataset_properties)
+            }
+        }
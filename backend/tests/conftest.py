@@ -0,0 +1,9 @@
+import os
+import sys
+import tempfile
+
+# Tests import backend modules the same way app.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('LLM_PROVIDERS', 'mock')
+# Keep app logs out of the tracked logs/ directory
+os.environ.setdefault('LOG_DIR', tempfile.mkdtemp(prefix='adf-test-logs-'))
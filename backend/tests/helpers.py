@@ -0,0 +1,22 @@
+import asyncio
+import json
+
+from app import create_app
+
+
+def post_json(path, body):
+    """(status, text) for a POST to a fresh app instance"""
+    async def run():
+        client = create_app().test_client()
+        response = await client.post(path, json=body)
+        return response.status_code, await response.get_data(as_text=True)
+    return asyncio.run(run())
+
+
+def sse_events(text):
+    """[(event, data)] parsed from a server-sent events body"""
+    events = []
+    for block in text.strip().split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines())
+        events.append((lines['event'], json.loads(lines['data'])))
+    return events
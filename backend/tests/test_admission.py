@@ -0,0 +1,155 @@
+import asyncio
+
+import pytest
+
+from services.admission import MIN_LATENCY_SAMPLES, AdmissionController, retry_after_seconds
+from services.providers.base import ProviderError
+from utils.error_handling import RateLimitError, ServiceUnavailableError
+
+
+def test_acquire_and_release_track_in_flight():
+    async def scenario():
+        admission = AdmissionController(max_limit=2)
+        await admission.acquire()
+        await admission.acquire()
+        assert admission.in_flight == 2
+        admission.release()
+        admission.release()
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.in_flight == 0
+    assert admission.stats()['queued'] == 0
+
+
+def test_waiter_gets_the_released_slot():
+    async def scenario():
+        admission = AdmissionController(max_limit=1, queue_timeout=1.0)
+        await admission.acquire()
+        waiter = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        assert admission.stats()['queued'] == 1
+        admission.release()
+        await waiter
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.in_flight == 1
+    assert admission.stats()['queued'] == 0
+
+
+def test_full_queue_and_queue_timeout_are_503():
+    async def scenario():
+        admission = AdmissionController(max_limit=1, queue_size=1, queue_timeout=0.05)
+        await admission.acquire()
+        waiter = asyncio.create_task(admission.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(ServiceUnavailableError):
+            await admission.acquire()
+        with pytest.raises(ServiceUnavailableError):
+            await waiter
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.in_flight == 1
+    assert admission.stats()['queued'] == 0
+
+
+def test_healthy_latency_grows_the_limit_additively():
+    admission = AdmissionController(max_limit=100, initial_limit=10)
+    admission.in_flight = 1
+    admission.release(latency=1.0)
+    assert admission.limit == pytest.approx(10.1)
+
+
+def test_slow_call_shrinks_and_overload_halves_the_limit():
+    admission = AdmissionController(max_limit=100, initial_limit=40, latency_tolerance=2.0)
+    admission.in_flight = MIN_LATENCY_SAMPLES + 2
+    for _ in range(MIN_LATENCY_SAMPLES):
+        admission.release(latency=1.0)
+    limit = admission.limit
+    admission.release(latency=5.0)
+    assert admission.limit == pytest.approx(limit * 0.9)
+    admission.release(overloaded=True)
+    assert admission.limit == pytest.approx(limit * 0.9 / 2)
+
+
+def test_limit_stays_within_bounds():
+    admission = AdmissionController(max_limit=3, min_limit=2, initial_limit=3)
+    admission.in_flight = 10
+    for _ in range(5):
+        admission.release(overloaded=True)
+    assert admission.limit == 2
+    for _ in range(5):
+        admission.release(latency=1.0)
+    assert admission.limit == 3
+
+
+def test_one_fast_outlier_does_not_collapse_the_limit():
+    admission = AdmissionController(max_limit=100)
+    admission.in_flight = 41
+    admission.release(latency=0.5)
+    for _ in range(40):
+        admission.release(latency=8.0)
+    assert admission.limit == 100
+    assert admission.baseline() == 8.0
+
+
+def test_latency_classes_have_separate_baselines():
+    admission = AdmissionController(max_limit=100, initial_limit=50)
+    admission.in_flight = 40
+    for _ in range(20):
+        admission.release(latency=0.5, latency_class='repair')
+    for _ in range(20):
+        admission.release(latency=8.0, latency_class='generation')
+    assert admission.limit > 50
+    assert admission.stats()['baseline_latency_ms'] == {'generation': 8000.0, 'repair': 500.0}
+
+
+def test_provider_overload_maps_to_429_and_penalizes_the_bucket():
+    async def scenario():
+        admission = AdmissionController(max_limit=8)
+        with pytest.raises(RateLimitError) as excinfo:
+            async with admission.admit():
+                raise ProviderError("slow down", status_code=429, retry_after='3')
+        return admission, excinfo.value
+
+    admission, error = asyncio.run(scenario())
+    assert error.retry_after == 3
+    assert admission.limit == 4
+    assert admission.in_flight == 0
+    assert admission.bucket.delay() > 2
+
+
+def test_pending_retry_after_rejects_before_admitting():
+    async def scenario():
+        admission = AdmissionController(queue_timeout=1.0)
+        admission.bucket.penalize(30)
+        with pytest.raises(RateLimitError) as excinfo:
+            await admission.acquire()
+        return admission, excinfo.value
+
+    admission, error = asyncio.run(scenario())
+    assert error.retry_after == 30
+    assert admission.in_flight == 0
+
+
+def test_other_provider_errors_pass_through():
+    async def scenario():
+        admission = AdmissionController(max_limit=8)
+        with pytest.raises(ProviderError):
+            async with admission.admit():
+                raise ProviderError("bad request", status_code=400)
+        return admission
+
+    admission = asyncio.run(scenario())
+    assert admission.limit == 8
+    assert admission.in_flight == 0
+
+
+def test_retry_after_seconds_parses_delta_and_date():
+    assert retry_after_seconds('2.5') == 2.5
+    assert retry_after_seconds('-1') == 0.0
+    assert retry_after_seconds(None) is None
+    assert retry_after_seconds('not a date') is None
+    assert retry_after_seconds('Thu, 01 Jan 1970 00:00:00 GMT') == 0.0
@@ -0,0 +1,48 @@
+import asyncio
+
+from services.batch_service import run_batch
+
+
+class FakeService:
+    def __init__(self, fail=()):
+        self.fail = set(fail)
+        self.in_flight = 0
+        self.peak = 0
+        self.remembered = []
+
+    async def generate_pipeline_config(self, history):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        try:
+            await asyncio.sleep(0.005)
+            if history[0]['content'] in self.fail:
+                raise Exception('upstream failed')
+            return {'explanation': history[0]['content']}
+        finally:
+            self.in_flight -= 1
+
+    async def remember_design(self, history, result):
+        self.remembered.append(result)
+
+
+def _collect(service, requests, concurrency):
+    async def run():
+        return [item async for item in run_batch(service, requests, concurrency)]
+    return asyncio.run(run())
+
+
+def test_concurrency_bound_is_respected():
+    service = FakeService()
+    requests = [[{'role': 'user', 'content': str(i)}] for i in range(20)]
+    results = _collect(service, requests, 3)
+    assert service.peak == 3
+    assert sorted(index for index, _, _ in results) == list(range(20))
+
+
+def test_failed_item_does_not_stop_the_batch():
+    service = FakeService(fail={'1'})
+    requests = [[{'role': 'user', 'content': str(i)}] for i in range(3)]
+    results = {index: (result, error) for index, result, error in _collect(service, requests, 2)}
+    assert results[1] == (None, 'upstream failed')
+    assert results[0][0] == {'explanation': '0'} and results[2][1] is None
+    assert len(service.remembered) == 2
@@ -0,0 +1,38 @@
+import pytest
+
+from config.config import Config
+from tests.helpers import post_json, sse_events
+
+
+@pytest.mark.parametrize('body', [[1, 2], 'copy', 5, {'message': 5}, {'message': '  '}, {'other': 'x'}])
+def test_stream_rejects_malformed_bodies(body):
+    status, text = post_json('/api/chat/stream', body)
+    assert status == 400
+    assert '"success":false' in text
+
+
+@pytest.mark.parametrize('body', [
+    None, [1], {'items': []}, {'items': [{'message': 5}]}, {'items': [{'id': 'a'}]}, {'items': ['copy']},
+    {'items': [{'message': 'copy from mysql to snowflake'}], 'concurrency': 'abc'},
+])
+def test_batch_rejects_malformed_bodies(body):
+    status, _ = post_json('/api/batch', body)
+    assert status == 400
+
+
+def test_batch_streams_one_item_event_per_request():
+    items = [{'id': f'item-{i}', 'message': f'copy from mysql to snowflake table {i}'} for i in range(5)]
+    status, text = post_json('/api/batch', {'items': items, 'concurrency': 100})
+    assert status == 200
+    events = sse_events(text)
+    assert events[0] == ('batch', {'items': 5, 'concurrency': Config.BATCH_CONCURRENCY})
+    item_events = [data for event, data in events if event == 'item']
+    assert sorted(data['id'] for data in item_events) == [item['id'] for item in items]
+    assert all(data['success'] and data['response']['json_configs'] for data in item_events)
+    assert events[-1] == ('done', {'items': 5, 'succeeded': 5, 'failed': 0})
+
+
+def test_batch_concurrency_is_clamped_to_one():
+    status, text = post_json('/api/batch', {'items': [{'message': 'copy from mysql to snowflake'}], 'concurrency': -3})
+    assert status == 200
+    assert sse_events(text)[0][1]['concurrency'] == 1
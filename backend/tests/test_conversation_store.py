@@ -0,0 +1,124 @@
+import asyncio
+import threading
+
+import pytest
+
+from services.conversation_store import ConversationStore, MemoryBackend, SQLiteBackend
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def backend(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryBackend()
+    return SQLiteBackend(str(tmp_path / 'conversations.db'))
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+def test_history_round_trip(backend):
+    store = ConversationStore(backend)
+
+    async def scenario():
+        await store.append('s1', 'user', 'copy from blob')
+        await store.append('s1', 'assistant', 'done')
+        await store.set_config('s1', {'json_configs': {'datasets': []}})
+        return await store.get('s1'), await store.get_config('s1'), await store.get('other')
+
+    history, config, other = _run(scenario())
+    assert history == [{'role': 'user', 'content': 'copy from blob'}, {'role': 'assistant', 'content': 'done'}]
+    assert config == {'json_configs': {'datasets': []}}
+    assert other == []
+
+
+def test_ring_buffer_drops_oldest_messages(backend):
+    store = ConversationStore(backend, max_messages=3, max_bytes=10)
+
+    async def scenario():
+        for content in ['aaaa', 'bbbb', 'cccc', 'dddd']:
+            await store.append('s1', 'user', content)
+        return await store.get('s1')
+
+    assert [message['content'] for message in _run(scenario())] == ['cccc', 'dddd']
+
+
+def test_expired_session_is_not_served(backend):
+    store = ConversationStore(backend, ttl=-1)
+
+    async def scenario():
+        await store.append('s1', 'user', 'hello')
+        return await store.get('s1'), await store.get_config('s1')
+
+    assert _run(scenario()) == ([], None)
+
+
+def test_eviction_runs_every_n_writes(backend):
+    store = ConversationStore(backend, max_sessions=2, evict_every=4)
+
+    async def scenario():
+        for index in range(3):
+            await store.append(f's{index}', 'user', 'hello')
+        before = await store.stats()
+        await store.append('s3', 'user', 'hello')
+        return before, await store.stats(), await store.get('s0')
+
+    before, after, evicted = _run(scenario())
+    assert before == {'sessions': 3, 'evictions': 0}
+    assert after == {'sessions': 2, 'evictions': 2}
+    assert evicted == []
+
+
+def test_clear_deletes_the_session(backend):
+    store = ConversationStore(backend)
+
+    async def scenario():
+        await store.append('s1', 'user', 'hello')
+        await store.clear('s1')
+        return await store.get('s1'), await store.stats()
+
+    assert _run(scenario()) == ([], {'sessions': 0, 'evictions': 0})
+
+
+def test_sqlite_calls_run_off_the_event_loop(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'conversations.db'))
+    threads = []
+    load = backend.load
+
+    def recording_load(session_id):
+        threads.append(threading.current_thread())
+        return load(session_id)
+
+    backend.load = recording_load
+    _run(ConversationStore(backend).append('s1', 'user', 'hello'))
+    assert threads and threading.main_thread() not in threads
+
+
+def test_sqlite_sessions_are_shared_between_stores(tmp_path):
+    path = str(tmp_path / 'conversations.db')
+    first, second = ConversationStore(SQLiteBackend(path)), ConversationStore(SQLiteBackend(path))
+
+    async def scenario():
+        await asyncio.gather(*[
+            store.append('s1', 'user', f'message {index}')
+            for index in range(10) for store in (first, second)
+        ])
+        return await second.get('s1')
+
+    history = _run(scenario())
+    assert len(history) == 20
+
+
+def test_sqlite_failed_write_rolls_back(tmp_path):
+    backend = SQLiteBackend(str(tmp_path / 'conversations.db'))
+    store = ConversationStore(backend)
+    _run(store.append('s1', 'user', 'hello'))
+
+    def failing_save(session_id, session):
+        backend._db.execute('DELETE FROM conversation_messages WHERE session_id = ?', (session_id,))
+        raise RuntimeError("disk full")
+
+    backend.save = failing_save
+    with pytest.raises(RuntimeError):
+        _run(store.append('s1', 'user', 'again'))
+    assert list(backend.load('s1')['messages']) == [('user', 'hello')]
@@ -0,0 +1,99 @@
+import asyncio
+import json
+
+import pytest
+
+from config.config import Config
+from services.admission import AdmissionController
+from services.decomposition import PlanError, merge, normalize_plan
+from services.llm_service import LLMService
+from tests.helpers import post_json
+
+PLAN = {
+    'pipeline_name': 'pl_blob_fanout',
+    'linked_services': [{'name': f'ls_{i}', 'type': 'AzureBlobStorage'} for i in range(3)],
+    'datasets': [{'name': f'ds_{i}', 'type': 'DelimitedText', 'linked_service': f'ls_{i}'} for i in range(3)],
+    'activities': [{'name': f'Copy{i}', 'type': 'Copy', 'inputs': [f'ds_{i}'], 'outputs': [f'ds_{(i + 1) % 3}']}
+                   for i in range(3)],
+    'explanation': 'Fan out'
+}
+
+
+def test_normalize_plan_rejects_bad_shapes():
+    for plan in (None, [], {'linked_services': [], 'datasets': []},
+                 {**PLAN, 'activities': []}, {**PLAN, 'datasets': [{'name': 'ds'}]}):
+        with pytest.raises(PlanError):
+            normalize_plan(plan)
+
+
+def test_merge_forces_plan_names_and_references():
+    plan = normalize_plan(json.loads(json.dumps(PLAN)))
+    artifacts = [('linked_service', entry, {'name': 'wrong'}) for entry in plan['linked_services']]
+    artifacts += [('dataset', entry, {'properties': {'linkedServiceName': {'referenceName': 'ls_x'}}})
+                  for entry in plan['datasets']]
+    artifacts += [('activity', entry, {'name': entry['name'], 'typeProperties': {}}) for entry in plan['activities']]
+    response, repairs = merge(plan, artifacts)
+
+    configs = response['json_configs']
+    assert [ls['name'] for ls in configs['linked_services']] == ['ls_0', 'ls_1', 'ls_2']
+    assert configs['datasets'][1]['properties']['linkedServiceName']['referenceName'] == 'ls_1'
+    assert configs['pipeline']['properties']['activities'][0]['inputs'] == [
+        {'referenceName': 'ds_0', 'type': 'DatasetReference'}]
+    assert {'artifact': 'linked_service', 'name': 'ls_0', 'field': 'name'} in repairs
+    assert len(response['pipeline_flow']['nodes']) == 9
+
+
+def _service(complete):
+    service = LLMService()
+    service.cache = None
+    service.examples = None
+    service.router.complete = complete
+    return service
+
+
+def _reply(payload):
+    return {'content': json.dumps(payload), 'provider': 'mock', 'model': 'mock', 'latency': 0.0}
+
+
+def _fake_upstream(calls):
+    async def complete(messages, prefer=None, json_schema=None, **options):
+        calls.append(messages)
+        await asyncio.sleep(0.005)
+        if 'compact plan' in messages[0]['content']:
+            return _reply(PLAN)
+        if messages[0]['content'].startswith('You are an Azure Data Factory expert filling'):
+            return _reply({'typeProperties': {}})
+        return _reply({'pipeline_flow': {'nodes': [], 'edges': []}, 'explanation': 'single call',
+                       'json_configs': {'linked_services': [], 'datasets': [], 'pipeline': {}}})
+    return complete
+
+
+def test_plan_then_fan_out():
+    calls = []
+    service = _service(_fake_upstream(calls))
+    history = [{'role': 'user', 'content': 'fan out three blobs'}]
+    result = asyncio.run(service.generate_pipeline_config(history, decompose=True))
+    assert result['metadata']['mode'] == 'decomposed'
+    assert result['decomposition']['artifacts'] == 9
+    assert len(calls) == 1 + 9
+    assert [ds['name'] for ds in result['json_configs']['datasets']] == ['ds_0', 'ds_1', 'ds_2']
+
+
+def test_falls_back_to_one_call_when_not_admitted(monkeypatch):
+    monkeypatch.setattr(Config, 'DECOMPOSED_CONCURRENCY', 4)
+    calls = []
+    service = _service(_fake_upstream(calls))
+    # Two slots and a one-place queue: the fourth concurrent sub-request is rejected
+    service.admission = AdmissionController(max_limit=2, queue_size=1)
+    history = [{'role': 'user', 'content': 'fan out three blobs'}]
+    result = asyncio.run(service.generate_pipeline_config(history, decompose=True))
+    assert result['metadata']['mode'] == 'full'
+    assert result['explanation'] == 'single call'
+    assert service.admission.in_flight == 0
+
+
+@pytest.mark.parametrize('decompose', ['false', 0, 1, 'yes', [], {}])
+def test_chat_accepts_only_boolean_decompose(decompose):
+    status, text = post_json('/api/chat', {'message': 'copy from mysql to snowflake', 'decompose': decompose})
+    assert status == 400
+    assert 'decompose' in text
@@ -0,0 +1,79 @@
+import asyncio
+import threading
+
+import pytest
+
+from services.example_index import ExampleIndex, HashingEmbedder
+from services.llm_service import LLMService
+
+REQUESTS = [
+    'copy csv files from blob storage to azure sql database',
+    'load mysql orders table into snowflake every night',
+    'ingest rest api json into data lake gen2 parquet',
+]
+
+
+def _index(path=None, duplicate_threshold=0.98):
+    index = ExampleIndex(HashingEmbedder(256), path=path, duplicate_threshold=duplicate_threshold)
+    for text in REQUESTS:
+        assert index.add(text, {'request': text})
+    return index
+
+
+def test_search_ranks_the_most_similar_design_first():
+    hits = _index().search('copy csv from blob storage into sql database', k=3)
+    assert [record['text'] for _, record in hits][0] == REQUESTS[0]
+    scores = [score for score, _ in hits]
+    assert scores == sorted(scores, reverse=True)
+
+
+def test_search_batch_answers_each_query_and_respects_min_score():
+    index = _index()
+    results = index.search_batch(['mysql orders into snowflake', 'rest api json to parquet'], k=1)
+    assert [hits[0][1]['text'] for hits in results] == [REQUESTS[1], REQUESTS[2]]
+    assert index.search('kafka events to cosmos', k=3, min_score=0.9) == []
+
+
+def test_near_duplicates_are_skipped_at_the_threshold():
+    index = _index()
+    assert not index.add('Copy CSV files from Blob storage to Azure SQL database!', {})
+    assert index.add('copy csv files from blob storage to azure sql database and archive them', {})
+    stats = index.stats()
+    assert (stats['size'], stats['duplicates'], stats['added']) == (4, 1, 4)
+
+
+def test_lower_threshold_treats_related_requests_as_duplicates():
+    index = ExampleIndex(HashingEmbedder(256), duplicate_threshold=0.5)
+    assert index.add(REQUESTS[0], {})
+    assert not index.add('copy csv files from blob storage to azure sql database and archive them', {})
+
+
+def test_persistent_index_reloads_and_grows(tmp_path):
+    path = str(tmp_path / 'examples')
+    index = ExampleIndex(HashingEmbedder(256), path=path, initial_capacity=2)
+    for text in REQUESTS:
+        index.add(text, {'request': text})
+    assert index.stats()['capacity'] == 4
+    index._lock_file.close()
+
+    reloaded = ExampleIndex(HashingEmbedder(256), path=path)
+    assert reloaded.stats()['persistent'] and reloaded.stats()['size'] == 3
+    assert reloaded.search('mysql orders into snowflake', k=1)[0][1] == {
+        'text': REQUESTS[1], 'design': {'request': REQUESTS[1]}}
+
+
+def test_remember_design_indexes_off_the_event_loop():
+    service = LLMService()
+    if service.examples is None:
+        pytest.skip("retrieval is disabled")
+    threads = []
+    add = service.examples.add
+
+    def recording_add(text, design):
+        threads.append(threading.current_thread())
+        return add(text, design)
+
+    service.examples.add = recording_add
+    result = {'validation': {'valid': True}, 'pipeline_flow': {'nodes': [], 'edges': []}, 'json_configs': {}}
+    asyncio.run(service.remember_design([{'role': 'user', 'content': REQUESTS[0]}], result))
+    assert threads and threading.main_thread() not in threads
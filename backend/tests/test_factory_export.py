@@ -0,0 +1,116 @@
+import io
+import json
+import zipfile
+
+import pytest
+
+from services.factory_export import ArtifactGraph, ExportError, arm_template, stream_zip
+from tests.helpers import post_json
+
+
+def _ref(kind, name):
+    return {'referenceName': name, 'type': kind}
+
+
+def _design():
+    return {
+        'linked_services': [{'name': 'ls_blob', 'properties': {'type': 'AzureBlobStorage'}}],
+        'datasets': [{'name': 'ds_src', 'properties': {
+            'linkedServiceName': _ref('LinkedServiceReference', 'ls_blob')}}],
+        'pipeline': {'name': 'pl_copy', 'properties': {'activities': [{
+            'name': 'Copy', 'inputs': [_ref('DatasetReference', 'ds_src')]}]}}
+    }
+
+
+def _zip_entries(graph, fmt='both'):
+    order = graph.deployment_order()
+    data = b''.join(stream_zip(graph, order, 'adf-factory', fmt, chunk_bytes=16))
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        return {name: json.loads(archive.read(name)) for name in archive.namelist()}
+
+
+def test_order_puts_dependencies_first():
+    graph = ArtifactGraph.from_designs([_design()])
+    assert graph.deployment_order() == [('linked_service', 'ls_blob'), ('dataset', 'ds_src'), ('pipeline', 'pl_copy')]
+
+
+def test_dangling_reference_blocks_deployment():
+    design = _design()
+    design['linked_services'] = []
+    graph = ArtifactGraph.from_designs([design])
+    with pytest.raises(ExportError) as excinfo:
+        graph.deployment_order()
+    assert excinfo.value.problems['dangling'] == [
+        {'artifact': 'dataset', 'name': 'ds_src', 'reference': 'ls_blob', 'reference_type': 'linked_service'}]
+
+
+def test_pipeline_cycle_is_reported():
+    def pipeline(name, calls):
+        return {'name': name, 'properties': {'activities': [{
+            'type': 'ExecutePipeline', 'typeProperties': {'pipeline': _ref('PipelineReference', calls)}}]}}
+
+    graph = ArtifactGraph.from_designs([{'pipeline': pipeline('pl_a', 'pl_b')}, {'pipeline': pipeline('pl_b', 'pl_a')}])
+    plan = graph.plan()
+    assert plan['order'] == []
+    cycle = [entry['name'] for entry in plan['cycles'][0]]
+    assert cycle[0] == cycle[-1] and set(cycle) == {'pl_a', 'pl_b'}
+    with pytest.raises(ExportError):
+        graph.deployment_order()
+
+
+def test_later_design_replaces_and_records_conflict():
+    changed = _design()
+    changed['linked_services'][0]['properties'] = {'type': 'AzureDataLakeStoreGen2'}
+    graph = ArtifactGraph.from_designs([_design(), changed])
+    assert graph.conflicts == [{'artifact': 'linked_service', 'name': 'ls_blob'}]
+    assert graph.artifacts[('linked_service', 'ls_blob')]['properties']['type'] == 'AzureDataLakeStoreGen2'
+
+
+@pytest.mark.parametrize('name', ['../../../etc/evil', "o'brien", 'a/b', '1st', 'ok\n', 5])
+def test_invalid_names_are_rejected(name):
+    design = _design()
+    design['datasets'][0]['name'] = name
+    with pytest.raises(ExportError) as excinfo:
+        ArtifactGraph.from_designs([design])
+    assert excinfo.value.problems['invalid_names'] == [{'artifact': 'dataset', 'name': name}]
+
+
+def test_zip_layout():
+    entries = _zip_entries(ArtifactGraph.from_designs([_design()]))
+    assert sorted(entries) == [
+        'arm/ARMTemplateForFactory.json', 'arm/ARMTemplateParametersForFactory.json',
+        'factory/dataset/ds_src.json', 'factory/linkedService/ls_blob.json', 'factory/pipeline/pl_copy.json'
+    ]
+    assert entries['factory/dataset/ds_src.json']['name'] == 'ds_src'
+    assert entries['arm/ARMTemplateParametersForFactory.json']['parameters']['factoryName'] == {'value': 'adf-factory'}
+    resources = entries['arm/ARMTemplateForFactory.json']['resources']
+    assert [resource['type'].rsplit('/', 1)[1] for resource in resources] == ['linkedServices', 'datasets', 'pipelines']
+    assert resources[1]['dependsOn'] == ["[concat(variables('factoryId'), '/linkedServices/ls_blob')]"]
+
+
+def test_streamed_template_matches_arm_template():
+    graph = ArtifactGraph.from_designs([_design()])
+    entries = _zip_entries(graph, fmt='arm')
+    assert sorted(entries) == ['arm/ARMTemplateForFactory.json', 'arm/ARMTemplateParametersForFactory.json']
+    assert entries['arm/ARMTemplateForFactory.json'] == arm_template(graph, graph.deployment_order())
+
+
+def test_quotes_are_escaped_in_arm_expressions():
+    graph = ArtifactGraph()
+    graph.add('linked_service', {'name': "o'brien", 'properties': {}})
+    resource = arm_template(graph, [('linked_service', "o'brien")])['resources'][0]
+    assert resource['name'] == "[concat(parameters('factoryName'), '/o''brien')]"
+
+
+@pytest.mark.parametrize('path', ['/api/export', '/api/export/plan'])
+def test_routes_reject_invalid_names(path):
+    design = _design()
+    design['pipeline']['name'] = '../evil'
+    status, text = post_json(path, {'designs': [design]})
+    assert status == 400
+    assert json.loads(text)['plan']['invalid_names'] == [{'artifact': 'pipeline', 'name': '../evil'}]
+
+
+def test_export_rejects_invalid_factory_name():
+    status, _ = post_json('/api/export', {'designs': [_design()], 'factory_name': 'a"; x'})
+    assert status == 400
@@ -0,0 +1,73 @@
+import copy
+
+from utils.graph_layout import LAYER_SPACING, NODE_SPACING, FlowLayout, layout_component
+
+
+def _flow(node_ids, edges):
+    return {
+        'nodes': [{'id': node, 'type': 'activity'} for node in node_ids],
+        'edges': [{'source': source, 'target': target} for source, target in edges]
+    }
+
+
+def _positions(flow):
+    return {node['id']: (node['position']['x'], node['position']['y']) for node in flow['nodes']}
+
+
+EDGES = [('src', 'copy'), ('copy', 'transform'), ('transform', 'sink'), ('src', 'sink'), ('lookup', 'transform')]
+NODES = ['src', 'copy', 'lookup', 'transform', 'sink']
+
+
+def test_edges_point_to_later_layers():
+    positions = layout_component(NODES, EDGES)
+    for source, target in EDGES:
+        assert positions[target][0] > positions[source][0]
+    assert {x % LAYER_SPACING for x, _ in positions.values()} == {0}
+
+
+def test_source_is_pulled_next_to_its_successor():
+    positions = layout_component(NODES, EDGES)
+    assert positions['lookup'][0] == positions['transform'][0] - LAYER_SPACING
+
+
+def test_cycles_are_laid_out():
+    positions = layout_component(['a', 'b', 'c'], [('a', 'b'), ('b', 'c'), ('c', 'a')])
+    assert [positions[node][0] for node in 'abc'] == [0, LAYER_SPACING, 2 * LAYER_SPACING]
+
+
+def test_ordering_removes_avoidable_crossings():
+    # Declared so that the first layer's order crosses the second's
+    nodes = ['a', 'b', 'c', 'd']
+    positions = layout_component(nodes, [('a', 'd'), ('b', 'c')])
+    assert (positions['a'][1] < positions['b'][1]) == (positions['d'][1] < positions['c'][1])
+
+
+def test_layout_is_deterministic():
+    first = _positions(FlowLayout().apply(_flow(NODES, EDGES)))
+    second = _positions(FlowLayout().apply(_flow(NODES, EDGES)))
+    assert first == second
+
+
+def test_no_two_nodes_overlap():
+    edges = EDGES + [('other_a', 'other_b'), ('other_a', 'other_c')]
+    nodes = NODES + ['other_a', 'other_b', 'other_c', 'lonely']
+    positions = list(_positions(FlowLayout().apply(_flow(nodes, edges))).values())
+    for index, (x, y) in enumerate(positions):
+        for other_x, other_y in positions[index + 1:]:
+            assert x != other_x or abs(y - other_y) >= NODE_SPACING
+
+
+def test_existing_component_keeps_its_layout_when_another_is_added():
+    layout = FlowLayout()
+    before = _positions(layout.apply(_flow(NODES, EDGES)))
+    after = _positions(layout.apply(_flow(NODES + ['x', 'y'], EDGES + [('x', 'y')])))
+    assert {node: after[node] for node in NODES} == before
+    assert layout.stats()['hits'] == 1
+
+
+def test_unknown_and_self_edges_are_ignored():
+    flow = _flow(['a', 'b'], [('a', 'b'), ('a', 'missing'), ('b', 'b')])
+    flow['nodes'].append({'type': 'note'})
+    positions = FlowLayout().apply(copy.deepcopy(flow))
+    assert 'position' not in positions['nodes'][2]
+    assert positions['nodes'][1]['position']['x'] == LAYER_SPACING
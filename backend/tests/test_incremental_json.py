@@ -0,0 +1,43 @@
+import json
+
+from services.llm_service import STREAM_EVENTS
+from utils.incremental_json import IncrementalJSONParser
+
+RESPONSE = {
+    'pipeline_flow': {'nodes': [{'id': 'ls_sql'}, {'id': 'ds_sql'}], 'edges': [{'id': 'edge_1'}]},
+    'json_configs': {'linked_services': [{'name': 'ls_sql'}], 'datasets': [], 'pipeline': {'name': 'pl_sql'}},
+    'explanation': 'Copy {all} tables'
+}
+
+
+def _feed(text, chunk_size=7):
+    parser = IncrementalJSONParser(STREAM_EVENTS.keys())
+    events = []
+    for start in range(0, len(text), chunk_size):
+        events.extend(parser.feed(text[start:start + chunk_size]))
+        if parser.done:
+            break
+    return parser, events
+
+
+def test_emits_artifacts_in_order():
+    parser, events = _feed(json.dumps(RESPONSE))
+    assert parser.done
+    assert [path for path, _ in events] == [
+        ('pipeline_flow', 'nodes', 0), ('pipeline_flow', 'nodes', 1), ('pipeline_flow', 'edges', 0),
+        ('json_configs', 'linked_services', 0), ('json_configs', 'pipeline'),
+    ]
+    assert events[-1][1] == {'name': 'pl_sql'}
+
+
+def test_braces_in_leading_prose_are_skipped():
+    text = f"Here is the {{pipeline}} you asked for: {json.dumps(RESPONSE)}"
+    parser, events = _feed(text)
+    assert parser.done
+    assert parser.buffer.endswith(json.dumps(RESPONSE))
+    assert ('json_configs', 'pipeline') in [path for path, _ in events]
+
+
+def test_not_done_while_root_is_open():
+    parser, _ = _feed(json.dumps(RESPONSE)[:-1])
+    assert not parser.done
@@ -0,0 +1,47 @@
+import json
+
+from utils.json_extractor import extract_json
+
+RESPONSE = {
+    'pipeline_flow': {
+        'nodes': [{'id': 'ls_sql', 'type': 'linked_service'}, {'id': 'ds_sql', 'type': 'dataset'}],
+        'edges': [{'id': 'edge_1', 'source': 'ls_sql', 'target': 'ds_sql'}]
+    },
+    'json_configs': {'linked_services': [{'name': 'ls_sql'}], 'datasets': [], 'pipeline': {'name': 'pl_sql'}},
+    'explanation': 'Copy {all} tables'
+}
+
+
+def test_plain_object():
+    assert extract_json(json.dumps(RESPONSE)) == RESPONSE
+
+
+def test_fenced_reply():
+    reply = f"Here you go:\n```json\n{json.dumps(RESPONSE, indent=2)}\n```\nLet me know."
+    assert extract_json(reply) == RESPONSE
+
+
+def test_trailing_commas():
+    reply = '{"pipeline_flow": {"nodes": [{"id": "a"},], "edges": [],}, "explanation": "x",}'
+    assert extract_json(reply) == {'pipeline_flow': {'nodes': [{'id': 'a'}], 'edges': []}, 'explanation': 'x'}
+
+
+def test_prose_with_braces():
+    reply = f"Here is the {{pipeline}} you asked for: {json.dumps(RESPONSE)} (see {{notes}})"
+    assert extract_json(reply) == RESPONSE
+
+
+def test_largest_top_level_object_wins():
+    reply = f'{{"note": "first"}} then {json.dumps(RESPONSE)}'
+    assert extract_json(reply) == RESPONSE
+
+
+def test_truncated_reply_is_rejected():
+    text = json.dumps(RESPONSE)
+    for cut in (len(text) * 2 // 3, len(text) - 1, len(text) // 3):
+        assert extract_json(text[:cut]) is None
+
+
+def test_empty_and_no_object():
+    assert extract_json('') is None
+    assert extract_json('no json here') is None
@@ -0,0 +1,54 @@
+import pytest
+
+from utils.json_patch import JSONPatchError, apply_patch, resolve_pointer
+
+DESIGN = {
+    'json_configs': {
+        'datasets': [{'name': 'ds_a'}, {'name': 'ds_b'}],
+        'pipeline': {'name': 'pl', 'properties': {'activities': []}}
+    }
+}
+
+
+def test_add_replace_remove():
+    result = apply_patch(DESIGN, [
+        {'op': 'add', 'path': '/json_configs/datasets/-', 'value': {'name': 'ds_c'}},
+        {'op': 'replace', 'path': '/json_configs/pipeline/name', 'value': 'pl_new'},
+        {'op': 'remove', 'path': '/json_configs/datasets/0'},
+    ])
+    assert [d['name'] for d in result['json_configs']['datasets']] == ['ds_b', 'ds_c']
+    assert result['json_configs']['pipeline']['name'] == 'pl_new'
+    # The input is never modified
+    assert [d['name'] for d in DESIGN['json_configs']['datasets']] == ['ds_a', 'ds_b']
+
+
+def test_move_copy_and_test():
+    result = apply_patch(DESIGN, [
+        {'op': 'test', 'path': '/json_configs/datasets/0/name', 'value': 'ds_a'},
+        {'op': 'copy', 'from': '/json_configs/datasets/0', 'path': '/json_configs/datasets/-'},
+        {'op': 'move', 'from': '/json_configs/datasets/1', 'path': '/json_configs/datasets/0'},
+    ])
+    assert [d['name'] for d in result['json_configs']['datasets']] == ['ds_b', 'ds_a', 'ds_a']
+
+
+def test_escaped_pointer_tokens():
+    result = apply_patch({'a/b': {'c~d': 1}}, [{'op': 'replace', 'path': '/a~1b/c~0d', 'value': 2}])
+    assert resolve_pointer(result, '/a~1b/c~0d') == 2
+
+
+@pytest.mark.parametrize('operations', [
+    [{'op': 'move', 'path': '/json_configs/datasets/0'}],
+    [{'op': 'copy', 'path': '/json_configs/datasets/-'}],
+    [{'op': 'add', 'value': 1}],
+    [{'path': '/json_configs/pipeline'}],
+    [{'op': 'frobnicate', 'path': '/json_configs'}],
+    [{'op': 'test', 'path': '/json_configs/pipeline/name', 'value': 'other'}],
+    [{'op': 'remove', 'path': '/json_configs/datasets/5'}],
+    [{'op': 'replace', 'path': '/json_configs/missing', 'value': 1}],
+    [{'op': 'move', 'from': '/json_configs', 'path': '/json_configs/pipeline/x'}],
+    {'op': 'add'},
+    ['not an operation'],
+])
+def test_invalid_operations_raise_patch_error(operations):
+    with pytest.raises(JSONPatchError):
+        apply_patch(DESIGN, operations)
@@ -0,0 +1,32 @@
+from services.prompt_builder import TRUNCATION_MARKER, PromptBuilder
+
+
+def test_newest_turn_is_kept_verbatim_when_context_is_large():
+    builder = PromptBuilder('system', token_budget=600, summary_tokens=50)
+    history = [
+        {'role': 'user', 'content': 'copy sql to blob ' * 20},
+        {'role': 'assistant', 'content': 'done'},
+        {'role': 'user', 'content': 'add a lookup activity before the first copy'},
+    ]
+    messages, _ = builder.build(history, context='design ' * 1000)
+    assert messages[-1] == history[-1]
+    assert not builder.fits(history, 'design ' * 1000)
+    assert builder.fits(history, 'design')
+
+
+def test_oversized_newest_turn_keeps_head_and_tail():
+    builder = PromptBuilder('system', token_budget=300, summary_tokens=50)
+    content = 'head ' + 'x' * 5000 + ' tail'
+    messages, _ = builder.build([{'role': 'user', 'content': content}])
+    truncated = messages[-1]['content']
+    assert TRUNCATION_MARKER in truncated
+    assert truncated.startswith('head') and truncated.endswith('tail')
+
+
+def test_truncate_never_returns_only_the_marker():
+    builder = PromptBuilder('system')
+    content = 'add a lookup activity before the first copy. ' * 100
+    for max_tokens in (-50, 0, 4, 10):
+        truncated = builder._truncate(content, max_tokens)
+        assert truncated != TRUNCATION_MARKER
+        assert truncated.startswith('add a lookup')
@@ -0,0 +1,62 @@
+import asyncio
+import copy
+import json
+
+from services.llm_service import LLMService
+from utils.json_patch import apply_patch
+
+BASE = {
+    'pipeline_flow': {'nodes': [], 'edges': []},
+    'json_configs': {
+        'linked_services': [{'name': 'ls_blob', 'type': 'Microsoft.DataFactory/factories/linkedservices',
+                             'properties': {'type': 'AzureBlobStorage', 'typeProperties': {}}}],
+        'datasets': [],
+        'pipeline': {'name': 'pl_copy', 'type': 'Microsoft.DataFactory/factories/pipelines',
+                     'properties': {'activities': [{'name': 'Copy', 'type': 'Copy'}]}}
+    }
+}
+BROKEN_DATASET = {'name': 'ds_src', 'properties': {'type': 'DelimitedText'}}
+FIXED_DATASET = {
+    'name': 'ds_renamed', 'type': 'Microsoft.DataFactory/factories/datasets',
+    'properties': {'type': 'DelimitedText', 'typeProperties': {},
+                   'linkedServiceName': {'referenceName': 'ls_blob', 'type': 'LinkedServiceReference'}}
+}
+WRONG_KIND = {'name': 'ls_missing', 'type': 'Microsoft.DataFactory/factories/linkedservices',
+              'properties': {'type': 'AzureBlobStorage', 'typeProperties': {}}}
+
+
+def _service(repair_reply):
+    patch_reply = {'patch': [{'op': 'add', 'path': '/json_configs/datasets/-', 'value': BROKEN_DATASET}],
+                   'explanation': 'Added a dataset'}
+
+    async def complete(messages, prefer=None, json_schema=None, **options):
+        fixing = messages[0]['content'].startswith('You are an Azure Data Factory expert fixing')
+        payload = repair_reply if fixing else patch_reply
+        return {'content': json.dumps(payload), 'provider': 'mock', 'model': 'mock', 'latency': 0.0}
+
+    service = LLMService()
+    service.cache = None
+    service.examples = None
+    service.router.complete = complete
+    return service
+
+
+def _edit(service):
+    history = [{'role': 'user', 'content': 'copy blob'}, {'role': 'assistant', 'content': 'done'},
+               {'role': 'user', 'content': 'add a source dataset'}]
+    return asyncio.run(service.generate_pipeline_config(history, copy.deepcopy(BASE)))
+
+
+def test_repair_keeps_name_and_patch_matches_result():
+    result = _edit(_service(FIXED_DATASET))
+    assert result['validation']['valid']
+    assert result['repair']['attempts'] == 1
+    assert result['json_configs']['datasets'][0]['name'] == 'ds_src'
+    assert apply_patch(BASE, result['patch'])['json_configs'] == result['json_configs']
+
+
+def test_wrong_kind_repair_is_rejected():
+    result = _edit(_service(WRONG_KIND))
+    assert not result['validation']['valid']
+    assert result['repair']['artifacts'] == 0
+    assert result['json_configs']['datasets'][0] == BROKEN_DATASET
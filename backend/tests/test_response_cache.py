@@ -0,0 +1,84 @@
+import threading
+
+from services.response_cache import ResponseCache
+
+
+def test_lru_evicts_the_least_recently_used_entry():
+    cache = ResponseCache(max_entries=2)
+    cache.set('a', {'n': 1})
+    cache.set('b', {'n': 2})
+    assert cache.get('a') == {'n': 1}
+    cache.set('c', {'n': 3})
+    assert cache.get('b') is None
+    assert cache.get('a') == {'n': 1} and cache.get('c') == {'n': 3}
+    assert cache.stats()['evictions'] == 1
+
+
+def test_byte_bound_evicts_and_skips_oversized_values():
+    cache = ResponseCache(max_bytes=20)
+    cache.set('a', 'x' * 10)
+    cache.set('b', 'y' * 10)
+    assert cache.get('a') is None
+    cache.set('big', 'z' * 50)
+    assert cache.get('big') is None
+    assert cache.stats()['bytes'] <= 20
+
+
+def test_values_are_private_copies():
+    cache = ResponseCache()
+    value = {'nodes': []}
+    cache.set('a', value)
+    value['nodes'].append(1)
+    cached = cache.get('a')
+    cached['nodes'].append(2)
+    assert cache.get('a') == {'nodes': []}
+
+
+def test_expired_entries_are_misses():
+    cache = ResponseCache(ttl=-1)
+    cache.set('a', {'n': 1})
+    assert cache.get('a') is None
+    assert cache.stats()['entries'] == 0
+
+
+def test_sqlite_tier_survives_a_restart(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = ResponseCache(db_path=path)
+    cache.set('a', {'n': 1})
+    cache.flush()
+
+    restarted = ResponseCache(db_path=path)
+    assert restarted.get('a') == {'n': 1}
+    assert restarted.get('a') == {'n': 1}
+    stats = restarted.stats()
+    assert (stats['disk_hits'], stats['hits']) == (1, 1)
+
+
+def test_sqlite_tier_drops_expired_rows(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = ResponseCache(ttl=-1, db_path=path)
+    cache.set('a', {'n': 1})
+    cache.flush()
+    assert ResponseCache(db_path=path).get('a') is None
+    cache.get('a')
+    cache.flush()
+    assert cache._db.execute('SELECT COUNT(*) FROM response_cache').fetchone()[0] == 0
+
+
+def test_set_leaves_sqlite_writes_to_the_writer_thread(tmp_path):
+    path = str(tmp_path / 'cache.db')
+    cache = ResponseCache(db_path=path)
+    reader = cache._db
+
+    class NoWrites:
+        def execute(self, statement, params=()):
+            assert statement.startswith('SELECT'), statement
+            return reader.execute(statement, params)
+
+        def commit(self):
+            raise AssertionError('commit on the caller thread')
+
+    cache._db = NoWrites()
+    cache.set('a', {'n': 1})
+    cache.flush()
+    assert ResponseCache(db_path=path).get('a') == {'n': 1}
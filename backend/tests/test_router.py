@@ -0,0 +1,41 @@
+import asyncio
+
+from services.providers.base import LLMProvider, ProviderError
+from services.providers.router import ProviderRouter
+
+
+class FakeProvider(LLMProvider):
+    def __init__(self, name, latency=0.0, fail=False):
+        super().__init__(name)
+        self.name = name
+        self.latency = latency
+        self.fail = fail
+
+    async def complete(self, messages, **options):
+        await asyncio.sleep(self.latency)
+        if self.fail:
+            raise ProviderError(f"{self.name} down")
+        return 'ok'
+
+
+def _route(router, calls=5):
+    async def run():
+        return [(await router.complete([]))['provider'] for _ in range(calls)]
+    return asyncio.run(run())
+
+
+def test_configured_priority_wins_over_latency():
+    router = ProviderRouter([FakeProvider('primary', latency=0.01), FakeProvider('fallback')])
+    assert _route(router) == ['primary'] * 5
+
+
+def test_latency_orders_providers_within_a_tier():
+    router = ProviderRouter([FakeProvider('slow', latency=0.01), FakeProvider('fast')], tiers={'slow': 0, 'fast': 0})
+    assert _route(router) == ['slow', 'fast', 'fast', 'fast', 'fast']
+
+
+def test_failover_to_next_provider():
+    router = ProviderRouter([FakeProvider('primary', fail=True), FakeProvider('fallback')], error_threshold=0.5,
+                            alpha=1.0)
+    assert _route(router, 2) == ['fallback', 'fallback']
+    assert router.candidates()[0].name == 'fallback'
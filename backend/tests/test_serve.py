@@ -0,0 +1,24 @@
+import pytest
+
+import serve
+from config.config import Config
+
+
+@pytest.mark.parametrize('overrides', [
+    {'CONVERSATION_BACKEND': 'memory'},
+    {'CONVERSATION_BACKEND': 'sqlite', 'RETRIEVAL_ENABLED': True, 'RETRIEVAL_INDEX_PATH': 'examples'},
+])
+def test_refuses_several_workers_with_process_local_state(monkeypatch, overrides):
+    monkeypatch.setattr(Config, 'SERVER_WORKERS', 4)
+    for name, value in overrides.items():
+        monkeypatch.setattr(Config, name, value)
+    monkeypatch.setattr(serve, 'run', lambda config: pytest.fail("server started"))
+    assert serve.main() == 1
+
+
+def test_starts_several_workers_with_shared_conversations(monkeypatch):
+    monkeypatch.setattr(Config, 'SERVER_WORKERS', 4)
+    monkeypatch.setattr(Config, 'CONVERSATION_BACKEND', 'sqlite')
+    monkeypatch.setattr(Config, 'RETRIEVAL_INDEX_PATH', '')
+    monkeypatch.setattr(serve, 'run', lambda config: config.workers)
+    assert serve.main() == 4
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from services.single_flight import SingleFlight
+
+
+def test_concurrent_identical_calls_share_one_upstream_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {'nodes': [1, 2]}
+
+    async def scenario():
+        return await asyncio.gather(*[flight.do('key', fetch) for _ in range(5)])
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert sorted(coalesced for _, coalesced in results) == [False, True, True, True, True]
+    assert all(result == {'nodes': [1, 2]} for result, _ in results)
+    # Followers get private copies
+    assert len({id(result) for result, _ in results}) == 5
+    stats = flight.stats()
+    assert (stats['leaders'], stats['coalesced'], stats['in_flight']) == (1, 4, 0)
+
+
+def test_different_keys_do_not_coalesce():
+    flight = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0)
+        return len(calls)
+
+    async def scenario():
+        return await asyncio.gather(flight.do('a', fetch), flight.do('b', fetch))
+
+    asyncio.run(scenario())
+    assert len(calls) == 2
+
+
+def test_exception_reaches_every_waiter_and_clears_the_entry():
+    flight = SingleFlight()
+    calls = []
+
+    async def failing():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError('upstream down')
+
+    async def succeeding():
+        return 'ok'
+
+    async def scenario():
+        results = await asyncio.gather(*[flight.do('key', failing) for _ in range(3)], return_exceptions=True)
+        assert flight.stats()['in_flight'] == 0
+        return results, await flight.do('key', succeeding)
+
+    results, retry = asyncio.run(scenario())
+    assert len(calls) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    assert retry == ('ok', False)
+
+
+def test_cancelled_follower_does_not_cancel_the_shared_call():
+    flight = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.02)
+        return 'done'
+
+    async def scenario():
+        leader = asyncio.create_task(flight.do('key', fetch))
+        await asyncio.sleep(0)
+        follower = asyncio.create_task(flight.do('key', fetch))
+        await asyncio.sleep(0)
+        follower.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await follower
+        return await leader
+
+    assert asyncio.run(scenario()) == ('done', False)
@@ -0,0 +1,27 @@
+import pytest
+
+from services.template_engine import TemplateEngine
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('copy from SQL Server to Databricks', ('sql', 'databricks')),
+    ('Create a pipeline to copy data from Azure SQL Database to Blob Storage', ('sql', 'blob')),
+    ('load into Snowflake from Postgres', ('postgres', 'snowflake')),
+    ('Please build a pipeline that copies data from Oracle to ADLS', ('oracle', 'adls')),
+])
+def test_plain_copy_requests_match(text, expected):
+    source, sink = TemplateEngine().match(text)
+    assert (source.key, sink.key) == expected
+
+
+@pytest.mark.parametrize('text', [
+    'copy from sql server to databricks and send an email on failure',
+    'copy from sql server to databricks every night at 2am',
+    'copy orders from mysql to snowflake where status is shipped',
+    'copy from mysql to snowflake and delete the source rows afterwards',
+    'copy all tables from sql server to synapse',
+    'copy from sql server to blob, then to snowflake',
+    'what is a linked service',
+])
+def test_extra_requirements_go_to_the_llm(text):
+    assert TemplateEngine().match(text) is None
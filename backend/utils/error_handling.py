@@ -27,6 +27,18 @@ class AuthenticationError(APIError):
     def __init__(self, message="Authentication failed"):
         super().__init__(message, status_code=401)
 
+class RateLimitError(APIError):
+    """Exception for requests rejected because the upstream quota is exhausted"""
+    def __init__(self, message="Rate limit exceeded, retry later", retry_after=None):
+        super().__init__(message, status_code=429)
+        self.retry_after = retry_after
+
+class ServiceUnavailableError(APIError):
+    """Exception for requests shed because the service is overloaded"""
+    def __init__(self, message="Service is overloaded, retry later", retry_after=None):
+        super().__init__(message, status_code=503)
+        self.retry_after = retry_after
+
 def handle_error(error):
     """Convert exceptions to JSON responses"""
     if isinstance(error, APIError):
@@ -37,6 +49,8 @@ def handle_error(error):
         }
         if hasattr(error, 'azure_error'):
             response['azure_error'] = str(error.azure_error)
+        if getattr(error, 'retry_after', None) is not None:
+            response['retry_after'] = error.retry_after
         return response, error.status_code
     
     # Handle unexpected errors
@@ -0,0 +1,249 @@
+"""
+Layered (Sugiyama-style) layout for pipeline_flow graphs.
+
+Steps: break cycles by reversing DFS back edges, assign layers by longest
+path, route long edges through dummy nodes, reduce crossings with
+barycenter sweeps (keeping the best ordering seen), then place layers left
+to right. Weakly connected components are laid out and cached separately,
+keyed by a hash of their structure, so adding a pipeline to a flow does not
+move the ones already on screen.
+"""
+import hashlib
+import threading
+from collections import OrderedDict, defaultdict
+
+# Node boxes in the frontend are 200x80
+LAYER_SPACING = 280
+NODE_SPACING = 130
+COMPONENT_SPACING = 60
+SWEEPS = 8
+
+
+def _components(node_ids, edges):
+    """Weakly connected components, each listed in node order, ordered by first node"""
+    parent = {node: node for node in node_ids}
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    for source, target in edges:
+        root_source, root_target = find(source), find(target)
+        if root_source != root_target:
+            parent[root_target] = root_source
+
+    groups = OrderedDict()
+    for node in node_ids:
+        groups.setdefault(find(node), []).append(node)
+    return list(groups.values())
+
+
+def _acyclic(node_ids, edges):
+    """Edges with DFS back edges reversed, so the graph is a DAG"""
+    successors = defaultdict(list)
+    for source, target in edges:
+        successors[source].append(target)
+
+    state = {}
+    back = set()
+    for start in node_ids:
+        if start in state:
+            continue
+        state[start] = 'open'
+        stack = [(start, iter(successors[start]))]
+        while stack:
+            node, children = stack[-1]
+            child = next(children, None)
+            if child is None:
+                state[node] = 'done'
+                stack.pop()
+            elif state.get(child) == 'open':
+                back.add((node, child))
+            elif child not in state:
+                state[child] = 'open'
+                stack.append((child, iter(successors[child])))
+    return [(target, source) if (source, target) in back else (source, target) for source, target in edges]
+
+
+def _layers(node_ids, edges):
+    """Longest-path layering: every edge points to a later layer"""
+    indegree = {node: 0 for node in node_ids}
+    successors = defaultdict(list)
+    for source, target in edges:
+        successors[source].append(target)
+        indegree[target] += 1
+
+    layer = {node: 0 for node in node_ids}
+    has_predecessor = {target for _, target in edges}
+    ready = [node for node in node_ids if indegree[node] == 0]
+    while ready:
+        node = ready.pop()
+        for target in successors[node]:
+            layer[target] = max(layer[target], layer[node] + 1)
+            indegree[target] -= 1
+            if indegree[target] == 0:
+                ready.append(target)
+
+    # Pull sources right, next to their nearest successor, to shorten their edges
+    for node in node_ids:
+        if node in has_predecessor or not successors[node]:
+            continue
+        layer[node] = min(layer[target] for target in successors[node]) - 1
+    return layer
+
+
+def _crossings(upper_edges, lower_size):
+    """Crossings between two adjacent layers; edges are (upper position, lower position)"""
+    tree = [0] * (lower_size + 1)
+    crossings = 0
+    seen = 0
+    for _, lower in sorted(upper_edges):
+        # Count earlier edges that land strictly right of this one (Fenwick tree)
+        index = lower + 1
+        below = 0
+        while index > 0:
+            below += tree[index]
+            index -= index & -index
+        crossings += seen - below
+        seen += 1
+        index = lower + 1
+        while index <= lower_size:
+            tree[index] += 1
+            index += index & -index
+    return crossings
+
+
+def layout_component(node_ids, edges):
+    """Positions {node id: (x, y)} for one connected component, with y starting at 0"""
+    edges = list(dict.fromkeys(_acyclic(node_ids, edges)))
+    layer = _layers(node_ids, edges)
+
+    # Split edges spanning several layers with dummy nodes
+    layers = defaultdict(list)
+    for node in node_ids:
+        layers[layer[node]].append(node)
+    down = defaultdict(list)
+    up = defaultdict(list)
+    dummy = 0
+    for source, target in edges:
+        chain = [source]
+        for step in range(layer[source] + 1, layer[target]):
+            dummy += 1
+            node = ('dummy', dummy)
+            layer[node] = step
+            layers[step].append(node)
+            chain.append(node)
+        chain.append(target)
+        for a, b in zip(chain, chain[1:]):
+            down[a].append(b)
+            up[b].append(a)
+
+    order = [layers[index] for index in sorted(layers)]
+
+    def total_crossings(order):
+        total = 0
+        for index in range(len(order) - 1):
+            position = {node: i for i, node in enumerate(order[index + 1])}
+            pairs = [(i, position[target]) for i, node in enumerate(order[index]) for target in down[node]]
+            total += _crossings(pairs, len(order[index + 1]))
+        return total
+
+    best = [list(nodes) for nodes in order]
+    best_crossings = total_crossings(best)
+    for sweep in range(SWEEPS):
+        if best_crossings == 0:
+            break
+        indices = range(1, len(order)) if sweep % 2 == 0 else range(len(order) - 2, -1, -1)
+        neighbours = up if sweep % 2 == 0 else down
+        for index in indices:
+            fixed = order[index - 1] if sweep % 2 == 0 else order[index + 1]
+            position = {node: i for i, node in enumerate(fixed)}
+            current = {node: i for i, node in enumerate(order[index])}
+
+            def barycenter(node):
+                linked = [position[other] for other in neighbours[node]]
+                return (sum(linked) / len(linked), current[node]) if linked else (current[node], current[node])
+
+            order[index] = sorted(order[index], key=barycenter)
+        crossings = total_crossings(order)
+        if crossings < best_crossings:
+            best = [list(nodes) for nodes in order]
+            best_crossings = crossings
+
+    height = max(len(nodes) for nodes in best)
+    positions = {}
+    for index, nodes in enumerate(best):
+        offset = (height - len(nodes)) * NODE_SPACING / 2
+        for slot, node in enumerate(nodes):
+            if not isinstance(node, tuple):
+                positions[node] = (index * LAYER_SPACING, offset + slot * NODE_SPACING)
+    return positions
+
+
+def _structure_key(node_ids, edges):
+    payload = '\n'.join(sorted(node_ids)) + '\0' + '\n'.join(sorted(f'{s}\t{t}' for s, t in edges))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class FlowLayout:
+    """Attaches {'x', 'y'} positions to pipeline_flow nodes, caching component layouts by structure"""
+
+    def __init__(self, cache_size=512):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    def _component_layout(self, node_ids, edges):
+        key = _structure_key(node_ids, edges)
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+                self._stats['hits'] += 1
+                return cached
+            self._stats['misses'] += 1
+        positions = layout_component(node_ids, edges)
+        with self._lock:
+            self._cache[key] = positions
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return positions
+
+    def apply(self, flow):
+        """Set node['position'] for every node with an id; edges to unknown ids are ignored"""
+        nodes = [node for node in flow.get('nodes', []) if isinstance(node, dict) and node.get('id') is not None]
+        node_ids = list(dict.fromkeys(str(node['id']) for node in nodes))
+        known = set(node_ids)
+        edges = list(dict.fromkeys(
+            (str(edge.get('source')), str(edge.get('target')))
+            for edge in flow.get('edges', []) if isinstance(edge, dict)
+        ))
+        edges = [(s, t) for s, t in edges if s in known and t in known and s != t]
+
+        component_of = {}
+        components = _components(node_ids, edges)
+        for index, component in enumerate(components):
+            for node in component:
+                component_of[node] = index
+        component_edges = defaultdict(list)
+        for source, target in edges:
+            component_edges[component_of[source]].append((source, target))
+
+        positions = {}
+        top = 0
+        for index, component in enumerate(components):
+            layout = self._component_layout(component, component_edges[index])
+            for node, (x, y) in layout.items():
+                positions[node] = {'x': x, 'y': top + y}
+            top += max(y for _, y in layout.values()) + NODE_SPACING + COMPONENT_SPACING
+
+        for node in nodes:
+            node['position'] = positions[str(node['id'])]
+        return flow
+
+    def stats(self):
+        with self._lock:
+            return {**self._stats, 'entries': len(self._cache)}
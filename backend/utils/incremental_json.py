@@ -0,0 +1,103 @@
+import json
+
+from utils.json_extractor import decode
+
+
+class IncrementalJSONParser:
+    """Streaming scanner that reports completed JSON containers at watched paths.
+
+    Text is fed in arbitrary chunks (e.g. LLM token deltas). The scanner tracks
+    string/escape state and the container stack of the first top-level object,
+    so each feed() call only scans the new characters. Whenever an object or
+    array closes at a path matching one of ``watch`` (tuples of keys, with
+    ``'*'`` matching any array index) it is decoded and returned as
+    ``(path, value)``. Prose before the root object is ignored, including
+    braces in it: ``done`` is only set once a top-level ``{...}`` decodes as
+    an object, otherwise scanning resumes after it.
+    """
+
+    def __init__(self, watch):
+        self.watch = [tuple(pattern) for pattern in watch]
+        self.buffer = ''
+        self._pos = 0
+        self._stack = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = None
+        self._started = False
+        self.done = False
+
+    def feed(self, chunk):
+        self.buffer += chunk
+        completed = []
+        buf = self.buffer
+        i = self._pos
+        n = len(buf)
+
+        while i < n and not self.done:
+            ch = buf[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == '\\':
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    frame = self._stack[-1] if self._stack else None
+                    if frame and frame['kind'] == 'object' and frame['expect_key']:
+                        frame['key'] = json.loads(buf[self._string_start:i + 1])
+                        frame['expect_key'] = False
+            elif not self._started:
+                if ch == '{':
+                    self._started = True
+                    self._push('object', (), i)
+            elif ch == '"':
+                self._in_string = True
+                self._string_start = i
+            elif ch == '{' or ch == '[':
+                self._push('object' if ch == '{' else 'array', self._child_path(), i)
+            elif ch == '}' or ch == ']':
+                frame = self._stack.pop()
+                if self._matches(frame['path']):
+                    value = decode(buf[frame['start']:i + 1])
+                    if value is not None:
+                        completed.append((frame['path'], value))
+                if not self._stack:
+                    if isinstance(decode(buf[frame['start']:i + 1]), dict):
+                        self.done = True
+                    else:
+                        self._started = False
+            elif ch == ',':
+                frame = self._stack[-1]
+                if frame['kind'] == 'object':
+                    frame['expect_key'] = True
+                else:
+                    frame['index'] += 1
+            i += 1
+
+        self._pos = i
+        return completed
+
+    def _push(self, kind, path, start):
+        self._stack.append({
+            'kind': kind,
+            'path': path,
+            'start': start,
+            'key': None,
+            'index': 0,
+            'expect_key': kind == 'object'
+        })
+
+    def _child_path(self):
+        frame = self._stack[-1]
+        if frame['kind'] == 'object':
+            return frame['path'] + (frame['key'],)
+        return frame['path'] + (frame['index'],)
+
+    def _matches(self, path):
+        for pattern in self.watch:
+            if len(pattern) != len(path):
+                continue
+            if all(p == '*' and isinstance(k, int) or p == k for p, k in zip(pattern, path)):
+                return True
+        return False
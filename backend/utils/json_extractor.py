@@ -0,0 +1,146 @@
+import json
+import re
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Structural characters are matched one at a time; everything else (except
+# whitespace) in runs, so long string bodies are skipped in a single step.
+_TOKEN = re.compile(r'[{}\[\]",\\]|[^\s{}\[\]",\\]+')
+
+
+_DECODER = json.JSONDecoder()
+
+
+def loads(data):
+    """Decode JSON with orjson when installed, falling back to the stdlib"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _scan(text, pos=0):
+    """Single pass over text yielding each balanced top-level {...} span.
+
+    Yields (start, end, trailing_commas, balanced) where trailing_commas are
+    offsets of commas directly before a closing bracket. String and escape
+    state is tracked so braces inside string values are ignored. A final
+    span with balanced=False is yielded if the text ends inside an object.
+    """
+    depth = 0
+    in_string = False
+    escape = False
+    start = -1
+    trailing = []
+    pending_comma = -1
+
+    for match in _TOKEN.finditer(text, pos):
+        token = match.group()
+        if in_string:
+            if escape:
+                escape = False
+            elif token == '\\':
+                escape = True
+            elif token == '"':
+                in_string = False
+            continue
+
+        if depth == 0:
+            if token == '{':
+                depth = 1
+                start = match.start()
+                trailing = []
+                pending_comma = -1
+            continue
+
+        if token == '"':
+            in_string = True
+            pending_comma = -1
+        elif token == '{' or token == '[':
+            depth += 1
+            pending_comma = -1
+        elif token == '}' or token == ']':
+            if pending_comma != -1:
+                trailing.append(pending_comma)
+                pending_comma = -1
+            depth -= 1
+            if depth == 0:
+                yield start, match.end(), trailing, True
+        elif token == ',':
+            pending_comma = match.start()
+        else:
+            pending_comma = -1
+
+    if depth > 0:
+        yield start, len(text), trailing, False
+
+
+def _decode_span(text, start, end, trailing):
+    if trailing:
+        pieces = []
+        cursor = start
+        for comma in trailing:
+            pieces.append(text[cursor:comma])
+            cursor = comma + 1
+        pieces.append(text[cursor:end])
+        candidate = ''.join(pieces)
+    else:
+        candidate = text[start:end]
+    try:
+        return loads(candidate)
+    except ValueError:
+        return None
+
+
+def decode(text):
+    """Decode a single JSON object, tolerating trailing commas"""
+    for start, end, trailing, balanced in _scan(text):
+        if balanced:
+            return _decode_span(text, start, end, trailing)
+    return None
+
+
+def _decode_at(text, pos):
+    """Decode the object starting at pos; returns (value, end, balanced).
+
+    The C decoder's raw_decode handles the common case; only when it fails
+    (trailing commas, truncation) is the span re-read by the tolerant scanner.
+    """
+    try:
+        value, end = _DECODER.raw_decode(text, pos)
+        return value, end, True
+    except ValueError:
+        pass
+    for start, end, trailing, balanced in _scan(text, pos):
+        if not balanced:
+            return None, end, False
+        return _decode_span(text, start, end, trailing), end, True
+    return None, len(text), False
+
+
+def extract_json(text):
+    """Extract the main JSON object from an LLM reply.
+
+    Markdown fences and surrounding prose are ignored, braces inside strings
+    are handled, and trailing commas are dropped. Top-level objects are read
+    left to right, each starting where the previous one ended, so the reply
+    is traversed once; when several decode, the largest dict wins. Only
+    top-level objects count: if one never closes (truncated output) the
+    search stops there, rather than settling for an object nested inside it.
+    """
+    if not text:
+        return None
+
+    best = None
+    best_size = -1
+    pos = text.find('{')
+    while pos != -1:
+        value, end, balanced = _decode_at(text, pos)
+        if not balanced:
+            break
+        if isinstance(value, dict) and end - pos > best_size:
+            best, best_size = value, end - pos
+        pos = text.find('{', end)
+    return best
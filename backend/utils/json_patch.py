@@ -0,0 +1,125 @@
+import copy
+
+
+class JSONPatchError(Exception):
+    """Raised when a JSON Patch (RFC 6902) cannot be applied"""
+    pass
+
+
+def _parse_pointer(pointer):
+    if pointer == '':
+        return []
+    if not pointer.startswith('/'):
+        raise JSONPatchError(f"Invalid JSON pointer: {pointer!r}")
+    return [part.replace('~1', '/').replace('~0', '~') for part in pointer[1:].split('/')]
+
+
+def _index(container, token, allow_end=False):
+    if token == '-' and allow_end:
+        return len(container)
+    if not token.isdigit() or (len(token) > 1 and token[0] == '0'):
+        raise JSONPatchError(f"Invalid array index: {token!r}")
+    index = int(token)
+    if index > len(container) or (index == len(container) and not allow_end):
+        raise JSONPatchError(f"Array index out of range: {index}")
+    return index
+
+
+def _resolve(doc, parts):
+    """Return the container holding the last pointer token"""
+    target = doc
+    for token in parts[:-1]:
+        if isinstance(target, list):
+            target = target[_index(target, token)]
+        elif isinstance(target, dict) and token in target:
+            target = target[token]
+        else:
+            raise JSONPatchError(f"Path not found: /{'/'.join(parts)}")
+    return target
+
+
+def _get(doc, pointer):
+    parts = _parse_pointer(pointer)
+    if not parts:
+        return doc
+    parent = _resolve(doc, parts)
+    token = parts[-1]
+    if isinstance(parent, list):
+        return parent[_index(parent, token)]
+    if isinstance(parent, dict) and token in parent:
+        return parent[token]
+    raise JSONPatchError(f"Path not found: {pointer}")
+
+
+def _add(doc, pointer, value):
+    parts = _parse_pointer(pointer)
+    if not parts:
+        return value
+    parent = _resolve(doc, parts)
+    token = parts[-1]
+    if isinstance(parent, list):
+        parent.insert(_index(parent, token, allow_end=True), value)
+    elif isinstance(parent, dict):
+        parent[token] = value
+    else:
+        raise JSONPatchError(f"Cannot add to a non-container at {pointer}")
+    return doc
+
+
+def _remove(doc, pointer):
+    parts = _parse_pointer(pointer)
+    if not parts:
+        raise JSONPatchError("Cannot remove the document root")
+    parent = _resolve(doc, parts)
+    token = parts[-1]
+    if isinstance(parent, list):
+        return parent.pop(_index(parent, token))
+    if isinstance(parent, dict) and token in parent:
+        return parent.pop(token)
+    raise JSONPatchError(f"Path not found: {pointer}")
+
+
+def apply_patch(doc, operations):
+    """Apply RFC 6902 operations to a deep copy of doc and return the result.
+
+    Supports add, remove, replace, move, copy and test. The input document
+    is never modified, so a failed patch leaves the caller's state intact.
+    """
+    if not isinstance(operations, list):
+        raise JSONPatchError("Patch must be a list of operations")
+
+    result = copy.deepcopy(doc)
+    for operation in operations:
+        if not isinstance(operation, dict) or not isinstance(operation.get('path'), str):
+            raise JSONPatchError(f"Malformed patch operation: {operation!r}")
+        op, path = operation.get('op'), operation['path']
+        if op in ('move', 'copy') and not isinstance(operation.get('from'), str):
+            raise JSONPatchError(f"Patch operation {op!r} needs a 'from' pointer: {operation!r}")
+
+        if op == 'add':
+            result = _add(result, path, copy.deepcopy(operation.get('value')))
+        elif op == 'remove':
+            _remove(result, path)
+        elif op == 'replace':
+            _get(result, path)
+            if _parse_pointer(path):
+                _remove(result, path)
+            result = _add(result, path, copy.deepcopy(operation.get('value')))
+        elif op == 'move':
+            if path.startswith(operation['from'] + '/'):
+                raise JSONPatchError(f"Cannot move {operation['from']} into its own child {path}")
+            value = _remove(result, operation['from'])
+            result = _add(result, path, value)
+        elif op == 'copy':
+            result = _add(result, path, copy.deepcopy(_get(result, operation['from'])))
+        elif op == 'test':
+            if _get(result, path) != operation.get('value'):
+                raise JSONPatchError(f"Test failed at {path}")
+        else:
+            raise JSONPatchError(f"Unsupported patch operation: {op!r}")
+    return result
+
+
+def resolve_pointer(doc, pointer):
+    """Value at an RFC 6901 pointer in doc, raising JSONPatchError if it is absent"""
+    return _get(doc, pointer)
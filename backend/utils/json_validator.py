@@ -1,81 +1,185 @@
 import json
-from jsonschema import validate, ValidationError
+from jsonschema import Draft7Validator, FormatChecker
+from jsonschema.exceptions import best_match
 
-class JSONValidator:
-    @staticmethod
-    def validate_linked_service(linked_service_json):
-        schema = {
+# ADF artifact names: start with a letter, then letters, digits, '-' or '_' (see naming_conventions)
+NAME_SCHEMA = {"type": "string", "pattern": "^[A-Za-z][A-Za-z0-9_-]*$", "maxLength": 260}
+
+LINKED_SERVICE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": NAME_SCHEMA,
+        "type": {"type": "string"},
+        "properties": {
             "type": "object",
             "properties": {
-                "name": {"type": "string"},
                 "type": {"type": "string"},
-                "properties": {
-                    "type": "object",
-                    "properties": {
-                        "type": {"type": "string"},
-                        "typeProperties": {"type": "object"}
-                    },
-                    "required": ["type", "typeProperties"]
-                }
+                "typeProperties": {"type": "object"}
             },
-            "required": ["name", "type", "properties"]
+            "required": ["type", "typeProperties"]
         }
-        
-        try:
-            validate(instance=linked_service_json, schema=schema)
-            return True, None
-        except ValidationError as e:
-            return False, str(e)
-    
-    @staticmethod
-    def validate_dataset(dataset_json):
-        schema = {
+    },
+    "required": ["name", "type", "properties"]
+}
+
+DATASET_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": NAME_SCHEMA,
+        "type": {"type": "string"},
+        "properties": {
             "type": "object",
             "properties": {
-                "name": {"type": "string"},
                 "type": {"type": "string"},
-                "properties": {
+                "linkedServiceName": {
                     "type": "object",
                     "properties": {
-                        "type": {"type": "string"},
-                        "linkedServiceName": {"type": "object"},
-                        "typeProperties": {"type": "object"}
+                        "referenceName": {"type": "string"},
+                        "type": {"const": "LinkedServiceReference"}
                     },
-                    "required": ["type", "linkedServiceName", "typeProperties"]
-                }
+                    "required": ["referenceName"]
+                },
+                "typeProperties": {"type": "object"}
             },
-            "required": ["name", "type", "properties"]
+            "required": ["type", "linkedServiceName", "typeProperties"]
         }
-        
-        try:
-            validate(instance=dataset_json, schema=schema)
-            return True, None
-        except ValidationError as e:
-            return False, str(e)
-    
-    @staticmethod
-    def validate_pipeline(pipeline_json):
-        schema = {
+    },
+    "required": ["name", "type", "properties"]
+}
+
+PIPELINE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": NAME_SCHEMA,
+        "type": {"type": "string"},
+        "properties": {
             "type": "object",
             "properties": {
-                "name": {"type": "string"},
-                "type": {"type": "string"},
-                "properties": {
-                    "type": "object",
-                    "properties": {
-                        "activities": {
-                            "type": "array",
-                            "items": {"type": "object"}
-                        }
-                    },
-                    "required": ["activities"]
+                "activities": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "name": {"type": "string"},
+                            "type": {"type": "string"}
+                        },
+                        "required": ["name", "type"]
+                    }
                 }
             },
-            "required": ["name", "type", "properties"]
+            "required": ["activities"]
         }
-        
-        try:
-            validate(instance=pipeline_json, schema=schema)
+    },
+    "required": ["name", "type", "properties"]
+}
+
+SCHEMAS = {
+    'linked_service': LINKED_SERVICE_SCHEMA,
+    'dataset': DATASET_SCHEMA,
+    'pipeline': PIPELINE_SCHEMA
+}
+
+# Whole-response shape, sent to providers that support schema-constrained output
+RESPONSE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "pipeline_flow": {
+            "type": "object",
+            "properties": {
+                "nodes": {"type": "array", "items": {"type": "object"}},
+                "edges": {"type": "array", "items": {"type": "object"}}
+            },
+            "required": ["nodes", "edges"]
+        },
+        "json_configs": {
+            "type": "object",
+            "properties": {
+                "linked_services": {"type": "array", "items": LINKED_SERVICE_SCHEMA},
+                "datasets": {"type": "array", "items": DATASET_SCHEMA},
+                "pipeline": PIPELINE_SCHEMA
+            },
+            "required": ["linked_services", "datasets", "pipeline"]
+        },
+        "explanation": {"type": "string"}
+    },
+    "required": ["pipeline_flow", "json_configs", "explanation"]
+}
+
+# Schemas are checked against the meta-schema and compiled once, at import
+_FORMAT_CHECKER = FormatChecker()
+for _schema in [*SCHEMAS.values(), RESPONSE_SCHEMA]:
+    Draft7Validator.check_schema(_schema)
+VALIDATORS = {
+    artifact_type: Draft7Validator(schema, format_checker=_FORMAT_CHECKER)
+    for artifact_type, schema in SCHEMAS.items()
+}
+
+
+def _pointer(parts):
+    """RFC 6901 JSON pointer for a sequence of keys/indexes"""
+    return ''.join('/' + str(part).replace('~', '~0').replace('/', '~1') for part in parts)
+
+
+class JSONValidator:
+    @staticmethod
+    def get_validator(artifact_type):
+        return VALIDATORS[artifact_type]
+
+    @staticmethod
+    def validate_linked_service(linked_service_json):
+        return JSONValidator._validate('linked_service', linked_service_json)
+    
+    @staticmethod
+    def validate_dataset(dataset_json):
+        return JSONValidator._validate('dataset', dataset_json)
+    
+    @staticmethod
+    def validate_pipeline(pipeline_json):
+        return JSONValidator._validate('pipeline', pipeline_json)
+
+    @staticmethod
+    def validate_json_configs(json_configs, base_pointer='/json_configs'):
+        """Validate every linked service, dataset and the pipeline in one pass.
+
+        Returns {'valid', 'checked', 'errors'}; each error carries the artifact
+        type and name, a JSON pointer into the response and the message, and
+        all errors are collected rather than stopping at the first.
+        """
+        errors = []
+        checked = 0
+        targets = []
+
+        for key, artifact_type in (('linked_services', 'linked_service'), ('datasets', 'dataset')):
+            artifacts = json_configs.get(key, [])
+            if not isinstance(artifacts, list):
+                errors.append({
+                    'artifact': artifact_type,
+                    'name': None,
+                    'pointer': base_pointer + _pointer([key]),
+                    'message': f"{key} must be a list"
+                })
+                continue
+            for index, artifact in enumerate(artifacts):
+                targets.append((artifact_type, artifact, [key, index]))
+
+        targets.append(('pipeline', json_configs.get('pipeline', {}), ['pipeline']))
+
+        for artifact_type, artifact, path in targets:
+            checked += 1
+            name = artifact.get('name') if isinstance(artifact, dict) else None
+            for error in VALIDATORS[artifact_type].iter_errors(artifact):
+                errors.append({
+                    'artifact': artifact_type,
+                    'name': name,
+                    'pointer': base_pointer + _pointer(path + list(error.absolute_path)),
+                    'message': error.message
+                })
+
+        return {'valid': not errors, 'checked': checked, 'errors': errors}
+
+    @staticmethod
+    def _validate(artifact_type, instance):
+        error = best_match(VALIDATORS[artifact_type].iter_errors(instance))
+        if error is None:
             return True, None
-        except ValidationError as e:
-            return False, str(e)
\ No newline at end of file
+        return False, str(error)
@@ -1,32 +1,132 @@
+import atexit
+import contextvars
+import json
 import logging
 import os
-from logging.handlers import RotatingFileHandler
+import queue
+import random
+import time
+import uuid
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+
+from config.config import Config
+
+# Correlation ID of the request being handled, attached to every log record
+request_id_var = contextvars.ContextVar('request_id', default=None)
+
+_listener = None
+_queue_handler = None
+
+# Attributes every LogRecord has; anything else was passed via ``extra``
+_RESERVED = set(logging.LogRecord('', 0, '', 0, '', (), None).__dict__) | {'message', 'asctime', 'request_id'}
+
+
+class RequestIdFilter(logging.Filter):
+    """Stamp records with the current request ID on the calling thread/task"""
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """Render records as one JSON object per line; runs on the writer thread"""
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z',
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', None)
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED:
+                entry[key] = value
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        elif record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+def new_request_id(incoming=None):
+    """Set and return the correlation ID for the current request"""
+    request_id = incoming or uuid.uuid4().hex
+    request_id_var.set(request_id)
+    return request_id
+
+
+def sample_payload(payload):
+    """Payload to attach to a log record, or None if this one is sampled out.
+
+    Payloads are kept at LOG_PAYLOAD_SAMPLE_RATE and truncated to
+    LOG_PAYLOAD_MAX_BYTES once serialized.
+    """
+    if random.random() >= Config.LOG_PAYLOAD_SAMPLE_RATE:
+        return None
+    text = payload if isinstance(payload, str) else json.dumps(payload, default=str)
+    if len(text) > Config.LOG_PAYLOAD_MAX_BYTES:
+        return text[:Config.LOG_PAYLOAD_MAX_BYTES] + f'...[{len(text) - Config.LOG_PAYLOAD_MAX_BYTES} bytes truncated]'
+    return text
+
 
 def setup_logging(app):
-    """Configure logging for the application"""
-    
+    """Configure non-blocking structured logging for the application.
+
+    Records from every logger go onto an in-memory queue; a background
+    QueueListener thread formats them as JSON lines into a rotating file
+    (and plain text to stderr), so request handlers never wait on disk I/O.
+    """
+    global _listener, _queue_handler
+
+    # Reconfiguring (e.g. a second create_app in tests) replaces the old pipeline
+    shutdown_logging()
+
     # Create logs directory if it doesn't exist
-    if not os.path.exists('logs'):
-        os.makedirs('logs')
+    os.makedirs(Config.LOG_DIR, exist_ok=True)
     
     # Set up file handler
     file_handler = RotatingFileHandler(
-        'logs/app.log',
+        os.path.join(Config.LOG_DIR, 'app.log'),
         maxBytes=1024 * 1024,  # 1MB
         backupCount=10
     )
-    
-    # Set up formatter
-    formatter = logging.Formatter(
-        '[%(asctime)s] %(levelname)s in %(module)s: %(message)s'
-    )
-    file_handler.setFormatter(formatter)
-    
+    file_handler.setFormatter(JSONFormatter())
+
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(
+        '[%(asctime)s] %(levelname)s in %(module)s [%(request_id)s]: %(message)s'
+    ))
+
+    log_queue = queue.SimpleQueue()
+    _queue_handler = QueueHandler(log_queue)
+    _queue_handler.addFilter(RequestIdFilter())
+    _listener = QueueListener(log_queue, file_handler, console_handler, respect_handler_level=True)
+    _listener.start()
+
+    root = logging.getLogger()
+    root.addHandler(_queue_handler)
+    root.setLevel(Config.LOG_LEVEL)
+
     # Set up application logger
-    app.logger.addHandler(file_handler)
-    app.logger.setLevel(logging.INFO)
+    app.logger.setLevel(Config.LOG_LEVEL)
     
     # Log application startup
     app.logger.info('Application startup')
     
     return app
+
+
+def shutdown_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener, _queue_handler
+    if _queue_handler is not None:
+        logging.getLogger().removeHandler(_queue_handler)
+        _queue_handler = None
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
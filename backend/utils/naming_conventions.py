@@ -25,4 +25,19 @@ def sanitize_name(name):
     if sanitized and not sanitized[0].isalpha():
         sanitized = 'ADF' + sanitized
     # Limit length
-    return sanitized[:260] if sanitized else 'ADF_Resource'
\ No newline at end of file
+    return sanitized[:260] if sanitized else 'ADF_Resource'
+
+# Prefixes from the ADF naming conventions in the system prompt
+ARTIFACT_PREFIXES = {
+    'linked_service': 'ls',
+    'dataset': 'ds',
+    'pipeline': 'pl'
+}
+
+def artifact_name(artifact_type, *parts):
+    """Build a conventional artifact name, e.g. ('dataset', 'sql') -> ds_sql"""
+    return sanitize_name('_'.join([ARTIFACT_PREFIXES[artifact_type], *parts]).lower())
+
+def pipeline_name(source, sink):
+    """Build a copy pipeline name, e.g. ('sql', 'databricks') -> pl_sql_to_databricks"""
+    return artifact_name('pipeline', source, 'to', sink)
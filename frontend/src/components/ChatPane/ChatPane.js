@@ -6,6 +6,7 @@ const ChatPane = ({ onPipelineUpdate }) => {
   const [inputValue, setInputValue] = useState('');
   const [isLoading, setIsLoading] = useState(false);
   const messagesEndRef = useRef(null);
+  const sessionIdRef = useRef(null);
 
   // Scroll to bottom of messages
   React.useEffect(() => {
@@ -32,7 +33,8 @@ const ChatPane = ({ onPipelineUpdate }) => {
           'Content-Type': 'application/json'
         },
         body: JSON.stringify({
-          message: inputValue
+          message: inputValue,
+          session_id: sessionIdRef.current
         })
       });
 
@@ -48,6 +50,10 @@ const ChatPane = ({ onPipelineUpdate }) => {
 
       const data = await response.json();
       
+      if (data.session_id) {
+        sessionIdRef.current = data.session_id;
+      }
+
       if (data.success) {
         // Debug log to see what we're receiving
         console.log('LLM Response:', data);
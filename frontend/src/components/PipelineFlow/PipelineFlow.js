@@ -55,7 +55,8 @@ const PipelineFlow = ({ pipelineData }) => {
         newNodes.push({
           id: nodeId,
           type: 'default',
-          position: { 
+          // Positions are computed server-side; fall back to a grid for older responses
+          position: node.position || { 
             x: (index % 3) * 250 + 50, 
             y: Math.floor(index / 3) * 180 + 50
           },